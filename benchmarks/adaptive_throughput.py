@@ -0,0 +1,81 @@
+"""
+Compare adaptive (texture-ranked) embedding with plain LSB embedding
+
+    python benchmarks/adaptive_throughput.py --megapixels 12 --key secret
+
+The carrier is half smooth gradient, half noise, and the same payload is
+embedded in both modes, sized to fill the adaptive capacity.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qstego.adaptive import texture_cost
+from qstego.steganography import Steganography
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def make_carrier(megapixels, rng):
+    """RGB carrier whose left half is a smooth gradient and right half noise"""
+    side = int((megapixels * 1_000_000) ** 0.5)
+    carrier = np.empty((side, side, 3), dtype=np.uint8)
+    gradient = np.linspace(0, 255, side, dtype=np.float32)
+    carrier[:, :side // 2] = gradient[:, None, None].astype(np.uint8)
+    carrier[:, side // 2:] = rng.integers(0, 256, size=(side, side - side // 2, 3), dtype=np.uint8)
+    return carrier
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megapixels', type=float, default=12, help='Carrier size in megapixels (RGB)')
+    parser.add_argument('--fill', type=float, default=0.9, help='Fraction of the adaptive capacity to fill')
+    parser.add_argument('--key', default=None, help='Stego key, to measure keyed spreading')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    carrier = make_carrier(args.megapixels, rng)
+    capacity = Steganography(adaptive=True).capacity(carrier)
+    payload = rng.integers(0, 256, size=int(capacity * args.fill), dtype=np.uint8).tobytes()
+    mib = len(payload) / 2**20
+    print(f"{carrier.shape[0] * carrier.shape[1] / 1e6:.1f} MP carrier, {mib:.1f} MiB payload, "
+          f"{'keyed' if args.key else 'sequential'} layout")
+    
+    cost_time = best_of(args.repeat, lambda: texture_cost(carrier))
+    print(f"texture cost map: {cost_time:.3f} s")
+    print(f"{'mode':>8} {'embed s':>9} {'extract s':>10} {'MiB/s':>8} {'flat changes':>13} {'slowdown':>9}")
+    
+    baseline = None
+    for adaptive in (False, True):
+        stego = Steganography(adaptive=adaptive)
+        embedded = stego.embed(carrier, payload, args.key)
+        if stego.extract(embedded, args.key) != payload:
+            raise SystemExit(f"Round trip failed in {'adaptive' if adaptive else 'plain'} mode")
+        
+        # Share of changed samples that landed in the smooth half
+        changed = embedded != carrier
+        flat_share = changed[:, :carrier.shape[1] // 2].sum() / max(1, changed.sum())
+        
+        embed_time = best_of(args.repeat, lambda: stego.embed(carrier, payload, args.key))
+        extract_time = best_of(args.repeat, lambda: stego.extract(embedded, args.key))
+        total = embed_time + extract_time
+        baseline = baseline or total
+        print(f"{'adaptive' if adaptive else 'plain':>8} {embed_time:>9.3f} {extract_time:>10.3f} "
+              f"{2 * mib / total:>8.1f} {flat_share:>12.1%} {total / baseline:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
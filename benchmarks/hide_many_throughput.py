@@ -0,0 +1,76 @@
+"""
+Compare hide_many with calling hide_encrypted_message once per carrier
+
+    python benchmarks/hide_many_throughput.py --count 1000 --size 256
+
+Carriers are PNG files of random pixels in a temporary directory, and a
+throwaway keypair is generated for the run. The per-call loop runs the full
+KEM encapsulation and Argon2 derivation for every message, so it is timed
+over --baseline carriers only and reported per image.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qstego.crypto_stego import CryptoStego
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=1000, help='Carriers hidden with hide_many')
+    parser.add_argument('--baseline', type=int, default=8, help='Carriers hidden one call at a time')
+    parser.add_argument('--size', type=int, default=256, help='Carrier side in pixels (RGB)')
+    parser.add_argument('--writers', type=int, default=None, help='hide_many decoding and encoding threads')
+    parser.add_argument('--key', default=None, help='Stego key, to measure keyed spreading')
+    args = parser.parse_args()
+    
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as work_dir:
+        crypto_stego = CryptoStego(os.path.join(work_dir, 'keys'))
+        crypto_stego.key_manager.generate_keypair('bench')
+        
+        carriers = []
+        for i in range(max(args.count, args.baseline)):
+            path = os.path.join(work_dir, f"carrier{i}.png")
+            Image.fromarray(rng.integers(0, 256, size=(args.size, args.size, 3), dtype=np.uint8)).save(path)
+            carriers.append(path)
+        jobs = [
+            (path, f"message {i}", 'bench', os.path.join(work_dir, f"out{i}.png"))
+            for i, path in enumerate(carriers)
+        ]
+        print(f"{args.size}x{args.size} carriers, {'keyed' if args.key else 'sequential'} layout")
+        
+        start = time.perf_counter()
+        for carrier, message, recipient, output_path in jobs[:args.baseline]:
+            crypto_stego.hide_encrypted_message(carrier, message, recipient, output_path, args.key)
+        per_call = (time.perf_counter() - start) / args.baseline
+        
+        start = time.perf_counter()
+        errors = [
+            result['error'] for result in crypto_stego.hide_many(jobs[:args.count], args.key, writers=args.writers)
+            if result['error']
+        ]
+        batched = (time.perf_counter() - start) / args.count
+        if errors:
+            raise SystemExit(f"hide_many failed: {errors[0]}")
+        
+        # The outputs must reveal like any other stego image
+        _, message, _, output_path = jobs[args.count - 1]
+        if crypto_stego.retrieve_encrypted_message(output_path, 'bench', args.key) != message.encode('utf-8'):
+            raise SystemExit("Round trip failed")
+        
+        print(f"{'mode':>10} {'ms/image':>10} {'images/s':>10}")
+        print(f"{'per call':>10} {per_call * 1000:>10.2f} {1 / per_call:>10.1f}")
+        print(f"{'hide_many':>10} {batched * 1000:>10.2f} {1 / batched:>10.1f}")
+        print(f"speedup: {per_call / batched:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
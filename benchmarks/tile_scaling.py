@@ -0,0 +1,66 @@
+"""
+Measure how tiled embedding and extraction scale with the thread count
+
+    python benchmarks/tile_scaling.py --megapixels 200 --threads 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qstego.steganography import Steganography
+
+
+def best_of(repeat, func):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--megapixels', type=float, default=50, help='Carrier size in megapixels (RGB)')
+    parser.add_argument('--fill', type=float, default=0.9, help='Fraction of the capacity to fill')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--key', default=None, help='Stego key, to measure keyed spreading')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    
+    pixels = int(args.megapixels * 1_000_000)
+    rng = np.random.default_rng(0)
+    carrier = rng.integers(0, 256, size=(pixels, 3), dtype=np.uint8)
+    payload = rng.integers(0, 256, size=int(Steganography().capacity(carrier) * args.fill), dtype=np.uint8).tobytes()
+    print(f"{args.megapixels:g} MP carrier, {len(payload) / 2**20:.1f} MiB payload, "
+          f"{'keyed' if args.key else 'sequential'} layout, {os.cpu_count()} CPUs")
+    print(f"{'threads':>7} {'embed s':>9} {'extract s':>10} {'speedup':>8}")
+    
+    reference = None
+    baseline = None
+    for threads in sorted(set(args.threads)):
+        stego = Steganography(threads=threads)
+        embedded = stego.embed(carrier, payload, args.key)
+        
+        # Every thread count must produce the same bits
+        if reference is None:
+            reference = embedded
+        elif not np.array_equal(reference, embedded):
+            raise SystemExit(f"Output with {threads} threads differs from the first run")
+        if stego.extract(embedded, args.key) != payload:
+            raise SystemExit(f"Round trip failed with {threads} threads")
+        
+        embed_time = best_of(args.repeat, lambda: stego.embed(carrier, payload, args.key))
+        extract_time = best_of(args.repeat, lambda: stego.extract(embedded, args.key))
+        total = embed_time + extract_time
+        baseline = baseline or total
+        print(f"{threads:>7} {embed_time:>9.3f} {extract_time:>10.3f} {baseline / total:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
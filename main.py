@@ -19,6 +19,11 @@ logging.basicConfig(
 )
 
 def main():
+    # Command-line subcommands (e.g. "serve") bypass the GUI
+    if len(sys.argv) > 1:
+        from qstego.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+    
     try:
         from qstego import App
         app = App()
@@ -1,4 +1,11 @@
-from .steganography import Steganography
+from .steganography import Steganography, CarrierTemplate, StegoResult
 from .key_manager import KeyManager
 from .crypto_stego import CryptoStego
-from .app import App 
\ No newline at end of file
+from .aio import AsyncCryptoStego
+
+def __getattr__(name):
+    # Import the GUI lazily so headless tools don't need Tk
+    if name == 'App':
+        from .app import App
+        return App
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,127 @@
+import numpy as np
+
+from .permutation import FeistelPermutation
+
+# Side of the square window local variance is measured over
+WINDOW = 3
+
+# Fraction of the pixels, most textured first, that may carry payload
+POOL_FRACTION = 0.5
+
+
+def _layout(shape):
+    """Pixel count, bands per pixel and colour bands (alpha excluded) of a sample array shape"""
+    if len(shape) < 2:
+        return int(np.prod(shape)), 1, 1
+    pixels = shape[0] * shape[1]
+    bands = int(np.prod(shape[2:])) if len(shape) > 2 else 1
+    # The last band of LA and RGBA carriers is alpha, which is usually flat
+    colour_bands = bands - 1 if bands in (2, 4) else bands
+    return pixels, bands, colour_bands
+
+
+def pool_samples(shape):
+    """Number of samples adaptive embedding can use in a carrier of this shape"""
+    pixels, _, colour_bands = _layout(shape)
+    return int(pixels * POOL_FRACTION) * colour_bands
+
+
+def _luminance(img_array):
+    """Luminance of a carrier with the least significant bits stripped"""
+    if img_array.ndim < 2:
+        img_array = img_array.reshape(1, -1)
+    # 8-bit carriers fit the weighted sum in uint16 and the later box sums
+    # in int32; wider samples need int64 throughout
+    if img_array.dtype.itemsize == 1:
+        weighted, work = np.uint16, np.int32
+    else:
+        weighted = work = np.int64
+    stripped = img_array >> 1
+    if stripped.ndim == 2:
+        return stripped.astype(work)
+    if stripped.shape[2] >= 3:
+        # Integer BT.601 weights keep the result exact on every platform
+        luminance = stripped[..., 0].astype(weighted) * weighted(77)
+        luminance += stripped[..., 1].astype(weighted) * weighted(150)
+        luminance += stripped[..., 2].astype(weighted) * weighted(29)
+        return (luminance >> 8).astype(work)
+    return stripped[..., 0].astype(work)
+
+
+def _box_sum(values, window):
+    """Sums over every window x window block of a padded array"""
+    height = values.shape[0] - window + 1
+    width = values.shape[1] - window + 1
+    # The box is separable: sum rows of the column sums
+    columns = values[:height].copy()
+    for offset in range(1, window):
+        columns += values[offset:offset + height]
+    sums = columns[:, :width].copy()
+    for offset in range(1, window):
+        sums += columns[:, offset:offset + width]
+    return sums
+
+
+def texture_cost(img_array, window=WINDOW):
+    """
+    Local standard deviation of the luminance around every pixel
+    
+    Only the bits above the LSB are looked at, so embedding never changes
+    the map and extraction computes exactly the map embedding used.
+    
+    Args:
+        img_array: Carrier samples as a numpy array
+        window: Odd side length of the neighbourhood
+    
+    Returns:
+        uint8 array with one cost per pixel, higher for busier regions
+        (clipped at 255)
+    """
+    luminance = _luminance(img_array)
+    padded = np.pad(luminance, window // 2, mode='edge')
+    
+    n = window * window
+    sums = _box_sum(padded, window)
+    squares = _box_sum(padded * padded, window)
+    # Integer arithmetic up to here keeps the map identical across platforms;
+    # the square root is correctly rounded by IEEE 754
+    variance = (n * squares - sums * sums) // (n * n)
+    deviation = np.sqrt(variance, dtype=np.float32)
+    return np.minimum(deviation, 255).astype(np.uint8)
+
+
+class AdaptiveLayout:
+    """
+    Payload positions restricted to the most textured pixels
+    
+    Pixels are ranked by texture_cost, busiest first, and the top
+    POOL_FRACTION of them form the pool. Payload bit i goes to the i-th
+    colour sample of the pool in rank order, or to a position spread over the
+    pool by a keyed permutation. Ties are broken by pixel order, so the
+    ranking is fully deterministic.
+    """
+    
+    def __init__(self, img_array, key=None):
+        pixels, self.bands, self.colour_bands = _layout(img_array.shape)
+        pool_pixels = int(pixels * POOL_FRACTION)
+        self.domain = pool_pixels * self.colour_bands
+        
+        cost = texture_cost(img_array).reshape(-1)
+        # A stable sort of 8-bit keys is a single radix pass in NumPy;
+        # inverting the cost puts the busiest pixels first
+        self.ranking = np.argsort(~cost, kind='stable')[:pool_pixels]
+        self.permutation = FeistelPermutation(key, self.domain) if key is not None and self.domain else None
+    
+    def positions(self, start, count):
+        """Flat sample positions for the payload bits start..start+count-1"""
+        if start + count > self.domain:
+            raise ValueError("Requested positions exceed the adaptive pool")
+        if self.permutation is None:
+            # Consecutive bits fill the colour bands of consecutive pool pixels
+            first, last = start // self.colour_bands, -(-(start + count) // self.colour_bands)
+            samples = self.ranking[first:last, None] * self.bands + np.arange(self.colour_bands)
+            offset = start - first * self.colour_bands
+            return samples.reshape(-1)[offset:offset + count]
+        indices = self.permutation.positions(start, count).astype(np.int64)
+        pixels, bands = np.divmod(indices, self.colour_bands)
+        return self.ranking[pixels] * self.bands + bands
@@ -0,0 +1,160 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .crypto_stego import CryptoStego
+
+
+class _Operation:
+    """Executor stage an operation holding a slot is waiting on"""
+    
+    def __init__(self):
+        self.future = None
+
+
+class AsyncCryptoStego:
+    """
+    Asyncio front end for CryptoStego
+    
+    Every CPU-heavy stage (KEM, Argon2, Krypton, image decode, embed/extract
+    and encode) as well as file I/O runs on an executor so the event loop is
+    never blocked. At most max_concurrency operations run at once; further
+    callers wait for a free slot, which gives natural backpressure. Each
+    in-flight Argon2 derivation allocates its full memory cost, so the limit
+    also bounds peak memory.
+    """
+    
+    def __init__(self, keys_dir='keys', executor=None, max_concurrency=2, crypto_stego=None):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        
+        self.crypto_stego = crypto_stego or CryptoStego(keys_dir)
+        self.max_concurrency = max_concurrency
+        
+        # Thread pools work well here: numpy, Argon2 and the KEM release the GIL
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_concurrency * 2,
+            thread_name_prefix='qstego'
+        )
+        
+        self._slots = None
+        self._waiting = 0
+    
+    @property
+    def key_manager(self):
+        return self.crypto_stego.key_manager
+    
+    @property
+    def pending(self):
+        """Number of operations waiting for a free slot"""
+        return self._waiting
+    
+    async def _run(self, operation, func, *args):
+        """Run a blocking callable on the executor as the operation's current stage"""
+        operation.future = self.executor.submit(partial(func, *args))
+        return await asyncio.wrap_future(operation.future)
+    
+    async def _acquire(self):
+        """Wait for a free slot; returns the operation to pass to _run and _release"""
+        # The semaphore must be created inside the running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        return _Operation()
+    
+    def _release(self, operation):
+        """Free the operation's slot once its executor stage has stopped"""
+        future = operation.future
+        if future is None or future.done():
+            self._slots.release()
+            return
+        
+        # A cancelled or timed-out caller leaves its stage running on the
+        # executor; the slot stays taken until the stage ends, so the limit
+        # keeps bounding the work (and Argon2 memory) in flight
+        loop = asyncio.get_running_loop()
+        
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._slots.release)
+            except RuntimeError:
+                # The loop is closed, and the semaphore with it
+                pass
+        
+        future.add_done_callback(release)
+    
+    async def hide_encrypted_message(self, image_path, message, recipient_name, output_path=None, stego_key=None):
+        """
+        Encrypt a message and hide it in an image
+        
+        Args:
+            image_path: Carrier image as a path, bytes, file-like object,
+                PIL image or numpy array
+            message: Text message to hide
+            recipient_name: Name of the recipient's keypair
+            output_path: Optional path or file object to save the output image
+            stego_key: Optional shared secret that spreads the payload over
+                pseudorandom pixel positions
+        
+        Returns:
+            output_path if given; otherwise a "_stego" path next to a path
+            carrier, or the stego image in the same kind as the carrier
+        """
+        operation = await self._acquire()
+        try:
+            crypto_stego = self.crypto_stego
+            message_bytes = crypto_stego.to_bytes(message)
+            encryption_result = await self._run(
+                operation, crypto_stego.key_manager.encrypt_message, recipient_name, message_bytes
+            )
+            payload_bytes = await self._run(
+                operation, crypto_stego.seal_payload, message_bytes, recipient_name, encryption_result
+            )
+            
+            # The same carrier dispatch as the sync API, so WAV recordings,
+            # multi-frame images and carrier templates work here too
+            return await self._run(
+                operation, crypto_stego.stego.hide_message, image_path, payload_bytes, output_path, stego_key
+            )
+        finally:
+            self._release(operation)
+    
+    async def retrieve_encrypted_message(self, stego_image_path, decryptor_name, stego_key=None):
+        """
+        Retrieve and decrypt a message hidden in an image
+        
+        Args:
+            stego_image_path: Steganographic image as a path, bytes,
+                file-like object, PIL image or numpy array
+            decryptor_name: Name of the keypair to use for decryption
+            stego_key: Shared secret used to spread the payload, if any
+        
+        Returns:
+            The decrypted message as bytes
+        """
+        operation = await self._acquire()
+        try:
+            crypto_stego = self.crypto_stego
+            payload_bytes = await self._run(operation, crypto_stego.stego.retrieve_message, stego_image_path, stego_key)
+            
+            # decrypt_payload also derives the per-message key of payloads
+            # that share an encapsulation (see CryptoStego.hide_many)
+            return await self._run(operation, crypto_stego.decrypt_payload, payload_bytes, decryptor_name)
+        finally:
+            self._release(operation)
+    
+    async def close(self):
+        """Shut down the executor if it was created here"""
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
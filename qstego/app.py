@@ -1,4 +1,6 @@
 import os
+import queue
+import threading
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import tkinter as tk
@@ -8,14 +10,28 @@ import pyperclip
 import webbrowser
 from tkinter import ttk
 
+from .audio import is_wav
 from .crypto_stego import CryptoStego
+from .frames import is_multi_frame
+from .image_cache import ImageCache
+from .jobs import JobQueue, HIDE_PATTERN, REVEAL_PATTERN, QUEUED, RUNNING, DONE, FAILED, CANCELLED
+from .widgets import PagedText, TextEditCounter, looks_binary
 
 # Set appearance mode and default color theme
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
 
+# Quiet period after the last edit before the message counter is redrawn
+COUNT_DEBOUNCE_MS = 200
+
+# Shown in the key lists until the keystore has been read
+KEYS_LOADING = "Loading keys..."
+
+# How often the queue view is redrawn while jobs are unfinished
+QUEUE_REFRESH_MS = 250
+
 class App(ctk.CTk):
-    def __init__(self):
+    def __init__(self, keys_dir=None):
         super().__init__()
         
         # Set window title and size
@@ -25,36 +41,45 @@ class App(ctk.CTk):
         
         # Create directories if needed
         self.home_dir = os.path.dirname(os.path.abspath(__file__))
-        self.keys_dir = os.path.join(self.home_dir, "keys")
+        self.keys_dir = keys_dir or os.path.join(self.home_dir, "keys")
         self.images_dir = os.path.join(self.home_dir, "images")
         
         os.makedirs(self.keys_dir, exist_ok=True)
         os.makedirs(self.images_dir, exist_ok=True)
         
-        # Initialize the steganography and crypto components
-        self.crypto_stego = CryptoStego(self.keys_dir)
+        # Initialize the steganography and crypto components; the keystore
+        # is read in the background once the window is up
+        self.crypto_stego = CryptoStego(self.keys_dir, load_keys=False)
+        self.keys_loaded = False
+        self.key_comboboxes = []
+        
+        # Decoded images shared by previews, hiding and revealing
+        self.image_cache = ImageCache()
+        
+        # Batch jobs; the pool is started with the Queue tab
+        self.job_queue = None
         
         # Create main container
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
         
         # Create tabview
-        self.tabview = ctk.CTkTabview(self)
+        self.tabview = ctk.CTkTabview(self, command=self.build_current_tab)
         self.tabview.grid(row=0, column=0, padx=20, pady=20, sticky="nsew")
         
-        # Create tabs
-        self.tabview.add("Hide")
-        self.tabview.add("Reveal")
-        self.tabview.add("QR Codes")
-        self.tabview.add("Keys")
-        self.tabview.add("Help")
-        
-        # Setup each tab
-        self.setup_hide_tab()
-        self.setup_reveal_tab()
-        self.setup_qr_tab()
-        self.setup_keys_tab()
-        self.setup_help_tab()
+        # Create tabs; each one is built the first time it is shown
+        self.tab_builders = {
+            "Hide": self.setup_hide_tab,
+            "Reveal": self.setup_reveal_tab,
+            "QR Codes": self.setup_qr_tab,
+            "Keys": self.setup_keys_tab,
+            "Queue": self.setup_queue_tab,
+            "Help": self.setup_help_tab
+        }
+        self.built_tabs = set()
+        for name in self.tab_builders:
+            self.tabview.add(name)
+        self.build_current_tab()
         
         # Setup tooltips
         self.setup_tooltips()
@@ -72,7 +97,68 @@ class App(ctk.CTk):
         
         # Setup simplified drag and drop support
         self.setup_drag_and_drop()
-
+        
+        # Read the keystore after the first paint has been queued
+        self.after_idle(self.load_keys)
+        
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    
+    def on_close(self):
+        """Cancel queued jobs and close the window; running jobs stop at their next stage"""
+        if self.job_queue is not None:
+            self.job_queue.close(wait=False)
+        self.destroy()
+    
+    def build_current_tab(self):
+        """Build the selected tab if this is the first time it is shown"""
+        name = self.tabview.get()
+        if name not in self.built_tabs:
+            self.built_tabs.add(name)
+            self.tab_builders[name]()
+    
+    def load_keys(self):
+        """Read the keystore on a worker thread, then fill in the key lists"""
+        def done(_):
+            self.keys_loaded = True
+            self.update_key_lists()
+        
+        def fail(e):
+            self.keys_loaded = True
+            self.update_key_lists()
+            messagebox.showerror("Error", f"Failed to load keys: {str(e)}")
+        
+        self.run_in_background(self.crypto_stego.key_manager.load_keypairs, done, fail)
+    
+    def keys_ready(self):
+        """Whether the keystore has been read; asks the user to wait if not"""
+        if not self.keys_loaded:
+            messagebox.showinfo("Please Wait", "Keys are still loading. Try again in a moment.")
+        return self.keys_loaded
+    
+    def track_key_combobox(self, combobox, variable):
+        """Keep a key selection combobox in step with the keystore"""
+        self.key_comboboxes.append((combobox, variable))
+        self._update_key_combobox(combobox, variable, self.crypto_stego.key_manager.get_keypair_names())
+    
+    def _update_key_combobox(self, combobox, variable, key_names):
+        if not self.keys_loaded:
+            combobox.configure(values=[], state="disabled")
+            variable.set(KEYS_LOADING)
+            return
+        combobox.configure(values=key_names, state="normal")
+        if variable.get() == KEYS_LOADING:
+            variable.set("")
+    
+    def update_key_lists(self):
+        """Show the current keys in every key list that has been built"""
+        if "Keys" in self.built_tabs:
+            self.update_keys_listbox()
+        if "Queue" in self.built_tabs:
+            self.update_queue_keys()
+        key_names = self.crypto_stego.key_manager.get_keypair_names()
+        for combobox, variable in self.key_comboboxes:
+            self._update_key_combobox(combobox, variable, key_names)
+    
     def setup_drag_and_drop(self):
         """Setup basic drop functionality for images"""
         # On Windows, we can use built-in drag and drop functionality
@@ -150,8 +236,14 @@ class App(ctk.CTk):
         ctk.CTkLabel(message_frame, textvariable=self.hide_char_count_var, 
                     font=("Helvetica", 10), anchor="e").pack(padx=10, fill=tk.X)
         
-        # Update character count when text changes
-        self.hide_message_text.bind("<<Modified>>", self.update_hide_char_count)
+        # Counts follow each edit; the label is redrawn once typing pauses
+        self.hide_attachment_path = None
+        self.hide_attachment_size = 0
+        self._hide_count_job = None
+        self.hide_text_counter = TextEditCounter(
+            self.hide_message_text._textbox,
+            on_change=self.schedule_hide_char_count
+        )
         
         # Recipient selection
         recipient_frame = ctk.CTkFrame(right_frame)
@@ -168,11 +260,12 @@ class App(ctk.CTk):
             height=30
         )
         self.hide_recipient_combobox.pack(pady=10)
+        self.track_key_combobox(self.hide_recipient_combobox, self.hide_recipient_var)
         
         refresh_keys_btn = ctk.CTkButton(
             recipient_frame, 
             text="Refresh Keys", 
-            command=self.refresh_keys,
+            command=self.reload_keys,
             width=100,
             height=30
         )
@@ -207,7 +300,25 @@ class App(ctk.CTk):
             command=self.paste_to_hide_message,
             width=170
         ).pack(side=tk.LEFT, padx=5)
-
+        
+        # File attachment instead of typed text
+        attach_frame = ctk.CTkFrame(right_frame)
+        attach_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        ctk.CTkButton(
+            attach_frame,
+            text="Attach File",
+            command=self.attach_hide_file,
+            width=120
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ctk.CTkButton(
+            attach_frame,
+            text="Remove Attachment",
+            command=self.remove_hide_attachment,
+            width=170
+        ).pack(side=tk.LEFT, padx=5)
+    
     def setup_reveal_tab(self):
         """Setup UI for revealing hidden messages"""
         reveal_tab = self.tabview.tab("Reveal")
@@ -260,6 +371,7 @@ class App(ctk.CTk):
             height=30
         )
         self.reveal_key_combobox.pack(pady=10)
+        self.track_key_combobox(self.reveal_key_combobox, self.reveal_key_var)
         
         key_button_frame = ctk.CTkFrame(key_frame)
         key_button_frame.pack(fill=tk.X, pady=5)
@@ -267,7 +379,7 @@ class App(ctk.CTk):
         refresh_keys_btn = ctk.CTkButton(
             key_button_frame, 
             text="Refresh Keys", 
-            command=self.refresh_keys,
+            command=self.reload_keys,
             width=120
         )
         refresh_keys_btn.pack(side=tk.LEFT, padx=5)
@@ -290,9 +402,36 @@ class App(ctk.CTk):
         
         ctk.CTkLabel(message_frame, text="Revealed Message", font=("Helvetica", 16, "bold")).pack(pady=(10, 5))
         
-        self.revealed_message_text = ctk.CTkTextbox(message_frame, width=300, height=200)
+        self.revealed_message_text = ctk.CTkTextbox(message_frame, width=300, height=200, state="disabled")
         self.revealed_message_text.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
         
+        # The revealed payload stays as bytes; the textbox only holds the current page
+        self.revealed_payload = None
+        self.revealed_attachment = None
+        self.revealed_pages = None
+        self.revealed_page = 0
+        
+        page_frame = ctk.CTkFrame(message_frame)
+        page_frame.pack(fill=tk.X, padx=10)
+        
+        ctk.CTkButton(
+            page_frame,
+            text="< Previous",
+            command=lambda: self.show_revealed_page(self.revealed_page - 1),
+            width=100
+        ).pack(side=tk.LEFT, padx=5)
+        
+        self.revealed_page_var = tk.StringVar(value="")
+        ctk.CTkLabel(page_frame, textvariable=self.revealed_page_var,
+                    font=("Helvetica", 10)).pack(side=tk.LEFT, expand=True)
+        
+        ctk.CTkButton(
+            page_frame,
+            text="Next >",
+            command=lambda: self.show_revealed_page(self.revealed_page + 1),
+            width=100
+        ).pack(side=tk.RIGHT, padx=5)
+        
         # Action buttons
         action_frame = ctk.CTkFrame(message_frame)
         action_frame.pack(fill=tk.X, pady=10)
@@ -314,7 +453,7 @@ class App(ctk.CTk):
         ctk.CTkButton(
             action_frame,
             text="Clear",
-            command=lambda: self.revealed_message_text.delete("1.0", tk.END),
+            command=self.clear_revealed_message,
             width=100
         ).pack(side=tk.LEFT, padx=5)
         
@@ -347,6 +486,7 @@ class App(ctk.CTk):
             width=200
         )
         self.qr_gen_combobox.pack(side=tk.LEFT, padx=5)
+        self.track_key_combobox(self.qr_gen_combobox, self.qr_gen_key_var)
         
         # QR code display
         self.qr_image_label = ctk.CTkLabel(left_frame, text="QR Code will appear here", width=300, height=300)
@@ -395,10 +535,18 @@ class App(ctk.CTk):
         )
         scan_qr_btn.pack(pady=10)
         
+        # Folder scan button
+        scan_folder_btn = ctk.CTkButton(
+            qr_import_frame, 
+            text="Scan Folder of QR Codes", 
+            command=self.scan_qr_folder
+        )
+        scan_folder_btn.pack(pady=10)
+        
         # Scan status
         self.qr_scan_status_var = tk.StringVar(value="No QR code scanned yet")
         ctk.CTkLabel(qr_import_frame, textvariable=self.qr_scan_status_var).pack(pady=10)
-
+    
     def setup_keys_tab(self):
         """Setup UI for key management with improved user experience"""
         keys_tab = self.tabview.tab("Keys")
@@ -461,7 +609,7 @@ class App(ctk.CTk):
         refresh_btn = ctk.CTkButton(
             btn_frame, 
             text="Refresh List", 
-            command=self.refresh_keys
+            command=self.reload_keys
         )
         refresh_btn.pack(side=tk.LEFT, padx=5)
         
@@ -545,6 +693,7 @@ class App(ctk.CTk):
             width=200
         )
         self.export_key_combobox.pack(side=tk.LEFT, padx=5)
+        self.track_key_combobox(self.export_key_combobox, self.export_key_var)
         
         export_btn = ctk.CTkButton(
             export_frame, 
@@ -607,6 +756,7 @@ class App(ctk.CTk):
             width=200
         )
         self.export_file_combobox.pack(side=tk.LEFT, padx=5)
+        self.track_key_combobox(self.export_file_combobox, self.export_file_key_var)
         
         export_file_btn = ctk.CTkButton(
             file_export_frame,
@@ -619,6 +769,123 @@ class App(ctk.CTk):
         ctk.CTkLabel(file_export_frame, textvariable=self.export_file_status_var,
                     wraplength=300).pack(pady=10)
         
+    def setup_queue_tab(self):
+        """Setup UI for queueing many hide or reveal jobs"""
+        queue_tab = self.tabview.tab("Queue")
+        
+        self.job_queue = JobQueue(self.crypto_stego)
+        self.queue_sources = []
+        self.queue_key_vars = {}
+        self.queue_row_versions = {}
+        self._queue_refresh_job = None
+        
+        # Top - what to add to the queue
+        form_frame = ctk.CTkFrame(queue_tab)
+        form_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        # Left column - operation, images and output
+        source_frame = ctk.CTkFrame(form_frame)
+        source_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        self.queue_mode_var = tk.StringVar(value="Hide")
+        ctk.CTkSegmentedButton(
+            source_frame,
+            values=["Hide", "Reveal"],
+            variable=self.queue_mode_var,
+            command=self.update_queue_mode
+        ).pack(pady=(10, 5))
+        
+        images_row = ctk.CTkFrame(source_frame)
+        images_row.pack(fill=tk.X, padx=10, pady=5)
+        
+        ctk.CTkButton(
+            images_row,
+            text="Select Images",
+            command=self.select_queue_images,
+            width=120
+        ).pack(side=tk.LEFT, padx=5)
+        
+        self.queue_sources_var = tk.StringVar(value="No images selected")
+        ctk.CTkLabel(images_row, textvariable=self.queue_sources_var,
+                    font=("Helvetica", 10)).pack(side=tk.LEFT, padx=5)
+        
+        ctk.CTkLabel(source_frame, text="Message (hide only)", font=("Helvetica", 12, "bold")).pack(pady=(5, 0))
+        self.queue_message_text = ctk.CTkTextbox(source_frame, height=70)
+        self.queue_message_text.pack(fill=tk.X, padx=10, pady=5)
+        
+        output_row = ctk.CTkFrame(source_frame)
+        output_row.pack(fill=tk.X, padx=10, pady=5)
+        
+        ctk.CTkLabel(output_row, text="Output:").pack(side=tk.LEFT, padx=5)
+        self.queue_output_var = tk.StringVar(value=os.path.join(self.images_dir, HIDE_PATTERN))
+        ctk.CTkEntry(output_row, textvariable=self.queue_output_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ctk.CTkButton(
+            output_row,
+            text="Browse",
+            command=self.select_queue_output_dir,
+            width=80
+        ).pack(side=tk.LEFT, padx=5)
+        
+        ctk.CTkLabel(source_frame, text="Fields: {stem} {ext} {name} {key} {index}; reveal also {filename}",
+                    font=("Helvetica", 10, "italic"), text_color="gray").pack()
+        
+        # Right column - keys to use, one job per image and key
+        keys_frame = ctk.CTkFrame(form_frame)
+        keys_frame.pack(side=tk.RIGHT, fill=tk.BOTH, padx=10, pady=10)
+        
+        self.queue_keys_label_var = tk.StringVar(value="Recipient Keys")
+        ctk.CTkLabel(keys_frame, textvariable=self.queue_keys_label_var,
+                    font=("Helvetica", 14, "bold")).pack(pady=(10, 5))
+        
+        self.queue_keys_frame = ctk.CTkScrollableFrame(keys_frame, width=220, height=150)
+        self.queue_keys_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.update_queue_keys()
+        
+        ctk.CTkButton(
+            keys_frame,
+            text="Add to Queue",
+            command=self.enqueue_jobs,
+            fg_color=("green", "dark green"),
+            hover_color=("dark green", "forest green"),
+            font=("Helvetica", 14, "bold"),
+            height=40
+        ).pack(pady=10)
+        
+        # Job list
+        list_frame = ctk.CTkFrame(queue_tab)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
+        
+        columns = ("job", "kind", "image", "key", "status", "progress", "result")
+        self.queue_tree = ttk.Treeview(list_frame, columns=columns, show="headings", selectmode="extended")
+        for column, heading, width in zip(
+            columns,
+            ("#", "Operation", "Image", "Key", "Status", "Progress", "Output / Error"),
+            (50, 80, 200, 120, 100, 70, 400)
+        ):
+            self.queue_tree.heading(column, text=heading)
+            self.queue_tree.column(column, width=width, stretch=column in ("image", "result"))
+        
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.queue_tree.yview)
+        self.queue_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.queue_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Job actions and aggregate progress
+        action_frame = ctk.CTkFrame(queue_tab)
+        action_frame.pack(fill=tk.X, padx=10, pady=(0, 10))
+        
+        for text, command in (
+            ("Cancel Selected", self.cancel_selected_jobs),
+            ("Retry Selected", self.retry_selected_jobs),
+            ("Cancel All", self.cancel_all_jobs),
+            ("Clear Finished", self.clear_finished_jobs)
+        ):
+            ctk.CTkButton(action_frame, text=text, command=command, width=130).pack(side=tk.LEFT, padx=5)
+        
+        self.queue_status_var = tk.StringVar(value="Queue is empty")
+        ctk.CTkLabel(action_frame, textvariable=self.queue_status_var,
+                    font=("Helvetica", 11)).pack(side=tk.RIGHT, padx=10)
+    
     def setup_help_tab(self):
         """Setup help and about information"""
         help_tab = self.tabview.tab("Help")
@@ -656,6 +923,7 @@ class App(ctk.CTk):
             "• Reveal hidden messages with your private key",
             "• Generate and manage quantum-safe keys",
             "• Share public keys via text, file, or QR code",
+            "• Queue many images for hiding or revealing in the background",
             "• Drag-and-drop support for images",
             "• Modern, easy-to-use interface"
         ]
@@ -672,10 +940,18 @@ class App(ctk.CTk):
         ctk.CTkLabel(help_scroll, text="Hiding a Message:", 
                    font=("Helvetica", 14, "bold")).pack(pady=(10, 5), anchor="w")
         
+        queue_steps = [
+            "1. Go to the 'Queue' tab and choose 'Hide' or 'Reveal'",
+            "2. Click 'Select Images' and tick one or more keys",
+            "3. For hiding, enter the message; set the output path pattern",
+            "4. Click 'Add to Queue'; one job is added per image and key",
+            "5. Select jobs to cancel or retry them; finished jobs can be cleared"
+        ]
+        
         hide_steps = [
             "1. Go to the 'Hide' tab",
             "2. Select or drag an image to use as the carrier",
-            "3. Enter the message you want to hide",
+            "3. Enter the message you want to hide, or click 'Attach File' to hide a file",
             "4. Select a recipient's public key from the dropdown",
             "5. Click 'Hide Message' to create the steganographic image"
         ]
@@ -700,6 +976,14 @@ class App(ctk.CTk):
             ctk.CTkLabel(help_scroll, text=step, 
                        justify="left").pack(pady=2, anchor="w")
         
+        # Queue tab instructions
+        ctk.CTkLabel(help_scroll, text="Processing Many Images:", 
+                   font=("Helvetica", 14, "bold")).pack(pady=(10, 5), anchor="w")
+        
+        for step in queue_steps:
+            ctk.CTkLabel(help_scroll, text=step, 
+                       justify="left").pack(pady=2, anchor="w")
+        
         # Keys tab instructions
         ctk.CTkLabel(help_scroll, text="Managing Keys:", 
                    font=("Helvetica", 14, "bold")).pack(pady=(10, 5), anchor="w")
@@ -761,6 +1045,30 @@ class App(ctk.CTk):
         # This could be expanded with a proper tooltip system
         pass
         
+    def run_in_background(self, task, on_success, on_error=None):
+        """Run task on a worker thread and hand its result to a callback on the UI thread"""
+        results = queue.Queue(maxsize=1)
+        
+        def worker():
+            try:
+                results.put((True, task()))
+            except Exception as e:
+                results.put((False, e))
+        
+        def poll():
+            try:
+                succeeded, value = results.get_nowait()
+            except queue.Empty:
+                self.after(50, poll)
+                return
+            if succeeded:
+                on_success(value)
+            elif on_error is not None:
+                on_error(value)
+        
+        threading.Thread(target=worker, daemon=True).start()
+        self.after(50, poll)
+        
     def update_keys_listbox(self):
         """Update the keys listbox with current keys"""
         # Clear existing listbox frame contents
@@ -771,6 +1079,12 @@ class App(ctk.CTk):
         scrollable_frame = ctk.CTkScrollableFrame(self.keys_listbox_frame)
         scrollable_frame.pack(fill=tk.BOTH, expand=True)
         
+        self.key_var = tk.StringVar(value="")
+        if not self.keys_loaded:
+            ctk.CTkLabel(scrollable_frame, text=KEYS_LOADING,
+                       font=("Helvetica", 12, "italic"), text_color="gray").pack(pady=20)
+            return
+        
         # Get key names
         key_names = self.crypto_stego.key_manager.get_keypair_names()
         
@@ -817,25 +1131,60 @@ class App(ctk.CTk):
     
     def refresh_keys(self):
         """Refresh key lists in UI"""
-        self.crypto_stego.key_manager.load_keypairs()
-        self.update_keys_listbox()
+        # The background load fills the lists once it is done
+        if not self.keys_loaded:
+            return
+        self.crypto_stego.key_manager.refresh_keypairs()
+        self.update_key_lists()
+    
+    def reload_keys(self):
+        """Re-read the whole keystore, including key files copied in by hand"""
+        if not self.keys_loaded:
+            return
         
-        # Update comboboxes
-        key_names = self.crypto_stego.key_manager.get_keypair_names()
-        self.hide_recipient_combobox.configure(values=key_names)
-        self.reveal_key_combobox.configure(values=key_names)
-        self.export_key_combobox.configure(values=key_names)
-        self.export_file_combobox.configure(values=key_names)
-        self.qr_gen_combobox.configure(values=key_names)
+        def fail(e):
+            messagebox.showerror("Error", f"Failed to load keys: {str(e)}")
+        
+        self.run_in_background(
+            self.crypto_stego.key_manager.load_keypairs,
+            lambda _: self.update_key_lists(),
+            fail
+        )
+    
+    def schedule_hide_char_count(self):
+        """Redraw the hide message counter after the edits stop for a moment"""
+        if self._hide_count_job is not None:
+            self.after_cancel(self._hide_count_job)
+        self._hide_count_job = self.after(COUNT_DEBOUNCE_MS, self.update_hide_char_count)
     
     def update_hide_char_count(self, event=None):
-        """Update character count for hide message textbox"""
-        # Get text content
-        message = self.hide_message_text.get("1.0", tk.END).strip()
-        # Update count label
-        self.hide_char_count_var.set(f"Characters: {len(message)}")
-        # Reset modified flag
-        self.hide_message_text.edit_modified(False)
+        """Update character and byte count for hide message textbox, or describe the attachment"""
+        self._hide_count_job = None
+        if self.hide_attachment_path:
+            name = os.path.basename(self.hide_attachment_path)
+            self.hide_char_count_var.set(f"Attachment: {name} ({self.hide_attachment_size:,} bytes)")
+            return
+        counter = self.hide_text_counter
+        self.hide_char_count_var.set(f"Characters: {counter.chars:,} ({counter.bytes:,} bytes)")
+    
+    def attach_hide_file(self):
+        """Choose a file to hide instead of the typed message"""
+        file_path = filedialog.askopenfilename(title="Select File to Hide")
+        if not file_path:
+            return
+        
+        self.hide_attachment_path = file_path
+        self.hide_attachment_size = os.path.getsize(file_path)
+        # The typed message is kept but not used while a file is attached
+        self.hide_message_text.configure(state="disabled")
+        self.update_hide_char_count()
+    
+    def remove_hide_attachment(self):
+        """Go back to hiding the typed message"""
+        self.hide_attachment_path = None
+        self.hide_attachment_size = 0
+        self.hide_message_text.configure(state="normal")
+        self.update_hide_char_count()
     
     def paste_to_hide_message(self):
         """Paste clipboard content to hide message textbox"""
@@ -852,7 +1201,7 @@ class App(ctk.CTk):
         """Select an image for hiding a message"""
         image_path = filedialog.askopenfilename(
             title="Select Carrier Image",
-            filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp")]
+            filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.gif")]
         )
         
         if image_path:
@@ -863,7 +1212,7 @@ class App(ctk.CTk):
         """Select an image to reveal a hidden message"""
         image_path = filedialog.askopenfilename(
             title="Select Steganographic Image",
-            filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp")]
+            filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.gif")]
         )
         
         if image_path:
@@ -873,9 +1222,8 @@ class App(ctk.CTk):
     def update_image_preview(self, image_path, preview_label):
         """Update image preview for the given label"""
         try:
-            # Open and resize image for preview
-            image = Image.open(image_path)
-            image.thumbnail((300, 300))
+            # Decode once and reuse the cached thumbnail
+            image = self.image_cache.preview(image_path)
             
             # Convert to PhotoImage
             photo = ImageTk.PhotoImage(image)
@@ -886,11 +1234,20 @@ class App(ctk.CTk):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load image: {str(e)}")
     
+    @staticmethod
+    def needs_whole_file(path):
+        """Whether a carrier must be read from its file: the image cache only holds frame 0 of an image"""
+        return is_wav(path) or is_multi_frame(path)
+    
     def hide_message(self):
         """Hide an encrypted message in the selected image"""
+        if not self.keys_ready():
+            return
+        
         image_path = self.hide_image_path_var.get()
         recipient = self.hide_recipient_var.get()
-        message = self.hide_message_text.get("1.0", tk.END).strip()
+        attachment = self.hide_attachment_path
+        message = None if attachment else self.hide_message_text.get("1.0", tk.END).strip()
         
         if not image_path:
             messagebox.showerror("Error", "Please select a carrier image.")
@@ -900,52 +1257,74 @@ class App(ctk.CTk):
             messagebox.showerror("Error", "Please select a recipient key.")
             return
         
-        if not message:
-            messagebox.showerror("Error", "Please enter a message to hide.")
+        if not attachment and not message:
+            messagebox.showerror("Error", "Please enter a message to hide or attach a file.")
             return
         
-        # Ask user where to save the output image
+        # Ask user where to save the output image; recordings stay WAV files
+        output_ext = ".wav" if is_wav(image_path) else ".png"
         file_path = filedialog.asksaveasfilename(
             title="Save Steganographic Image",
-            defaultextension=".png",
-            filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"), ("All files", "*.*")],
+            defaultextension=output_ext,
+            filetypes=[("WAV files", "*.wav")] if is_wav(image_path) else
+                      [("PNG files", "*.png"), ("TIFF files", "*.tif *.tiff"), ("JPEG files", "*.jpg"), ("All files", "*.*")],
             initialdir=self.images_dir,
-            initialfile=os.path.basename(image_path).split('.')[0] + "_stego.png"
+            initialfile=os.path.basename(image_path).split('.')[0] + "_stego" + output_ext
         )
         
         if not file_path:
             return  # User cancelled
         
-        try:
-            # Show loading indicator
-            self.loading_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
-            self.update()  # Force UI update
-            
-            # Hide the message
-            result_path = self.crypto_stego.hide_encrypted_message(
-                image_path,
-                message,
-                recipient,
-                file_path
-            )
+        # Show loading indicator
+        self.loading_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        
+        def task():
+            # Animations, multi-page images and recordings go through the
+            # frame-by-frame and streaming embedders
+            if self.needs_whole_file(image_path):
+                if attachment:
+                    return self.crypto_stego.hide_encrypted_file(image_path, attachment, recipient, file_path)
+                return self.crypto_stego.hide_encrypted_message(image_path, message, recipient, file_path)
             
-            # Update preview with the stego image
-            self.update_image_preview(result_path, self.hide_image_preview)
+            # Hide the message or stream the attached file into the cached carrier samples
+            carrier = self.image_cache.array(image_path)
+            if attachment:
+                stego_array = self.crypto_stego.hide_encrypted_file(carrier, attachment, recipient)
+            else:
+                stego_array = self.crypto_stego.hide_encrypted_message(carrier, message, recipient)
+            result_path = self.crypto_stego.stego.save_image(stego_array, file_path)
             
+            # Lossless output holds exactly these samples, so skip decoding it again
+            ext = os.path.splitext(result_path)[1].lower()
+            if self.crypto_stego.stego.keeps_samples(Image.registered_extensions().get(ext), stego_array):
+                self.image_cache.put(result_path, stego_array)
+            return result_path
+        
+        def done(result_path):
             # Hide loading indicator
             self.loading_label.place_forget()
             
+            # Update preview with the stego image
+            if not is_wav(result_path):
+                self.update_image_preview(result_path, self.hide_image_preview)
+            
             messagebox.showinfo(
                 "Success", 
                 f"Message hidden successfully!\nSaved to: {result_path}"
             )
-        except Exception as e:
+        
+        def fail(e):
             # Hide loading indicator
             self.loading_label.place_forget()
             messagebox.showerror("Error", f"Failed to hide message: {str(e)}")
+        
+        self.run_in_background(task, done, fail)
     
     def reveal_message(self):
         """Reveal a hidden message from the selected image"""
+        if not self.keys_ready():
+            return
+        
         image_path = self.reveal_image_path_var.get()
         key_name = self.reveal_key_var.get()
         
@@ -957,54 +1336,107 @@ class App(ctk.CTk):
             messagebox.showerror("Error", "Please select a decryption key.")
             return
         
-        try:
-            # Show loading indicator
-            self.loading_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
-            self.update()  # Force UI update
-            
-            # Reveal the message
-            decrypted_message = self.crypto_stego.retrieve_encrypted_message(
-                image_path,
-                key_name
-            )
-            
-            # Display the revealed message
-            self.revealed_message_text.delete("1.0", tk.END)
-            self.revealed_message_text.insert("1.0", decrypted_message.decode('utf-8'))
-            
+        # Show loading indicator
+        self.loading_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+        
+        def done(result):
             # Hide loading indicator
             self.loading_label.place_forget()
             
-            messagebox.showinfo("Success", "Message revealed successfully!")
-        except Exception as e:
+            decrypted_message, attachment = result
+            self.show_revealed_payload(decrypted_message, attachment)
+            
+            if self.revealed_pages is None:
+                messagebox.showinfo("Success", "Revealed a file. Use 'Save to File' to store it.")
+            else:
+                messagebox.showinfo("Success", "Message revealed successfully!")
+        
+        def fail(e):
             # Hide loading indicator
             self.loading_label.place_forget()
             messagebox.showerror("Error", f"Failed to reveal message: {str(e)}")
+        
+        def task():
+            carrier = image_path if self.needs_whole_file(image_path) else self.image_cache.array(image_path)
+            return self.crypto_stego.retrieve_encrypted_payload(carrier, key_name)
+        
+        # Reveal the message
+        self.run_in_background(task, done, fail)
     
-    def save_revealed_message(self):
-        """Save revealed message to a text file"""
-        message = self.revealed_message_text.get("1.0", tk.END).strip()
+    def show_revealed_payload(self, payload, attachment=None):
+        """Keep a revealed payload as bytes and show its first page, or a summary for files"""
+        self.revealed_payload = payload
+        self.revealed_attachment = attachment
+        # Text files are paged like messages
+        content_type = attachment.get('content_type') if attachment else None
+        if (attachment is None or (content_type or '').startswith('text/')) and not looks_binary(payload):
+            self.revealed_pages = PagedText(payload)
+            self.show_revealed_page(0)
+            return
         
-        if not message:
+        # Files are not rendered; they are saved straight from the buffer
+        self.revealed_pages = None
+        name = attachment.get('filename') if attachment else None
+        summary = f"File: {name or 'binary data'}\nType: {content_type or 'unknown'}\nSize: {len(payload):,} bytes"
+        self._set_revealed_text(summary)
+        self.revealed_page_var.set("")
+    
+    def show_revealed_page(self, index):
+        """Render one page of a revealed text message"""
+        if self.revealed_pages is None:
+            return
+        index = max(0, min(index, len(self.revealed_pages) - 1))
+        self.revealed_page = index
+        self._set_revealed_text(self.revealed_pages.page(index))
+        self.revealed_page_var.set(f"Page {index + 1} of {len(self.revealed_pages)}")
+    
+    def _set_revealed_text(self, text):
+        self.revealed_message_text.configure(state="normal")
+        self.revealed_message_text.delete("1.0", tk.END)
+        self.revealed_message_text.insert("1.0", text)
+        self.revealed_message_text.configure(state="disabled")
+    
+    def clear_revealed_message(self):
+        """Forget the revealed payload"""
+        self.revealed_payload = None
+        self.revealed_attachment = None
+        self.revealed_pages = None
+        self._set_revealed_text("")
+        self.revealed_page_var.set("")
+    
+    def save_revealed_message(self):
+        """Save the revealed message or file, written directly from the decrypted bytes"""
+        if not self.revealed_payload:
             messagebox.showerror("Error", "No message to save.")
             return
         
-        file_path = filedialog.asksaveasfilename(
-            title="Save Message",
-            defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
-        )
+        name = (self.revealed_attachment or {}).get('filename')
+        if self.revealed_attachment is None:
+            file_path = filedialog.asksaveasfilename(
+                title="Save Message",
+                defaultextension=".txt",
+                filetypes=[("Text files", "*.txt"), ("All files", "*.*")]
+            )
+        else:
+            file_path = filedialog.asksaveasfilename(
+                title="Save File",
+                initialfile=os.path.basename(name) if name else "",
+                filetypes=[("All files", "*.*")]
+            )
         
         if file_path:
             try:
-                with open(file_path, 'w', encoding='utf-8') as f:
-                    f.write(message)
+                with open(file_path, 'wb') as f:
+                    f.write(self.revealed_payload)
                 messagebox.showinfo("Success", f"Message saved to {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save message: {str(e)}")
     
     def generate_keypair(self):
         """Generate a new quantum-safe keypair"""
+        if not self.keys_ready():
+            return
+        
         key_name = self.new_key_name_var.get().strip()
         
         if not key_name:
@@ -1036,6 +1468,9 @@ class App(ctk.CTk):
     
     def import_public_key(self):
         """Import a public key from text"""
+        if not self.keys_ready():
+            return
+        
         key_name = self.import_key_name_var.get().strip()
         key_text = self.import_key_text.get("1.0", tk.END).strip()
         
@@ -1073,6 +1508,9 @@ class App(ctk.CTk):
     
     def export_public_key(self):
         """Export public key to text"""
+        if not self.keys_ready():
+            return
+        
         key_name = self.export_key_var.get()
         
         if not key_name:
@@ -1096,17 +1534,25 @@ class App(ctk.CTk):
     
     def import_key_from_file(self):
         """Import a key from a file"""
+        if not self.keys_ready():
+            return
+        
         file_path = filedialog.askopenfilename(
             title="Select Key File",
-            filetypes=[("Key files", "*.qkey"), ("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("Key files", "*.qkey *.qkeyring"), ("JSON files", "*.json"), ("All files", "*.*")]
         )
         
         if not file_path:
             return
             
         try:
-            keypair = self.crypto_stego.key_manager.import_public_key_from_file(file_path)
-            self.import_file_status_var.set(f"Successfully imported key: {keypair['name']}")
+            if file_path.lower().endswith('.qkeyring'):
+                # Keyring bundles hold many public keys
+                keypairs = self.crypto_stego.key_manager.import_keyring(file_path)
+                self.import_file_status_var.set(f"Successfully imported {len(keypairs)} keys")
+            else:
+                keypair = self.crypto_stego.key_manager.import_public_key_from_file(file_path)
+                self.import_file_status_var.set(f"Successfully imported key: {keypair['name']}")
             self.refresh_keys()
         except Exception as e:
             self.import_file_status_var.set(f"Error: {str(e)}")
@@ -1114,6 +1560,9 @@ class App(ctk.CTk):
     
     def export_key_to_file(self):
         """Export a key to a file"""
+        if not self.keys_ready():
+            return
+        
         key_name = self.export_file_key_var.get()
         
         if not key_name:
@@ -1138,15 +1587,24 @@ class App(ctk.CTk):
     
     def generate_qr_code(self):
         """Generate QR code for selected key"""
+        if not self.keys_ready():
+            return
+        
         key_name = self.qr_gen_key_var.get()
         
         if not key_name:
             messagebox.showerror("Error", "Please select a key.")
             return
             
-        try:
-            # Generate QR code
-            qr_image = self.crypto_stego.key_manager.generate_key_qr_code(key_name)
+        # Only the most recent request may update the display
+        self.qr_request = getattr(self, 'qr_request', 0) + 1
+        request = self.qr_request
+        self.qr_image_label.configure(image=None, text="Generating QR code...")
+        self.qr_image_label.image = None
+        
+        def show(qr_image):
+            if request != self.qr_request:
+                return
             
             # Convert to PhotoImage for display
             photo = ImageTk.PhotoImage(qr_image)
@@ -1157,9 +1615,18 @@ class App(ctk.CTk):
             # Update label
             self.qr_image_label.configure(image=photo, text="")
             self.qr_image_label.image = photo  # Keep a reference
-            
-        except Exception as e:
+        
+        def fail(e):
+            if request != self.qr_request:
+                return
+            self.qr_image_label.configure(text="QR Code will appear here")
             messagebox.showerror("Error", f"Failed to generate QR code: {str(e)}")
+        
+        # Rendering happens off the UI thread
+        self.run_in_background(
+            lambda: self.crypto_stego.key_manager.generate_key_qr_code(key_name),
+            show, fail
+        )
     
     def save_qr_code(self):
         """Save the generated QR code as an image"""
@@ -1182,6 +1649,9 @@ class App(ctk.CTk):
     
     def select_qr_image(self):
         """Select a QR code image for key import"""
+        if not self.keys_ready():
+            return
+        
         image_path = filedialog.askopenfilename(
             title="Select QR Code Image",
             filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp")]
@@ -1199,8 +1669,8 @@ class App(ctk.CTk):
                 self.qr_scan_preview.configure(image=photo, text="")
                 self.qr_scan_preview.image = photo
                 
-                # Try to read the QR code
-                keypair = self.crypto_stego.key_manager.read_key_from_qr_code(image)
+                # Try to read the QR code; the path lets JPEGs decode at reduced size
+                keypair = self.crypto_stego.key_manager.read_key_from_qr_code(image_path)
                 
                 self.qr_scan_status_var.set(f"Successfully imported key: {keypair['name']}")
                 self.refresh_keys()
@@ -1209,8 +1679,42 @@ class App(ctk.CTk):
                 self.qr_scan_status_var.set(f"Error: {str(e)}")
                 messagebox.showerror("Error", f"Failed to read QR code: {str(e)}")
     
+    def scan_qr_folder(self):
+        """Import every QR code key found in a folder of images"""
+        if not self.keys_ready():
+            return
+        
+        folder = filedialog.askdirectory(title="Select Folder of QR Code Images")
+        if not folder:
+            return
+        
+        self.qr_scan_status_var.set("Scanning QR codes...")
+        
+        def done(result):
+            self.refresh_keys()
+            status = f"Imported {len(result['imported'])} keys from {result['files']} images"
+            if result['skipped']:
+                status += f", {result['skipped']} already known"
+            if result['failed']:
+                status += f", {len(result['failed'])} unreadable"
+            if result['incomplete']:
+                status += f", {len(result['incomplete'])} incomplete"
+            self.qr_scan_status_var.set(status)
+        
+        def fail(e):
+            self.qr_scan_status_var.set(f"Error: {str(e)}")
+            messagebox.showerror("Error", f"Failed to scan QR codes: {str(e)}")
+        
+        self.run_in_background(
+            lambda: self.crypto_stego.key_manager.import_keys_from_qr_codes([folder]),
+            done, fail
+        )
+    
     def delete_selected_key(self):
         """Delete the selected key from the list"""
+        if not self.keys_ready():
+            return
+        
         key_name = self.key_var.get()
         
         if not key_name:
@@ -1236,11 +1740,15 @@ class App(ctk.CTk):
     
     def copy_revealed_message(self):
         """Copy revealed message to clipboard"""
-        message = self.revealed_message_text.get("1.0", tk.END).strip()
+        if not self.revealed_payload:
+            return
         
-        if message:
-            pyperclip.copy(message)
-            messagebox.showinfo("Success", "Message copied to clipboard!")
+        if self.revealed_pages is None:
+            messagebox.showerror("Error", "The revealed payload is a file. Use 'Save to File' instead.")
+            return
+        
+        pyperclip.copy(self.revealed_payload.decode('utf-8', errors='replace'))
+        messagebox.showinfo("Success", "Message copied to clipboard!")
     
     def copy_exported_key(self):
         """Copy exported key to clipboard"""
@@ -1248,4 +1756,166 @@ class App(ctk.CTk):
         
         if key:
             pyperclip.copy(key)
-            messagebox.showinfo("Success", "Public key copied to clipboard!")
\ No newline at end of file
+            messagebox.showinfo("Success", "Public key copied to clipboard!")
+    
+    def update_queue_keys(self):
+        """List the keys that queue jobs can use, keeping the ticked ones"""
+        for widget in self.queue_keys_frame.winfo_children():
+            widget.destroy()
+        
+        if not self.keys_loaded:
+            ctk.CTkLabel(self.queue_keys_frame, text=KEYS_LOADING,
+                       font=("Helvetica", 12, "italic"), text_color="gray").pack(pady=20)
+            return
+        
+        # Revealing needs a secret key; hiding works with any public key
+        reveal = self.queue_mode_var.get() == "Reveal"
+        key_manager = self.crypto_stego.key_manager
+        key_vars = {}
+        for name in key_manager.get_keypair_names():
+            if reveal and not key_manager.get_keypair(name).get('secret_key'):
+                continue
+            previous = self.queue_key_vars.get(name)
+            key_vars[name] = tk.BooleanVar(value=previous.get() if previous is not None else False)
+            ctk.CTkCheckBox(self.queue_keys_frame, text=name, variable=key_vars[name]).pack(anchor="w", pady=2)
+        self.queue_key_vars = key_vars
+        
+        if not key_vars:
+            ctk.CTkLabel(self.queue_keys_frame, text="No usable keys",
+                       font=("Helvetica", 12, "italic"), text_color="gray").pack(pady=20)
+    
+    def update_queue_mode(self, mode):
+        """Switch the queue form between hiding and revealing"""
+        reveal = mode == "Reveal"
+        self.queue_keys_label_var.set("Decryption Keys" if reveal else "Recipient Keys")
+        self.queue_message_text.configure(state="disabled" if reveal else "normal")
+        
+        # Swap in the other default file name unless the user changed it
+        directory, name = os.path.split(self.queue_output_var.get())
+        if name == (HIDE_PATTERN if reveal else REVEAL_PATTERN):
+            self.queue_output_var.set(os.path.join(directory, REVEAL_PATTERN if reveal else HIDE_PATTERN))
+        self.update_queue_keys()
+    
+    def select_queue_images(self):
+        """Choose the carriers or stego images to queue"""
+        image_paths = filedialog.askopenfilenames(
+            title="Select Images",
+            filetypes=[("Image files", "*.png *.jpg *.jpeg *.bmp *.tif *.tiff *.gif *.webp"), ("All files", "*.*")]
+        )
+        if image_paths:
+            self.queue_sources = list(image_paths)
+            self.queue_sources_var.set(f"{len(self.queue_sources)} images selected")
+    
+    def select_queue_output_dir(self):
+        """Choose the output directory, keeping the file name pattern"""
+        directory = filedialog.askdirectory(title="Select Output Folder", initialdir=self.images_dir)
+        if directory:
+            name = os.path.basename(self.queue_output_var.get())
+            self.queue_output_var.set(os.path.join(directory, name))
+    
+    def enqueue_jobs(self):
+        """Add one job per selected image and ticked key"""
+        if not self.keys_ready():
+            return
+        
+        reveal = self.queue_mode_var.get() == "Reveal"
+        keys = [name for name, var in self.queue_key_vars.items() if var.get()]
+        pattern = self.queue_output_var.get().strip()
+        message = self.queue_message_text.get("1.0", tk.END).strip()
+        
+        if not self.queue_sources:
+            messagebox.showerror("Error", "Please select one or more images.")
+            return
+        
+        if not keys:
+            messagebox.showerror("Error", "Please tick at least one key.")
+            return
+        
+        if not reveal and not message:
+            messagebox.showerror("Error", "Please enter a message to hide.")
+            return
+        
+        try:
+            for source in self.queue_sources:
+                for key_name in keys:
+                    if reveal:
+                        self.job_queue.add_reveal(source, key_name, pattern)
+                    else:
+                        self.job_queue.add_hide(source, key_name, pattern, message=message)
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Failed to queue jobs: {str(e)}")
+        
+        self.refresh_queue_view()
+    
+    def selected_job_ids(self):
+        """Ids of the jobs selected in the queue list"""
+        return [int(item) for item in self.queue_tree.selection()]
+    
+    def cancel_selected_jobs(self):
+        """Cancel the selected jobs"""
+        for job_id in self.selected_job_ids():
+            self.job_queue.cancel(job_id)
+        self.refresh_queue_view()
+    
+    def retry_selected_jobs(self):
+        """Queue the selected failed or cancelled jobs again"""
+        for job_id in self.selected_job_ids():
+            self.job_queue.retry(job_id)
+        self.refresh_queue_view()
+    
+    def cancel_all_jobs(self):
+        """Cancel every unfinished job"""
+        self.job_queue.cancel_all()
+        self.refresh_queue_view()
+    
+    def clear_finished_jobs(self):
+        """Remove finished jobs from the list"""
+        self.job_queue.clear_finished()
+        self.refresh_queue_view()
+    
+    def refresh_queue_view(self):
+        """Redraw the jobs that changed and the totals; repeats while jobs are unfinished"""
+        if self._queue_refresh_job is not None:
+            self.after_cancel(self._queue_refresh_job)
+            self._queue_refresh_job = None
+        
+        jobs = self.job_queue.snapshot()
+        current = {str(job.id) for job in jobs}
+        for item in list(self.queue_row_versions):
+            if item not in current:
+                self.queue_tree.delete(item)
+                del self.queue_row_versions[item]
+        
+        unfinished = False
+        for job in jobs:
+            unfinished = unfinished or not job.finished_state
+            item = str(job.id)
+            if self.queue_row_versions.get(item) == job.version:
+                continue
+            status = job.stage if job.state == RUNNING and job.stage else job.state
+            if job.state == DONE:
+                result = job.output_path
+            elif job.state == FAILED:
+                result = job.error
+            else:
+                result = ""
+            values = (job.id, job.kind.title(), os.path.basename(job.source), job.key_name,
+                      status, f"{job.progress:.0%}", result)
+            if item in self.queue_row_versions:
+                self.queue_tree.item(item, values=values)
+            else:
+                self.queue_tree.insert("", tk.END, iid=item, values=values)
+            self.queue_row_versions[item] = job.version
+        
+        stats = self.job_queue.stats()
+        if not jobs:
+            self.queue_status_var.set("Queue is empty")
+        else:
+            self.queue_status_var.set(
+                f"{stats[RUNNING]} running, {stats[QUEUED]} queued, {stats[DONE]} done, "
+                f"{stats[FAILED]} failed, {stats[CANCELLED]} cancelled - "
+                f"{stats['jobs_per_second']:.1f} images/s, {stats['bytes_per_second'] / 1e6:.2f} MB/s"
+            )
+        
+        if unfinished:
+            self._queue_refresh_job = self.after(QUEUE_REFRESH_MS, self.refresh_queue_view)
\ No newline at end of file
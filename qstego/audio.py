@@ -0,0 +1,164 @@
+import os
+import struct
+import wave
+
+import numpy as np
+
+from .permutation import FeistelPermutation
+from .steganography import Steganography
+
+# Frames read and written per block while streaming through a recording
+BLOCK_FRAMES = 64 * 1024
+
+# Payload bytes decoded per block when extracting
+BLOCK_BYTES = 64 * 1024
+
+
+def is_wav(path):
+    return isinstance(path, (str, os.PathLike)) and os.fspath(path).lower().endswith(('.wav', '.wave'))
+
+
+def _data_chunk(path):
+    """
+    Locate the sample data of a RIFF/WAVE file
+    
+    Returns:
+        Tuple of (offset, size) of the data chunk payload
+    """
+    with open(path, 'rb') as f:
+        riff, _, wave_id = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave_id != b'WAVE':
+            raise ValueError("Not a WAV file")
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError("WAV file has no data chunk")
+            chunk_id, size = struct.unpack('<4sI', chunk_header)
+            if chunk_id == b'data':
+                return f.tell(), size
+            # Chunks are padded to an even length
+            f.seek(size + (size & 1), os.SEEK_CUR)
+
+
+class WavSteganography:
+    """
+    LSB steganography in PCM WAV recordings
+    
+    Uses the same header and payload format as images: every sample of every
+    channel, in file order, carries one bit in its least significant bit,
+    optionally spread by a stego key. Recordings are never loaded whole;
+    embedding streams through the file in blocks of BLOCK_FRAMES and
+    extraction reads the needed samples through a memory map.
+    """
+    
+    HEADER = Steganography.HEADER
+    MAGIC = Steganography.MAGIC
+    VERSION = Steganography.VERSION
+    
+    def capacity(self, wav_path):
+        """Number of payload bytes a recording can hold"""
+        with wave.open(os.fspath(wav_path), 'rb') as wav:
+            samples = wav.getnframes() * wav.getnchannels()
+        return max(0, samples // 8 - self.HEADER.size)
+    
+    def hide_message(self, wav_path, message_bytes, output_path=None, key=None):
+        """
+        Hide a byte message in a WAV file
+        
+        Args:
+            wav_path: Path to the carrier recording
+            message_bytes: Payload to hide
+            output_path: Path to write the result to (default: "_stego" next
+                to the carrier)
+            key: Optional shared secret for keyed spreading
+        
+        Returns:
+            Path to the output recording
+        """
+        if output_path is None:
+            base, ext = os.path.splitext(wav_path)
+            output_path = f"{base}_stego{ext}"
+        
+        with wave.open(os.fspath(wav_path), 'rb') as source:
+            params = source.getparams()
+            width = params.sampwidth
+            total = params.nframes * params.nchannels
+            
+            if (self.HEADER.size + len(message_bytes)) * 8 > total:
+                max_bytes = max(0, total // 8 - self.HEADER.size)
+                raise ValueError(f"Message too large! Recording can only hold {max_bytes} bytes but message is {len(message_bytes)} bytes")
+            
+            record = self.HEADER.pack(self.MAGIC, self.VERSION, len(message_bytes)) + bytes(message_bytes)
+            bits = np.unpackbits(np.frombuffer(record, dtype=np.uint8))
+            
+            # Keyed positions are sorted so each block takes a contiguous run of them
+            positions = None
+            if key is not None:
+                positions = FeistelPermutation(key, total).positions(0, bits.size)
+                order = np.argsort(positions, kind='stable')
+                positions, bits = positions[order], bits[order]
+            
+            with wave.open(os.fspath(output_path), 'wb') as target:
+                target.setparams(params)
+                start = 0
+                while True:
+                    frames = source.readframes(BLOCK_FRAMES)
+                    if not frames:
+                        break
+                    block = np.frombuffer(bytearray(frames), dtype=np.uint8)
+                    # Little-endian PCM: the first byte of each sample holds its LSB
+                    low_bytes = block[::width]
+                    count = low_bytes.size
+                    
+                    if positions is None:
+                        lo, hi = min(start, bits.size), min(start + count, bits.size)
+                        if lo < hi:
+                            low_bytes[:hi - lo] = (low_bytes[:hi - lo] & 0xFE) | bits[lo:hi]
+                    else:
+                        lo, hi = np.searchsorted(positions, [start, start + count])
+                        index = positions[lo:hi] - start
+                        low_bytes[index] = (low_bytes[index] & 0xFE) | bits[lo:hi]
+                    
+                    target.writeframesraw(block.tobytes())
+                    start += count
+        
+        return output_path
+    
+    def retrieve_message(self, wav_path, key=None):
+        """Retrieve a hidden message from a WAV file"""
+        try:
+            with wave.open(os.fspath(wav_path), 'rb') as wav:
+                width = wav.getsampwidth()
+                total = wav.getnframes() * wav.getnchannels()
+            
+            offset, size = _data_chunk(wav_path)
+            size = min(size, total * width)
+            header_bits = self.HEADER.size * 8
+            if total < header_bits:
+                raise ValueError("No hidden message found in this recording")
+            
+            # Only the pages holding the samples we index are ever read
+            data = np.memmap(wav_path, dtype=np.uint8, mode='r', offset=offset, shape=(size,))
+            low_bytes = data[::width]
+            permutation = FeistelPermutation(key, total) if key is not None else None
+            
+            header = self._read_bytes(low_bytes, permutation, 0, self.HEADER.size)
+            magic, version, length = self.HEADER.unpack(header)
+            if magic != self.MAGIC or version != self.VERSION or length * 8 > total - header_bits:
+                raise ValueError("No hidden message found in this recording")
+            
+            message = bytearray(length)
+            for start in range(0, length, BLOCK_BYTES):
+                end = min(start + BLOCK_BYTES, length)
+                message[start:end] = self._read_bytes(low_bytes, permutation, header_bits + start * 8, end - start)
+            return bytes(message)
+        except Exception as e:
+            raise ValueError(f"Error retrieving message: {str(e)}")
+    
+    @staticmethod
+    def _read_bytes(low_bytes, permutation, start_bit, length):
+        if permutation is None:
+            positions = slice(start_bit, start_bit + length * 8)
+        else:
+            positions = permutation.positions(start_bit, length * 8)
+        return np.packbits(low_bytes[positions] & 1).tobytes()
@@ -0,0 +1,235 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+from PIL import Image
+
+from .crypto_stego import CryptoStego
+from .steganography import Steganography
+
+
+class SharedCarrier:
+    """
+    A pixel buffer in a shared memory block
+    
+    The parent creates the block and is its only owner: it unlinks the block
+    in release(), whether or not the job succeeded. Workers attach by name,
+    work on the samples in place and detach without unlinking.
+    """
+    
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            # Pool workers share the parent's resource tracker, so attaching
+            # does not hand the block's lifetime to the worker
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+    
+    @property
+    def name(self):
+        return self.shm.name
+    
+    def handle(self):
+        """Picklable reference for a worker: (name, shape, dtype)"""
+        return self.name, self.shape, self.dtype.str
+    
+    @classmethod
+    def attach(cls, handle):
+        name, shape, dtype = handle
+        return cls(shape, dtype, name=name)
+    
+    def release(self):
+        """Drop this process's view; the owner also frees the block"""
+        # The ndarray holds an export of the buffer, which must go first
+        self.array = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def carrier_layout(img):
+    """Shape and dtype of np.array(img) without decoding the pixels"""
+    sample = np.asarray(Image.new(img.mode, (1, 1)))
+    return (img.height, img.width) + sample.shape[2:], sample.dtype
+
+
+# Per-worker state, created once by the pool initializer
+_worker_crypto_stego = None
+
+
+def _init_worker(keys_dir):
+    global _worker_crypto_stego
+    _worker_crypto_stego = CryptoStego(keys_dir)
+    _worker_crypto_stego.key_manager.preload_keys()
+
+
+def _hide_in_place(handle, carrier_path, message, recipient_name, stego_key):
+    """Worker: decode into the shared buffer if needed, then encrypt and embed in place"""
+    crypto_stego = _worker_crypto_stego
+    crypto_stego.key_manager.refresh_keypairs()
+    carrier = SharedCarrier.attach(handle)
+    try:
+        if carrier_path is not None:
+            with Image.open(carrier_path) as img:
+                carrier.array[...] = np.asarray(img)
+        
+        payload_bytes = crypto_stego.encrypt_payload(message, recipient_name)
+        positions, values = crypto_stego.stego.embed_patch(carrier.array, payload_bytes, stego_key)
+        carrier.array.reshape(-1)[positions] = values
+        return len(payload_bytes)
+    finally:
+        carrier.release()
+
+
+def _reveal(stego_image, decryptor_name, stego_key):
+    """Worker: extract and decrypt one image"""
+    crypto_stego = _worker_crypto_stego
+    crypto_stego.key_manager.refresh_keypairs()
+    return crypto_stego.retrieve_encrypted_message(stego_image, decryptor_name, stego_key)
+
+
+class BatchEngine:
+    """
+    Process-pool batch front end for CryptoStego
+    
+    Carrier pixels travel between the parent and the workers through shared
+    memory instead of being pickled: the parent sizes a block from the image
+    header, the worker decodes into it and embeds the payload in place, and
+    the parent encodes straight from the same buffer. Only names, shapes and
+    small results cross the process boundary. At most max_inflight carriers
+    are held in shared memory at a time.
+    """
+    
+    def __init__(self, keys_dir='keys', workers=None, max_inflight=None, stego_key=None):
+        self.keys_dir = keys_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight or self.workers * 2
+        self.stego_key = stego_key
+        self.stego = Steganography()
+        # Forked workers only share the tracker if it runs before the pool
+        # starts, which is not the case when a reveal_many comes first
+        resource_tracker.ensure_running()
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(keys_dir,)
+        )
+    
+    def close(self):
+        self._executor.shutdown()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def _share(self, carrier):
+        """Create the shared block for a carrier; returns (block, path for the worker to decode)"""
+        if isinstance(carrier, np.ndarray):
+            block = SharedCarrier(carrier.shape, carrier.dtype)
+            block.array[...] = carrier
+            return block, None
+        with Image.open(carrier) as img:
+            shape, dtype = carrier_layout(img)
+        return SharedCarrier(shape, dtype), carrier
+    
+    def hide_many(self, jobs):
+        """
+        Encrypt and hide many messages
+        
+        Args:
+            jobs: Iterable of (carrier, message, recipient_name, output_path)
+                tuples; carrier is a path or numpy array, output_path a path
+                or file object
+        
+        Yields:
+            Dicts with the job index, output_path and error (None on
+            success), in completion order
+        """
+        jobs = iter(enumerate(jobs))
+        running = {}
+        try:
+            while True:
+                # Keep the pool busy without holding every carrier in memory
+                while len(running) < self.max_inflight:
+                    try:
+                        index, (carrier, message, recipient_name, output_path) = next(jobs)
+                    except StopIteration:
+                        break
+                    try:
+                        block, carrier_path = self._share(carrier)
+                    except Exception as e:
+                        yield {'index': index, 'output_path': output_path, 'error': str(e)}
+                        continue
+                    future = self._executor.submit(
+                        _hide_in_place, block.handle(), carrier_path, message, recipient_name, self.stego_key
+                    )
+                    running[future] = (index, block, output_path)
+                
+                if not running:
+                    return
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, block, output_path = running.pop(future)
+                    try:
+                        future.result()
+                        # Encode from the shared buffer the worker embedded into
+                        self.stego.save_image(block.array, output_path)
+                        yield {'index': index, 'output_path': output_path, 'error': None}
+                    except Exception as e:
+                        yield {'index': index, 'output_path': output_path, 'error': str(e)}
+                    finally:
+                        block.release()
+        finally:
+            # Abandoned or failed batches must not leak shared memory
+            for future in running:
+                future.cancel()
+            for future, (_, block, _) in running.items():
+                try:
+                    future.exception()
+                except Exception:
+                    pass
+                block.release()
+    
+    def reveal_many(self, jobs):
+        """
+        Retrieve and decrypt many messages
+        
+        Args:
+            jobs: Iterable of (stego_image_path, decryptor_name) tuples
+        
+        Yields:
+            Dicts with the job index, message (bytes) and error, in job order
+        """
+        pending = deque()
+        for index, (stego_image, decryptor_name) in enumerate(jobs):
+            pending.append((index, self._executor.submit(_reveal, stego_image, decryptor_name, self.stego_key)))
+            while len(pending) >= self.max_inflight:
+                yield self._reveal_result(*pending.popleft())
+        while pending:
+            yield self._reveal_result(*pending.popleft())
+    
+    @staticmethod
+    def _reveal_result(index, future):
+        try:
+            return {'index': index, 'message': future.result(), 'error': None}
+        except Exception as e:
+            return {'index': index, 'message': None, 'error': str(e)}
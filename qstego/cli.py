@@ -0,0 +1,342 @@
+import argparse
+import json
+import logging
+import os
+import signal
+
+# Default keystore shared with the GUI
+DEFAULT_KEYS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "keys")
+
+
+def cmd_serve(args):
+    """Run the local HTTP service"""
+    from .server import serve
+    serve(args.host, args.port, args.keys_dir, args.workers)
+
+
+def cmd_keygen(args):
+    """Generate many keypairs in parallel"""
+    from .key_manager import KeyManager
+    
+    names = list(args.names)
+    if args.count:
+        width = len(str(args.start + args.count - 1))
+        names.extend(f"{args.prefix}{i:0{width}d}" for i in range(args.start, args.start + args.count))
+    if not names:
+        raise SystemExit("Nothing to generate: give keypair names or --count")
+    
+    key_manager = KeyManager(args.keys_dir)
+    try:
+        stats = key_manager.generate_keypairs(
+            names,
+            workers=args.workers,
+            batch_size=args.batch_size,
+            bundle_path=args.bundle,
+            overwrite=args.overwrite
+        )
+    except ValueError as e:
+        raise SystemExit(str(e))
+    
+    print(f"Generated {stats['count']} keypairs in {stats['seconds']:.2f}s "
+          f"({stats['keys_per_second']:.1f} keys/s)")
+    if stats['bundle_path']:
+        print(f"Public key bundle written to {stats['bundle_path']}")
+
+
+def cmd_import_keyring(args):
+    """Import every public key from a keyring bundle"""
+    from .key_manager import KeyManager
+    
+    key_manager = KeyManager(args.keys_dir)
+    try:
+        keypairs = key_manager.import_keyring(args.bundle, workers=args.workers, skip_invalid=args.skip_invalid)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    print(f"Imported {len(keypairs)} public keys from {args.bundle}")
+
+
+def cmd_import_qr(args):
+    """Import every public key found in QR code images"""
+    from .key_manager import KeyManager
+    
+    key_manager = KeyManager(args.keys_dir)
+    result = key_manager.import_keys_from_qr_codes(args.paths, workers=args.workers, skip_known=not args.keep_known)
+    
+    for path, error in result['failed'].items():
+        print(f"{path}: {error}")
+    for found, count in result['incomplete'].values():
+        print(f"Incomplete multi-part key: {found} of {count} parts found")
+    print(f"Imported {len(result['imported'])} public keys from {result['files']} images "
+          f"in {result['seconds']:.2f}s ({result['skipped']} already known)")
+
+
+def cmd_export_keyring(args):
+    """Export public keys to a keyring bundle"""
+    from .key_manager import KeyManager
+    
+    key_manager = KeyManager(args.keys_dir)
+    names = args.names or [
+        name for name in key_manager.get_keypair_names()
+        if key_manager.get_keypair(name).get('public_key')
+    ]
+    key_manager.export_keyring(names, args.output)
+    print(f"Exported {len(names)} public keys to {args.output}")
+
+
+def cmd_triage(args):
+    """Index which images in an archive carry a stego payload"""
+    from .triage import TriageIndex
+    
+    with TriageIndex(args.index) as index:
+        stats = index.scan(args.paths, workers=args.workers, rescan=args.rescan)
+        if args.list:
+            for source in args.paths:
+                for path, length in index.flagged(source):
+                    print(f"{path}\t{length}")
+    
+    print(f"Scanned {stats['files']} images in {stats['seconds']:.2f}s "
+          f"({stats['inspected']} inspected, {stats['cached']} cached): "
+          f"{stats['flagged']} carry a payload, {stats['errors']} unreadable")
+
+
+def cmd_watch(args):
+    """Reveal messages in images as they arrive in an inbox directory"""
+    from .watch import WatchDaemon
+    
+    if not os.path.isdir(args.inbox):
+        raise SystemExit(f"Inbox {args.inbox} is not a directory")
+    try:
+        daemon = WatchDaemon(
+            args.inbox,
+            args.output,
+            args.keys_dir,
+            state_path=args.state,
+            audit_path=args.audit_log,
+            workers=args.workers,
+            keypairs=args.keypair,
+            stego_key=args.stego_key,
+            inotify=not args.poll,
+            poll_interval=args.interval
+        )
+    except ValueError as e:
+        raise SystemExit(str(e))
+    
+    with daemon:
+        if args.once:
+            daemon.run_once()
+            return
+        # SIGTERM from a service manager stops the daemon like Ctrl+C
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            pass
+
+
+def cmd_coordinate(args):
+    """Hand a job manifest to cluster workers and collect the results"""
+    import subprocess
+    import sys
+    from .cluster import Coordinator, read_manifest
+    
+    try:
+        jobs = read_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        raise SystemExit(str(e))
+    token = args.token or os.environ.get('QSTEGO_CLUSTER_TOKEN')
+    
+    with Coordinator(jobs, args.host, args.port, unit_size=args.unit_size, token=token,
+                     heartbeat_timeout=args.heartbeat_timeout) as coordinator:
+        host, port = coordinator.address
+        logging.getLogger(__name__).info(f"Coordinating {len(jobs)} jobs on {host}:{port}")
+        
+        # Local workers inherit the package from however this process found it
+        package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+        if token:
+            env['QSTEGO_CLUSTER_TOKEN'] = token
+        command = [sys.executable, '-m', 'qstego', '--keys-dir', args.keys_dir, 'worker', f"{host}:{port}"]
+        if args.stego_key:
+            command += ['--stego-key', args.stego_key]
+        local_workers = [
+            subprocess.Popen(command + ['--name', f"local-{i + 1}"], env=env)
+            for i in range(args.local_workers)
+        ]
+        
+        output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        failed = 0
+        try:
+            for record in coordinator.results():
+                failed += record['error'] is not None
+                output.write(json.dumps(record) + '\n')
+                output.flush()
+        finally:
+            if output is not sys.stdout:
+                output.close()
+            coordinator.close()
+            for process in local_workers:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.terminate()
+    
+    if failed:
+        raise SystemExit(f"{failed} of {len(jobs)} jobs failed")
+
+
+def cmd_worker(args):
+    """Process work units for a coordinator"""
+    from .cluster import run_worker
+    
+    host, _, port = args.coordinator.rpartition(':')
+    if not host or not (port.isascii() and port.isdigit()):
+        raise SystemExit(f"Expected HOST:PORT, got {args.coordinator}")
+    token = args.token or os.environ.get('QSTEGO_CLUSTER_TOKEN')
+    try:
+        run_worker(host, int(port), args.keys_dir, workers=args.workers, name=args.name,
+                   token=token, stego_key=args.stego_key)
+    except ConnectionError as e:
+        raise SystemExit(f"Lost the coordinator at {args.coordinator}: {str(e)}")
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_startup_report(args):
+    """Measure how long the GUI takes to start"""
+    from .startup import startup_report
+    
+    try:
+        report = startup_report(args.keys_dir, timeout=args.timeout)
+    except RuntimeError as e:
+        raise SystemExit(str(e))
+    if args.json:
+        print(json.dumps(report))
+    else:
+        def seconds(value):
+            return 'not reached' if value is None else f"{value:.3f}s"
+        print(f"Import:      {seconds(report['import_seconds'])}")
+        print(f"Construct:   {seconds(report['construct_seconds'])}")
+        print(f"First paint: {seconds(report['first_paint_seconds'])}")
+        print(f"Keys loaded: {seconds(report['keys_loaded_seconds'])} ({report['keys']} keys)")
+    
+    first_paint = report['first_paint_seconds']
+    if args.budget is not None and (first_paint is None or first_paint > args.budget):
+        raise SystemExit(f"First paint took longer than the {args.budget:g}s budget")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='qstego',
+        description='QuantumStego - Quantum-Safe Steganography'
+    )
+    parser.add_argument('--keys-dir', default=DEFAULT_KEYS_DIR,
+                        help='Directory holding the keystore (default: %(default)s)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    
+    serve_parser = subparsers.add_parser('serve', help='Run a local HTTP service with warm keys')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: %(default)s)')
+    serve_parser.add_argument('--port', type=int, default=8765, help='Port to bind (default: %(default)s)')
+    serve_parser.add_argument('--workers', type=int, default=None,
+                              help='Number of pre-forked workers (default: CPU count)')
+    serve_parser.set_defaults(func=cmd_serve)
+    
+    keygen_parser = subparsers.add_parser('keygen', help='Generate keypairs in bulk')
+    keygen_parser.add_argument('names', nargs='*', help='Names of the keypairs to generate')
+    keygen_parser.add_argument('--count', type=int, default=0, help='Generate this many numbered keypairs')
+    keygen_parser.add_argument('--prefix', default='device-', help='Name prefix for --count (default: %(default)s)')
+    keygen_parser.add_argument('--start', type=int, default=1, help='First number for --count (default: %(default)s)')
+    keygen_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    keygen_parser.add_argument('--batch-size', type=int, default=256,
+                               help='Keypairs per worker task and keystore write (default: %(default)s)')
+    keygen_parser.add_argument('--bundle', help='Write a public-key bundle (.qkeyring) of the new keys')
+    keygen_parser.add_argument('--overwrite', action='store_true', help='Replace existing keypairs')
+    keygen_parser.set_defaults(func=cmd_keygen)
+    
+    import_parser = subparsers.add_parser('import-keyring', help='Import public keys from a keyring bundle')
+    import_parser.add_argument('bundle', help='Path to the .qkeyring bundle')
+    import_parser.add_argument('--workers', type=int, default=None, help='Validation processes (default: CPU count)')
+    import_parser.add_argument('--skip-invalid', action='store_true',
+                               help='Import the valid keys even if some are invalid')
+    import_parser.set_defaults(func=cmd_import_keyring)
+    
+    qr_parser = subparsers.add_parser('import-qr', help='Import public keys from QR code images')
+    qr_parser.add_argument('paths', nargs='+', help='Image files or directories to scan')
+    qr_parser.add_argument('--workers', type=int, default=None, help='Decoding threads (default: based on CPU count)')
+    qr_parser.add_argument('--keep-known', action='store_true',
+                           help='Import keys that are already in the keystore again')
+    qr_parser.set_defaults(func=cmd_import_qr)
+    
+    triage_parser = subparsers.add_parser('triage', help='Find images that carry a stego payload')
+    triage_parser.add_argument('paths', nargs='+', help='Image files or directories to scan')
+    triage_parser.add_argument('--index', default='qstego-triage.db',
+                               help='Index database, reused between scans (default: %(default)s)')
+    triage_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    triage_parser.add_argument('--rescan', action='store_true', help='Ignore cached results')
+    triage_parser.add_argument('--list', action='store_true', help='Print every image that carries a payload')
+    triage_parser.set_defaults(func=cmd_triage)
+    
+    export_parser = subparsers.add_parser('export-keyring', help='Export public keys to a keyring bundle')
+    export_parser.add_argument('names', nargs='*', help='Keypairs to export (default: all)')
+    export_parser.add_argument('-o', '--output', required=True, help='Path of the .qkeyring bundle to write')
+    export_parser.set_defaults(func=cmd_export_keyring)
+    
+    watch_parser = subparsers.add_parser('watch', help='Reveal messages in images as they arrive in a directory')
+    watch_parser.add_argument('inbox', help='Directory to watch (not recursive)')
+    watch_parser.add_argument('-o', '--output', required=True, help='Directory to write the revealed messages to')
+    watch_parser.add_argument('--state', default=None,
+                              help='State database remembering processed files (default: in the output directory)')
+    watch_parser.add_argument('--audit-log', default=None,
+                              help='JSON-lines audit log (default: audit.jsonl in the output directory)')
+    watch_parser.add_argument('--workers', type=int, default=None, help='Decryption processes (default: CPU count)')
+    watch_parser.add_argument('--keypair', action='append', default=None,
+                              help='Only decrypt with this keypair (repeatable; default: every local secret key)')
+    watch_parser.add_argument('--stego-key', default=None, help='Shared secret the payloads were spread with')
+    watch_parser.add_argument('--poll', action='store_true', help='Scan the directory instead of using inotify')
+    watch_parser.add_argument('--interval', type=float, default=2.0,
+                              help='Seconds between scans when polling (default: %(default)s)')
+    watch_parser.add_argument('--once', action='store_true', help='Process the current contents and exit')
+    watch_parser.set_defaults(func=cmd_watch)
+    
+    coordinate_parser = subparsers.add_parser('coordinate', help='Run a job manifest on cluster workers')
+    coordinate_parser.add_argument('manifest', help='JSON-lines job manifest (paths must be valid on every worker)')
+    coordinate_parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: %(default)s)')
+    coordinate_parser.add_argument('--port', type=int, default=8766, help='Port to listen on (default: %(default)s)')
+    coordinate_parser.add_argument('-o', '--output', default=None,
+                                   help='JSON-lines file for the results (default: standard output)')
+    coordinate_parser.add_argument('--unit-size', type=int, default=32,
+                                   help='Jobs handed to a worker at a time (default: %(default)s)')
+    coordinate_parser.add_argument('--token', default=None,
+                                   help='Shared secret workers must present (default: $QSTEGO_CLUSTER_TOKEN)')
+    coordinate_parser.add_argument('--heartbeat-timeout', type=float, default=10.0,
+                                   help='Seconds of silence before a worker is dropped (default: %(default)s)')
+    coordinate_parser.add_argument('--local-workers', type=int, default=0,
+                                   help='Also start this many workers on this machine')
+    coordinate_parser.add_argument('--stego-key', default=None, help='Stego key passed to the local workers')
+    coordinate_parser.set_defaults(func=cmd_coordinate)
+    
+    worker_parser = subparsers.add_parser('worker', help='Process work units for a coordinator')
+    worker_parser.add_argument('coordinator', help='HOST:PORT of the coordinator')
+    worker_parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    worker_parser.add_argument('--name', default=None, help='Name reported to the coordinator (default: host:pid)')
+    worker_parser.add_argument('--token', default=None,
+                               help='Shared secret of the coordinator (default: $QSTEGO_CLUSTER_TOKEN)')
+    worker_parser.add_argument('--stego-key', default=None, help='Shared secret the payloads are spread with')
+    worker_parser.set_defaults(func=cmd_worker)
+    
+    startup_parser = subparsers.add_parser('startup-report', help='Measure GUI startup time (needs a display)')
+    startup_parser.add_argument('--timeout', type=float, default=30.0,
+                                help='Seconds to wait for the window and keys (default: %(default)s)')
+    startup_parser.add_argument('--budget', type=float, default=None,
+                                help='Fail if the first paint takes longer than this many seconds')
+    startup_parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+    startup_parser.set_defaults(func=cmd_startup_report)
+    
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    return args.func(args)
@@ -0,0 +1,382 @@
+import base64
+import hmac
+import json
+import logging
+import os
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats sent by a worker
+HEARTBEAT_INTERVAL = 2.0
+
+# A worker not heard from for this long is considered dead
+HEARTBEAT_TIMEOUT = 10.0
+
+# Jobs per work unit
+UNIT_SIZE = 32
+
+# Units handed to a worker ahead of the one it is working on
+PREFETCH = 1
+
+# A unit whose workers died this many times is failed instead of reassigned
+MAX_ATTEMPTS = 3
+
+
+def read_manifest(path):
+    """
+    Read a job manifest: one JSON object per line
+    
+    Reveal jobs are {"image": ..., "keypair": ...}; hide jobs are
+    {"op": "hide", "carrier": ..., "message": ..., "recipient": ...,
+    "output": ...}. Paths must be valid on every worker host.
+    """
+    jobs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"Invalid manifest line {number}: {str(e)}")
+            job.setdefault('op', 'reveal')
+            required = ('image', 'keypair') if job['op'] == 'reveal' else ('carrier', 'message', 'recipient', 'output')
+            missing = [field for field in required if field not in job]
+            if job['op'] not in ('reveal', 'hide') or missing:
+                raise ValueError(f"Invalid manifest line {number}: unknown op or missing {', '.join(missing)}")
+            jobs.append(job)
+    return jobs
+
+
+def _encode(message):
+    return (json.dumps(message) + '\n').encode('utf-8')
+
+
+class _Connection:
+    """Coordinator-side state of one worker connection"""
+    
+    def __init__(self, sock, address):
+        self.sock = sock
+        self.address = address
+        self.name = None
+        self.inbox = b''
+        self.outbox = b''
+        self.last_seen = time.monotonic()
+        self.units = set()
+        self.closed = False
+
+
+class Coordinator:
+    """
+    Hands a job manifest to workers over TCP and merges their results
+    
+    The manifest is split into units of unit_size jobs. Workers connect,
+    introduce themselves and are kept supplied with units; they send a
+    heartbeat every few seconds and one result message per unit. When a
+    worker disconnects or misses its heartbeats, its outstanding units go
+    back to the front of the queue for the other workers. Results are
+    yielded in manifest order, whichever worker produced them.
+    
+    The protocol is newline-delimited JSON:
+        
+        worker -> {"type": "hello", "worker": name, "token": ...}
+        coordinator -> {"type": "unit", "unit": id, "jobs": [[index, job], ...]}
+        worker -> {"type": "heartbeat"}
+        worker -> {"type": "result", "unit": id, "results": [...]}
+        coordinator -> {"type": "shutdown"}
+    
+    Messages and plaintexts travel unencrypted; run workers on a trusted
+    network or through a tunnel, and set a token to keep strangers out.
+    """
+    
+    def __init__(self, jobs, host='127.0.0.1', port=0, unit_size=UNIT_SIZE, token=None,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT, prefetch=PREFETCH, max_attempts=MAX_ATTEMPTS):
+        """
+        Args:
+            jobs: Manifest entries (see read_manifest)
+            host: Address to listen on
+            port: Port to listen on (0 picks a free one; see address)
+            unit_size: Jobs per work unit
+            token: Shared secret workers must present, if any
+            heartbeat_timeout: Seconds of silence after which a worker is dropped
+            prefetch: Units queued on a worker beyond the one it is running
+            max_attempts: Workers a unit may be lost on before it is failed
+        """
+        # Entries built in code may leave out the op, as manifest lines can
+        self.jobs = [dict(job, op=job.get('op', 'reveal')) for job in jobs]
+        self.token = token
+        self.heartbeat_timeout = heartbeat_timeout
+        self.prefetch = prefetch
+        self.max_attempts = max_attempts
+        
+        self.units = [
+            [(index, self.jobs[index]) for index in range(start, min(start + unit_size, len(self.jobs)))]
+            for start in range(0, len(self.jobs), unit_size)
+        ]
+        self._queue = deque(range(len(self.units)))
+        self._attempts = [0] * len(self.units)
+        # Units with a result, and the results not yet yielded
+        self._finished = set()
+        self._done = {}
+        self._connections = {}
+        
+        self._listener = socket.create_server((host, port))
+        self._listener.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+    
+    @property
+    def address(self):
+        """(host, port) the coordinator listens on"""
+        return self._listener.getsockname()[:2]
+    
+    def close(self):
+        """Tell the workers to stop and close every socket"""
+        for connection in list(self._connections.values()):
+            self._send(connection, {'type': 'shutdown'})
+            self._flush(connection)
+            self._drop(connection, requeue=False)
+        self._selector.close()
+        self._listener.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def results(self):
+        """
+        Run until every unit has a result
+        
+        Yields:
+            One dict per job in manifest order: the job's fields plus
+            index, worker, error and either message (base64 of the
+            revealed bytes) or output (path of the stego image)
+        """
+        next_unit = 0
+        while next_unit < len(self.units):
+            for key, events in self._selector.select(timeout=0.5):
+                if key.fileobj is self._listener:
+                    self._accept()
+                    continue
+                connection = key.data
+                if events & selectors.EVENT_WRITE:
+                    self._flush(connection)
+                if events & selectors.EVENT_READ and not connection.closed:
+                    self._receive(connection)
+            
+            self._reap()
+            self._assign()
+            while next_unit in self._done:
+                yield from self._done.pop(next_unit)
+                next_unit += 1
+    
+    def _accept(self):
+        try:
+            sock, address = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        connection = _Connection(sock, address)
+        self._connections[sock.fileno()] = connection
+        self._selector.register(sock, selectors.EVENT_READ, connection)
+    
+    def _receive(self, connection):
+        try:
+            data = connection.sock.recv(64 * 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            logger.warning(f"Worker {connection.name or connection.address} disconnected")
+            self._drop(connection)
+            return
+        
+        connection.last_seen = time.monotonic()
+        connection.inbox += data
+        *lines, connection.inbox = connection.inbox.split(b'\n')
+        for line in lines:
+            try:
+                self._handle(connection, json.loads(line))
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Dropping worker {connection.address} after a bad message: {str(e)}")
+                self._drop(connection)
+                return
+    
+    def _handle(self, connection, message):
+        kind = message['type']
+        if connection.name is None:
+            # Nothing but a valid hello is accepted first
+            if kind != 'hello' or not hmac.compare_digest(str(message.get('token') or ''), str(self.token or '')):
+                raise ValueError("missing hello or wrong token")
+            connection.name = message.get('worker') or f"{connection.address[0]}:{connection.address[1]}"
+            logger.info(f"Worker {connection.name} joined")
+        elif kind == 'result':
+            unit = message['unit']
+            connection.units.discard(unit)
+            # A unit reassigned after a timeout may be answered twice
+            if unit in self._finished or not 0 <= unit < len(self.units):
+                return
+            self._finish(unit, self._merge(unit, message['results'], connection.name))
+    
+    def _finish(self, unit, records):
+        self._finished.add(unit)
+        self._done[unit] = records
+    
+    def _merge(self, unit, results, worker):
+        merged = []
+        by_index = {result['index']: result for result in results}
+        for index, job in self.units[unit]:
+            result = by_index.get(index, {'error': "No result from worker"})
+            record = dict(job, index=index, worker=worker, error=result.get('error'))
+            for field in ('message', 'output'):
+                if field in result:
+                    record[field] = result[field]
+            merged.append(record)
+        return merged
+    
+    def _reap(self):
+        """Drop workers whose heartbeats stopped"""
+        deadline = time.monotonic() - self.heartbeat_timeout
+        for connection in list(self._connections.values()):
+            if connection.last_seen < deadline:
+                logger.warning(f"Worker {connection.name or connection.address} timed out")
+                self._drop(connection)
+    
+    def _drop(self, connection, requeue=True):
+        """Close a connection and give its units to the other workers"""
+        if connection.closed:
+            return
+        connection.closed = True
+        self._connections.pop(connection.sock.fileno(), None)
+        try:
+            self._selector.unregister(connection.sock)
+        except (KeyError, ValueError):
+            pass
+        connection.sock.close()
+        
+        if not requeue:
+            return
+        for unit in sorted(connection.units, reverse=True):
+            if unit in self._finished:
+                continue
+            self._attempts[unit] += 1
+            if self._attempts[unit] >= self.max_attempts:
+                error = f"Work unit lost on {self._attempts[unit]} workers"
+                self._finish(unit, self._merge(unit, [{'index': index, 'error': error} for index, _ in self.units[unit]], None))
+            else:
+                self._queue.appendleft(unit)
+        connection.units.clear()
+    
+    def _assign(self):
+        """Keep every introduced worker supplied with units"""
+        for connection in list(self._connections.values()):
+            if connection.name is None:
+                continue
+            while self._queue and not connection.closed and len(connection.units) <= self.prefetch:
+                unit = self._queue.popleft()
+                connection.units.add(unit)
+                self._send(connection, {'type': 'unit', 'unit': unit, 'jobs': self.units[unit]})
+    
+    def _send(self, connection, message):
+        connection.outbox += _encode(message)
+        self._flush(connection)
+    
+    def _flush(self, connection):
+        """Write as much of the outbox as the socket takes; wait for EVENT_WRITE for the rest"""
+        if connection.closed:
+            return
+        try:
+            sent = connection.sock.send(connection.outbox) if connection.outbox else 0
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self._drop(connection)
+            return
+        connection.outbox = connection.outbox[sent:]
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if connection.outbox else 0)
+        try:
+            self._selector.modify(connection.sock, events, connection)
+        except (KeyError, ValueError):
+            pass
+
+
+def _run_unit(engine, jobs):
+    """Run one unit's jobs on a BatchEngine; returns result dicts with global indices"""
+    reveals = [(index, job) for index, job in jobs if job['op'] == 'reveal']
+    hides = [(index, job) for index, job in jobs if job['op'] == 'hide']
+    results = []
+    
+    for result in engine.reveal_many((job['image'], job['keypair']) for _, job in reveals):
+        entry = {'index': reveals[result['index']][0], 'error': result['error']}
+        if result['message'] is not None:
+            entry['message'] = base64.b64encode(result['message']).decode('ascii')
+        results.append(entry)
+    
+    hide_jobs = ((job['carrier'], job['message'], job['recipient'], job['output']) for _, job in hides)
+    for result in engine.hide_many(hide_jobs):
+        entry = {'index': hides[result['index']][0], 'error': result['error']}
+        if result['error'] is None:
+            entry['output'] = result['output_path']
+        results.append(entry)
+    return results
+
+
+def run_worker(host, port, keys_dir, workers=None, name=None, token=None, stego_key=None,
+               heartbeat_interval=HEARTBEAT_INTERVAL):
+    """
+    Connect to a coordinator and process work units until it says to stop
+    
+    Units run on a local BatchEngine, so a worker uses every core of its
+    host; the keys needed to decrypt must be in its own keystore. A
+    background thread sends heartbeats while units are running.
+    
+    Returns:
+        Number of units processed
+    """
+    from .batch import BatchEngine
+    
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    sock = socket.create_connection((host, port))
+    send_lock = threading.Lock()
+    stopping = threading.Event()
+    
+    def send(message):
+        with send_lock:
+            sock.sendall(_encode(message))
+    
+    def heartbeat():
+        while not stopping.wait(heartbeat_interval):
+            try:
+                send({'type': 'heartbeat'})
+            except OSError:
+                return
+    
+    processed = 0
+    with BatchEngine(keys_dir, workers=workers, stego_key=stego_key) as engine, sock.makefile('rb') as reader:
+        send({'type': 'hello', 'worker': name, 'token': token})
+        threading.Thread(target=heartbeat, name='qstego-heartbeat', daemon=True).start()
+        try:
+            for line in reader:
+                message = json.loads(line)
+                if message['type'] == 'shutdown':
+                    break
+                if message['type'] == 'unit':
+                    try:
+                        results = _run_unit(engine, message['jobs'])
+                    except Exception as e:
+                        results = [{'index': index, 'error': str(e)} for index, _ in message['jobs']]
+                    send({'type': 'result', 'unit': message['unit'], 'results': results})
+                    processed += 1
+        finally:
+            stopping.set()
+            sock.close()
+    logger.info(f"Worker {name} processed {processed} units")
+    return processed
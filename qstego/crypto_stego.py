@@ -1,42 +1,385 @@
 import json
 import base64
+import hashlib
+import mimetypes
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from quantcrypt.cipher import Krypton
-from .steganography import Steganography
+from .steganography import Steganography, CarrierTemplate
 from .key_manager import KeyManager
 
 class CryptoStego:
-    def __init__(self, keys_dir='keys'):
+    # Bytes read from an attached file per encryption step
+    ATTACHMENT_CHUNK = 1024 * 1024
+    
+    # Carriers decoded, embedded and written per hide_many step
+    BATCH_SIZE = 256
+    
+    def __init__(self, keys_dir='keys', load_keys=True):
         self.stego = Steganography()
-        self.key_manager = KeyManager(keys_dir)
+        self.key_manager = KeyManager(keys_dir, load=load_keys)
     
-    def hide_encrypted_message(self, image_path, message, recipient_name, output_path=None):
+    def hide_encrypted_message(self, image_path, message, recipient_name, output_path=None, stego_key=None):
         """
         Encrypt a message and hide it in an image
         
         Args:
-            image_path: Path to the carrier image
+            image_path: Carrier image as a path, bytes, file-like object,
+                PIL image or numpy array
             message: Text message to hide
             recipient_name: Name of the recipient's keypair
-            output_path: Optional path to save the output image
-            
+            output_path: Optional path or file object to save the output image
+            stego_key: Optional shared secret that spreads the payload over
+                pseudorandom pixel positions
+        
         Returns:
-            Path to the output steganographic image
+            output_path if given; otherwise a "_stego" path next to a path
+            carrier, or the stego image in the same kind as the carrier
         """
-        # Convert message to bytes if it's a string
-        if isinstance(message, str):
-            message_bytes = message.encode('utf-8')
-        else:
-            message_bytes = message
+        payload_bytes = self.encrypt_payload(message, recipient_name)
+        
+        # Hide the encrypted message in the image
+        output_path = self.stego.hide_message(image_path, payload_bytes, output_path, stego_key)
+        
+        return output_path
+    
+    def hide_encrypted_file(self, image_path, file_path, recipient_name, output_path=None, stego_key=None):
+        """
+        Encrypt a file and hide it in an image
+        
+        The file is streamed through the cipher in chunks rather than read
+        into memory as a whole; its name and content type are stored in the
+        payload metadata.
+        
+        Args:
+            image_path: Carrier image as a path, bytes, file-like object,
+                PIL image or numpy array
+            file_path: File to attach
+            recipient_name: Name of the recipient's keypair
+            output_path: Optional path or file object to save the output image
+            stego_key: Optional shared secret that spreads the payload over
+                pseudorandom pixel positions
+        
+        Returns:
+            Same as hide_encrypted_message
+        """
+        payload_bytes = self.encrypt_file_payload(file_path, recipient_name)
+        return self.stego.hide_message(image_path, payload_bytes, output_path, stego_key)
+    
+    def retrieve_encrypted_message(self, stego_image_path, decryptor_name, stego_key=None):
+        """
+        Retrieve and decrypt a message hidden in an image
+        
+        Args:
+            stego_image_path: Steganographic image as a path, bytes,
+                file-like object, PIL image or numpy array
+            decryptor_name: Name of the keypair to use for decryption
+            stego_key: Shared secret used to spread the payload, if any
+        
+        Returns:
+            The decrypted message as bytes
+        """
+        # Extract the hidden data from the image
+        payload_bytes = self.stego.retrieve_message(stego_image_path, stego_key)
+        
+        return self.decrypt_payload(payload_bytes, decryptor_name)
+    
+    def retrieve_encrypted_payload(self, stego_image_path, decryptor_name, stego_key=None):
+        """
+        Retrieve and decrypt a message or attached file hidden in an image
+        
+        Args:
+            stego_image_path: Steganographic image as a path, bytes,
+                file-like object, PIL image or numpy array
+            decryptor_name: Name of the keypair to use for decryption
+            stego_key: Shared secret used to spread the payload, if any
+        
+        Returns:
+            Tuple of (decrypted bytes, attachment), where attachment is a
+            dict with the filename and content_type of an attached file, or
+            None for a text message
+        """
+        payload_bytes = self.stego.retrieve_message(stego_image_path, stego_key)
+        plaintext, metadata = self.decrypt_payload_with_metadata(payload_bytes, decryptor_name)
+        return plaintext, metadata.get('attachment')
+    
+    def encrypt_payload(self, message, recipient_name):
+        """Encrypt a message for a recipient and serialise it as a stego payload"""
+        message_bytes = self.to_bytes(message)
         
         # Encrypt the message using quantum-safe encryption
         encryption_result = self.key_manager.encrypt_message(recipient_name, message_bytes)
         
+        return self.seal_payload(message_bytes, recipient_name, encryption_result)
+    
+    def encrypt_many(self, messages, recipient_name):
+        """
+        Encrypt many messages for one recipient with a single encapsulation
+        
+        The KEM encapsulation and the Argon2 derivation run once; every
+        message is then sealed with its own key, derived from the shared
+        key and a random nonce that is stored in the payload metadata.
+        Payloads from one call share their KEM ciphertext, which links them
+        to each other once they are extracted.
+        
+        Returns:
+            List of payloads (bytes) in the order of the messages
+        """
+        encryption_result = self.key_manager.encrypt_message(recipient_name, None)
+        return [self.seal_shared(message, recipient_name, encryption_result) for message in messages]
+    
+    def seal_shared(self, message, recipient_name, encryption_result):
+        """Seal one message under its own key, derived from a shared encapsulation"""
+        key_nonce = os.urandom(16)
+        message_result = dict(
+            encryption_result,
+            encryption_key=self.message_key(encryption_result['encryption_key'], key_nonce)
+        )
+        return self.seal_chunks([self.to_bytes(message)], recipient_name, message_result, key_nonce=key_nonce)
+    
+    @staticmethod
+    def message_key(encryption_key, key_nonce):
+        """Per-message key derived from a shared encryption key and a nonce"""
+        return hashlib.blake2b(key_nonce, key=encryption_key, digest_size=64, person=b'qstego-message').digest()
+    
+    def hide_many(self, jobs, stego_key=None, share_encapsulation=True, writers=None):
+        """
+        Encrypt and hide many messages, for large numbers of small carriers
+        
+        Jobs are handled BATCH_SIZE at a time. While one batch is being
+        embedded the next one is decoded on a thread pool, and the outputs
+        are encoded on the same pool while later batches proceed. Within a
+        batch, same-shape carriers are embedded in one vectorized pass
+        (Steganography.embed_many), and with share_encapsulation each
+        recipient costs one KEM encapsulation and Argon2 derivation per call
+        (see encrypt_many). WAV and multi-frame carriers and templates are
+        hidden one by one.
+        
+        Args:
+            jobs: Iterable of (carrier, message, recipient_name) or
+                (carrier, message, recipient_name, output_path) tuples;
+                carriers are anything hide_encrypted_message accepts
+            stego_key: Optional shared secret for keyed spreading
+            share_encapsulation: Encrypt each recipient's messages with one
+                encapsulation; False runs a full encapsulation per message
+            writers: Decoding and encoding threads (default: CPU count, at
+                most 8)
+        
+        Yields:
+            Dicts with the job index, output (what hide_encrypted_message
+            would return) and error (None on success), in job order
+        """
+        writers = writers or min(8, os.cpu_count() or 1)
+        jobs = enumerate(jobs)
+        shared = {}
+        with ThreadPoolExecutor(max_workers=writers, thread_name_prefix='qstego-hide') as pool:
+            pending = deque()
+            batch = self._next_batch(jobs, pool)
+            while batch:
+                # Decode the next batch while this one is encrypted and embedded
+                following = self._next_batch(jobs, pool)
+                for result in self._hide_batch(batch, pool, stego_key, share_encapsulation, shared):
+                    pending.append(result)
+                
+                # Hand back finished outputs without waiting for the whole batch
+                while pending and (len(pending) > 2 * self.BATCH_SIZE or self._hide_done(pending[0][1])):
+                    yield self._hide_result(*pending.popleft())
+                batch = following
+            while pending:
+                yield self._hide_result(*pending.popleft())
+    
+    def _next_batch(self, jobs, pool):
+        """Take up to BATCH_SIZE jobs and start decoding their carriers"""
+        batch = []
+        for index, job in jobs:
+            carrier, message, recipient_name = job[:3]
+            output_path = job[3] if len(job) > 3 else None
+            batch.append((index, carrier, message, recipient_name, output_path, pool.submit(self._decode_carrier, carrier)))
+            if len(batch) >= self.BATCH_SIZE:
+                break
+        return batch
+    
+    def _decode_carrier(self, carrier):
+        """(opened image, samples) of a carrier, or None for carriers hidden one by one"""
+        from .audio import is_wav
+        from .frames import is_multi_frame
+        if isinstance(carrier, CarrierTemplate) or is_wav(carrier) or is_multi_frame(carrier):
+            return None
+        img = self.stego.open_image(carrier)
+        return img, self.stego.load_image(img)
+    
+    def _encrypt_batch(self, items, share_encapsulation, shared):
+        """Payload or exception for each (index, message, recipient_name)"""
+        payloads = {}
+        if not share_encapsulation:
+            for index, message, recipient_name in items:
+                try:
+                    payloads[index] = self.encrypt_payload(message, recipient_name)
+                except Exception as e:
+                    payloads[index] = e
+            return payloads
+        
+        by_recipient = {}
+        for index, message, recipient_name in items:
+            by_recipient.setdefault(recipient_name, []).append((index, message))
+        for recipient_name, entries in by_recipient.items():
+            try:
+                # One encapsulation per recipient for the whole call
+                if recipient_name not in shared:
+                    shared[recipient_name] = self.key_manager.encrypt_message(recipient_name, None)
+                for index, message in entries:
+                    payloads[index] = self.seal_shared(message, recipient_name, shared[recipient_name])
+            except Exception as e:
+                for index, _ in entries:
+                    payloads.setdefault(index, e)
+        return payloads
+    
+    def _hide_batch(self, batch, pool, stego_key, share_encapsulation, shared):
+        """Encrypt and embed one batch; returns (index, future of the output) pairs in job order"""
+        payloads = self._encrypt_batch(
+            [(index, message, recipient_name) for index, _, message, recipient_name, _, _ in batch],
+            share_encapsulation,
+            shared
+        )
+        
+        results, embeddable = {}, []
+        for index, carrier, _, _, output_path, decoded in batch:
+            payload = payloads[index]
+            try:
+                if isinstance(payload, Exception):
+                    raise payload
+                decoded = decoded.result()
+                if decoded is None:
+                    results[index] = pool.submit(self.stego.hide_message, carrier, payload, output_path, stego_key)
+                    continue
+                self.stego.check_capacity(decoded[1], len(payload))
+                embeddable.append((index, carrier, output_path, decoded[0], decoded[1], payload))
+            except Exception as e:
+                results[index] = e
+        
+        if embeddable:
+            stego_arrays = self.stego.embed_many(
+                [img_array for _, _, _, _, img_array, _ in embeddable],
+                [payload for _, _, _, _, _, payload in embeddable],
+                stego_key
+            )
+            for (index, carrier, output_path, img, _, _), stego_array in zip(embeddable, stego_arrays):
+                results[index] = pool.submit(self._write_output, carrier, img, stego_array, output_path)
+        
+        return [(index, results[index]) for index, _, _, _, _, _ in batch]
+    
+    def _write_output(self, carrier, img, stego_array, output_path):
+        """Encode a stego array the way hide_message would for this carrier"""
+        if output_path is not None:
+            return self.stego.save_image(stego_array, output_path)
+        if isinstance(carrier, (str, os.PathLike)):
+            base, ext = os.path.splitext(carrier)
+            return self.stego.save_image(stego_array, f"{base}_stego{ext}")
+        return self.stego.to_carrier_kind(carrier, img, stego_array)
+    
+    @staticmethod
+    def _hide_done(outcome):
+        return isinstance(outcome, Exception) or outcome.done()
+    
+    @staticmethod
+    def _hide_result(index, outcome):
+        if isinstance(outcome, Exception):
+            return {'index': index, 'output': None, 'error': str(outcome)}
+        try:
+            return {'index': index, 'output': outcome.result(), 'error': None}
+        except Exception as e:
+            return {'index': index, 'output': None, 'error': str(e)}
+    
+    def encrypt_file_payload(self, file_path, recipient_name):
+        """Encrypt a file for a recipient chunk by chunk and serialise it as a stego payload"""
+        # The KEM does not depend on the message, so encapsulate before reading
+        encryption_result = self.key_manager.encrypt_message(recipient_name, None)
+        
+        attachment = {
+            'filename': os.path.basename(file_path),
+            'content_type': mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        }
+        with open(file_path, 'rb') as f:
+            chunks = iter(lambda: f.read(self.ATTACHMENT_CHUNK), b'')
+            return self.seal_chunks(chunks, recipient_name, encryption_result, attachment)
+    
+    def decrypt_payload(self, payload_bytes, decryptor_name):
+        """Decrypt a stego payload with the named keypair"""
+        return self.decrypt_payload_with_metadata(payload_bytes, decryptor_name)[0]
+    
+    def decrypt_payload_with_metadata(self, payload_bytes, decryptor_name):
+        """
+        Decrypt a stego payload, parsing it only once
+        
+        Returns:
+            Tuple of (decrypted bytes, payload metadata)
+        """
+        try:
+            parts = self.read_payload(payload_bytes)
+        except Exception as e:
+            raise ValueError(f"Error decrypting message: {str(e)}")
+        return self.decrypt_parts(parts, decryptor_name), parts[3]
+    
+    def decrypt_parts(self, parts, decryptor_name):
+        """Decrypt a payload already split by read_payload with the named keypair"""
+        cipher_data, encrypted_message, verification_data = parts[:3]
+        try:
+            # Decrypt the KEM ciphertext to get the encryption key
+            encryption_key = self.key_manager.decrypt_message(decryptor_name, cipher_data)
+            
+            # Messages from a shared encapsulation have their own key
+            if 'key_nonce' in cipher_data:
+                encryption_key = self.message_key(encryption_key, base64.b64decode(cipher_data['key_nonce']))
+            
+            return self.open_payload(encryption_key, encrypted_message, verification_data)
+        
+        except Exception as e:
+            raise ValueError(f"Error decrypting message: {str(e)}")
+    
+    @staticmethod
+    def to_bytes(message):
+        """Convert a message to bytes if it's a string"""
+        if isinstance(message, str):
+            return message.encode('utf-8')
+        return message
+    
+    def seal_payload(self, message_bytes, recipient_name, encryption_result):
+        """Krypton-encrypt a message with a derived key and build the JSON payload"""
+        return self.seal_chunks([message_bytes], recipient_name, encryption_result)
+    
+    def seal_chunks(self, chunks, recipient_name, encryption_result, attachment=None, key_nonce=None):
+        """
+        Krypton-encrypt a message given as a sequence of chunks and build the JSON payload
+        
+        Krypton is a stream cipher, so encrypting chunk by chunk gives the
+        same ciphertext as encrypting the joined message at once.
+        
+        Args:
+            chunks: Iterable of message byte strings
+            recipient_name: Name of the recipient's keypair
+            encryption_result: Output of KeyManager.encrypt_message
+            attachment: Optional dict with the filename and content_type of
+                an attached file
+            key_nonce: Nonce the message key was derived with, for
+                payloads sharing an encapsulation (see encrypt_many)
+        
+        Returns:
+            The payload as bytes
+        """
         # Create a Krypton cipher with the derived encryption key
         krypton = Krypton(encryption_result['encryption_key'])
         
-        # Encrypt the message
+        # Encrypt and base64-encode the message; encoding whole 3-byte groups
+        # lets the encoded pieces be joined without padding in between
         krypton.begin_encryption()
-        encrypted_message = krypton.encrypt(message_bytes)
+        encoded, carry = [], b''
+        for chunk in chunks:
+            data = carry + krypton.encrypt(chunk)
+            cut = len(data) - len(data) % 3
+            encoded.append(base64.b64encode(data[:cut]))
+            carry = data[cut:]
+        encoded.append(base64.b64encode(carry))
         verification_data = krypton.finish_encryption()
         
         # Prepare metadata
@@ -46,64 +389,67 @@ class CryptoStego:
             'cipher_text': encryption_result['cipher_text'],
             'verification_data': base64.b64encode(verification_data).decode('utf-8')
         }
+        if attachment is not None:
+            metadata['attachment'] = attachment
+        if key_nonce is not None:
+            metadata['key_nonce'] = base64.b64encode(key_nonce).decode('utf-8')
         
-        # Combine metadata and encrypted message
-        stego_payload = {
-            'metadata': metadata,
-            'encrypted_message': base64.b64encode(encrypted_message).decode('utf-8')
-        }
-        
-        # Convert to JSON and then to bytes
-        payload_bytes = json.dumps(stego_payload).encode('utf-8')
-        
-        # Hide the encrypted message in the image
-        output_path = self.stego.hide_message(image_path, payload_bytes, output_path)
+        # Serialise as {"metadata": ..., "encrypted_message": "..."}; base64
+        # needs no JSON escaping, so the encoded pieces are spliced in directly
+        head = json.dumps({'metadata': metadata})[:-1] + ', "encrypted_message": "'
+        return b''.join([head.encode('utf-8')] + encoded + [b'"}'])
+    
+    @staticmethod
+    def parse_payload(payload_bytes):
+        """
+        Split a JSON payload into its cryptographic parts
         
-        return output_path
+        Returns:
+            Tuple of (cipher_data, encrypted_message, verification_data)
+        """
+        return CryptoStego.read_payload(payload_bytes)[:3]
     
-    def retrieve_encrypted_message(self, stego_image_path, decryptor_name):
+    @staticmethod
+    def read_payload(payload_bytes):
         """
-        Retrieve and decrypt a message hidden in an image
+        Split a JSON payload into its cryptographic parts and metadata
+        
+        Large payloads make the JSON and base64 decoding costly, so callers
+        that also need the metadata should parse once here and decrypt with
+        decrypt_parts.
         
-        Args:
-            stego_image_path: Path to the steganographic image
-            decryptor_name: Name of the keypair to use for decryption
-            
         Returns:
-            The decrypted message as bytes
+            Tuple of (cipher_data, encrypted_message, verification_data,
+            metadata)
         """
-        # Extract the hidden data from the image
-        payload_bytes = self.stego.retrieve_message(stego_image_path)
+        stego_payload = json.loads(payload_bytes.decode('utf-8'))
         
-        # Parse the JSON payload
-        try:
-            stego_payload = json.loads(payload_bytes.decode('utf-8'))
-            
-            metadata = stego_payload['metadata']
-            encrypted_message = base64.b64decode(stego_payload['encrypted_message'])
-            verification_data = base64.b64decode(metadata['verification_data'])
-            
-            # Prepare cipher data for decryption
-            cipher_data = {
-                'kdf_salt': metadata['kdf_salt'],
-                'cipher_text': metadata['cipher_text']
-            }
-            
-            # Decrypt the KEM ciphertext to get the encryption key
-            encryption_key = self.key_manager.decrypt_message(decryptor_name, cipher_data)
-            
-            # Create a Krypton cipher with the decrypted key
-            krypton = Krypton(encryption_key)
-            
-            # Decrypt the message
-            krypton.begin_decryption(verification_data)
-            decrypted_message = krypton.decrypt(encrypted_message)
-            krypton.finish_decryption()
-            
-            return decrypted_message
-            
-        except Exception as e:
-            raise ValueError(f"Error decrypting message: {str(e)}")
+        metadata = stego_payload['metadata']
+        encrypted_message = base64.b64decode(stego_payload['encrypted_message'])
+        verification_data = base64.b64decode(metadata['verification_data'])
+        
+        # Prepare cipher data for decryption
+        cipher_data = {
+            'kdf_salt': metadata['kdf_salt'],
+            'cipher_text': metadata['cipher_text']
+        }
+        if 'key_nonce' in metadata:
+            cipher_data['key_nonce'] = metadata['key_nonce']
+        
+        return cipher_data, encrypted_message, verification_data, metadata
+    
+    @staticmethod
+    def open_payload(encryption_key, encrypted_message, verification_data):
+        """Krypton-decrypt a message with the recovered encryption key"""
+        # Create a Krypton cipher with the decrypted key
+        krypton = Krypton(encryption_key)
+        
+        # Decrypt the message
+        krypton.begin_decryption(verification_data)
+        decrypted_message = krypton.decrypt(encrypted_message)
+        krypton.finish_decryption()
+        
+        return decrypted_message
     
     def export_public_key(self, keypair_name):
         """Export public key of a keypair for sharing"""
@@ -111,4 +457,4 @@ class CryptoStego:
         if not keypair:
             raise ValueError(f"Keypair '{keypair_name}' not found")
         
-        return keypair['public_key'] 
\ No newline at end of file
+        return keypair['public_key']
\ No newline at end of file
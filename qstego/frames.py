@@ -0,0 +1,201 @@
+import os
+
+import numpy as np
+from PIL import Image, ImageSequence
+from PIL.TiffImagePlugin import AppendingTiffWriter
+
+from .permutation import FeistelPermutation
+from .steganography import Steganography
+
+# Output formats that keep every sample bit of every frame
+MULTI_FRAME_FORMATS = {'.tif': 'TIFF', '.tiff': 'TIFF', '.png': 'PNG', '.apng': 'PNG'}
+
+
+def frame_count(image_path):
+    """Number of frames in an image file (1 for still images)"""
+    with Image.open(image_path) as img:
+        return getattr(img, 'n_frames', 1)
+
+
+def is_multi_frame(path):
+    """Whether a path names an image file with more than one frame"""
+    if not isinstance(path, (str, os.PathLike)):
+        return False
+    try:
+        return frame_count(path) > 1
+    except Exception:
+        # Let the single-image path report unreadable files
+        return False
+
+
+def _frame_key(key, index):
+    """Stego key for one frame; frame 0 uses the key itself, as single images do"""
+    if key is None or index == 0:
+        return key
+    if isinstance(key, str):
+        key = key.encode('utf-8')
+    return key + b'/frame/' + str(index).encode('ascii')
+
+
+class MultiFrameSteganography:
+    """
+    LSB steganography across the frames of animations and multi-page TIFFs
+    
+    The header and payload bits fill frame 0 first and continue into the
+    following frames, so frame 0 is laid out exactly like a single image.
+    With a stego key each frame is spread with its own permutation. Frames
+    are decoded, embedded and encoded one at a time; TIFF output is written
+    page by page, while APNG output is buffered by Pillow's encoder.
+    Extraction stops at the last frame that holds payload.
+    """
+    
+    HEADER = Steganography.HEADER
+    MAGIC = Steganography.MAGIC
+    VERSION = Steganography.VERSION
+    
+    def _carrier_mode(self, img):
+        """Mode every frame is converted to, or None to keep each frame's own mode"""
+        # GIF and WebP frames are re-quantized or lossy on save, so their
+        # frames are carried as RGBA in a lossless container instead
+        if img.format in ('GIF', 'WEBP'):
+            return 'RGBA'
+        return None
+    
+    def _frames(self, img, mode):
+        """Lazily yield every frame as an image whose samples can carry bits"""
+        for frame in ImageSequence.Iterator(img):
+            if mode is not None and frame.mode != mode:
+                frame = frame.convert(mode)
+            elif frame.mode == '1':
+                frame = frame.convert('L')
+            yield frame
+    
+    def capacity(self, image_path):
+        """Number of payload bytes all frames together can hold"""
+        return max(0, self._samples(image_path) // 8 - self.HEADER.size)
+    
+    def _samples(self, image_path):
+        """Number of samples over all frames, one payload bit each"""
+        with Image.open(image_path) as img:
+            mode = self._carrier_mode(img)
+            bands = len(Image.new(mode, (1, 1)).getbands()) if mode else None
+            samples = 0
+            for frame in ImageSequence.Iterator(img):
+                samples += frame.width * frame.height * (bands or len(frame.getbands()))
+        return samples
+    
+    def _output(self, image_path, img, output_path):
+        """Output path and format; defaults to a "_stego" file in a lossless container"""
+        if output_path is None:
+            base, ext = os.path.splitext(image_path)
+            if ext.lower() not in MULTI_FRAME_FORMATS:
+                ext = '.png'
+            output_path = f"{base}_stego{ext}"
+        elif not isinstance(output_path, (str, os.PathLike)):
+            raise ValueError("Multi-frame output must be written to a file path")
+        output_format = MULTI_FRAME_FORMATS.get(os.path.splitext(output_path)[1].lower())
+        if output_format is None:
+            raise ValueError("Multi-frame output must be a PNG (APNG) or TIFF file")
+        return output_path, output_format
+    
+    def hide_message(self, image_path, message_bytes, output_path=None, key=None):
+        """
+        Hide a byte message across the frames of an image file
+        
+        Args:
+            image_path: Path to the multi-frame carrier
+            message_bytes: Payload to hide
+            output_path: PNG or TIFF path to write (default: "_stego" next
+                to the carrier)
+            key: Optional shared secret for keyed spreading
+        
+        Returns:
+            Path to the output image
+        """
+        samples = self._samples(image_path)
+        if (self.HEADER.size + len(message_bytes)) * 8 > samples:
+            max_bytes = max(0, samples // 8 - self.HEADER.size)
+            raise ValueError(f"Message too large! Image can only hold {max_bytes} bytes but message is {len(message_bytes)} bytes")
+        
+        record = self.HEADER.pack(self.MAGIC, self.VERSION, len(message_bytes)) + bytes(message_bytes)
+        bits = np.unpackbits(np.frombuffer(record, dtype=np.uint8))
+        
+        with Image.open(image_path) as img:
+            output_path, output_format = self._output(image_path, img, output_path)
+            frames = self._embedded_frames(self._frames(img, self._carrier_mode(img)), bits, key)
+            
+            if output_format == 'TIFF':
+                with open(output_path, 'w+b') as fp, AppendingTiffWriter(fp) as tiff:
+                    for frame in frames:
+                        frame.save(tiff, format='TIFF', compression='tiff_deflate')
+                        tiff.newFrame()
+            else:
+                # The APNG encoder needs every frame at once
+                frames = list(frames)
+                frames[0].save(
+                    output_path,
+                    format='PNG',
+                    save_all=True,
+                    append_images=frames[1:],
+                    duration=[frame.info.get('duration', 0) for frame in frames],
+                    loop=img.info.get('loop', 0)
+                )
+        
+        return output_path
+    
+    def _embedded_frames(self, frames, bits, key):
+        """Embed the next run of bits into each frame and yield standalone frames"""
+        offset = 0
+        for index, frame in enumerate(frames):
+            duration = frame.info.get('duration', 0)
+            if offset >= bits.size:
+                # Frames past the payload are copied unchanged
+                out = frame.copy()
+            else:
+                img_array = np.array(frame)
+                flat_array = img_array.reshape(-1)
+                count = min(flat_array.size, bits.size - offset)
+                positions = self._positions(key, index, flat_array.size, 0, count)
+                flat_array[positions] = (flat_array[positions] >> 1 << 1) | bits[offset:offset + count]
+                offset += count
+                
+                out = Image.fromarray(img_array)
+                if frame.mode == 'P':
+                    out.putpalette(frame.getpalette())
+            out.info['duration'] = duration
+            yield out
+    
+    def _positions(self, key, index, samples, start, count):
+        if key is None:
+            return slice(start, start + count)
+        return FeistelPermutation(_frame_key(key, index), samples).positions(start, count)
+    
+    def retrieve_message(self, image_path, key=None):
+        """Retrieve a hidden message, reading frames only until the payload is complete"""
+        try:
+            header_bits = self.HEADER.size * 8
+            with Image.open(image_path) as img:
+                chunks, remaining = [], None
+                for index, frame in enumerate(self._frames(img, self._carrier_mode(img))):
+                    flat_array = np.asarray(frame).reshape(-1)
+                    start = 0
+                    if remaining is None:
+                        # Frame 0 starts with the header
+                        if flat_array.size < header_bits:
+                            break
+                        header = flat_array[self._positions(key, 0, flat_array.size, 0, header_bits)] & 1
+                        magic, version, length = self.HEADER.unpack(np.packbits(header.astype(np.uint8)).tobytes())
+                        if magic != self.MAGIC or version != self.VERSION:
+                            break
+                        start, remaining = header_bits, length * 8
+                    
+                    count = min(flat_array.size - start, remaining)
+                    positions = self._positions(key, index, flat_array.size, start, count)
+                    chunks.append((flat_array[positions] & 1).astype(np.uint8))
+                    remaining -= count
+                    if remaining == 0:
+                        return np.packbits(np.concatenate(chunks)).tobytes()
+            
+            raise ValueError("No hidden message found in this image")
+        except Exception as e:
+            raise ValueError(f"Error retrieving message: {str(e)}")
@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+
+class ImageCache:
+    """
+    Decoded images and previews shared by the GUI tabs
+    
+    Entries are keyed by path, modification time and size, so an image is
+    decoded once no matter how many tabs and operations use it, and a file
+    that changes on disk is decoded again. The least recently used entries
+    are evicted once the cache holds more than max_bytes.
+    """
+    
+    def __init__(self, max_bytes=512 * 1024 * 1024, preview_size=(300, 300)):
+        self.max_bytes = max_bytes
+        self.preview_size = preview_size
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+    
+    @property
+    def size_bytes(self):
+        return self._bytes
+    
+    def _key(self, path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+    
+    def _get(self, key, kind):
+        with self._lock:
+            value = self._entries.get((key, kind))
+            if value is not None:
+                self._entries.move_to_end((key, kind))
+            return value
+    
+    def _put(self, key, kind, value, nbytes):
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            # Older versions of the same file will never be asked for again
+            for stale in [k for k in self._entries if k[0][0] == key[0] and k[0] != key]:
+                self._drop(stale)
+            if (key, kind) in self._entries:
+                self._drop((key, kind))
+            self._entries[(key, kind)] = (value, nbytes)
+            self._bytes += nbytes
+            while self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+    
+    def _drop(self, entry_key):
+        _, nbytes = self._entries.pop(entry_key)
+        self._bytes -= nbytes
+    
+    def array(self, path):
+        """Decoded sample array of an image file; treat it as read-only"""
+        key = self._key(path)
+        cached = self._get(key, 'array')
+        if cached is not None:
+            return cached[0]
+        return self._decode(path, key)[0]
+    
+    def preview(self, path):
+        """Thumbnail of an image file for display"""
+        key = self._key(path)
+        cached = self._get(key, 'preview')
+        if cached is not None:
+            return cached[0]
+        
+        cached = self._get(key, 'array')
+        if cached is not None:
+            preview = self._make_preview(Image.fromarray(cached[0]))
+            self._put(key, 'preview', preview, _image_bytes(preview))
+            return preview
+        
+        # Decode fully: hiding or revealing will need the samples anyway
+        return self._decode(path, key)[1]
+    
+    def put(self, path, img_array, preview=None, key=None):
+        """Cache the samples of a file that was just read or written"""
+        key = key or self._key(path)
+        # Callers share the array, so it must not change behind their backs
+        img_array.setflags(write=False)
+        self._put(key, 'array', img_array, img_array.nbytes)
+        if preview is not None:
+            self._put(key, 'preview', preview, _image_bytes(preview))
+    
+    def _decode(self, path, key):
+        with Image.open(path) as img:
+            img_array = np.array(img)
+            preview = self._make_preview(img)
+        self.put(path, img_array, preview, key=key)
+        return img_array, preview
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+    
+    def _make_preview(self, img):
+        preview = img.copy()
+        preview.thumbnail(self.preview_size)
+        return preview
+
+
+def _image_bytes(img):
+    return img.width * img.height * len(img.getbands())
@@ -0,0 +1,322 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# Default output file names; see render_output for the fields
+HIDE_PATTERN = '{stem}_{key}_stego.png'
+REVEAL_PATTERN = '{filename}'
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled while running"""
+
+
+def render_output(pattern, source, index, key_name, filename=None):
+    """
+    Expand an output path pattern for one job
+    
+    Fields: {stem} and {ext} of the source image, {name} (stem plus ext),
+    {key} (recipient or decryption keypair), {index} (job number) and, for
+    reveal jobs, {filename} (the attached file's name, or "<stem>.txt" for
+    a text message).
+    """
+    name = os.path.basename(source)
+    stem, ext = os.path.splitext(name)
+    try:
+        return pattern.format(
+            stem=stem,
+            ext=ext,
+            name=name,
+            key=key_name,
+            index=index,
+            filename=filename or f"{stem}.txt"
+        )
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Invalid output pattern {pattern!r}: {str(e)}")
+
+
+class Job:
+    """One hide or reveal operation in a JobQueue"""
+    
+    def __init__(self, job_id, kind, source, key_name, output_pattern, message=None, file_path=None):
+        self.id = job_id
+        self.kind = kind
+        self.source = source
+        self.key_name = key_name
+        self.output_pattern = output_pattern
+        self.message = message
+        self.file_path = file_path
+        self.size = os.path.getsize(source)
+        
+        self.state = QUEUED
+        self.stage = ''
+        self.progress = 0.0
+        self.attempts = 0
+        self.error = None
+        self.output_path = None
+        self.started = None
+        self.finished = None
+        # Bumped on every change so views redraw only the jobs that changed
+        self.version = 0
+        
+        self._future = None
+        self._cancel = threading.Event()
+    
+    @property
+    def finished_state(self):
+        return self.state in FINISHED_STATES
+
+
+class JobQueue:
+    """
+    Bounded pool of hide and reveal jobs for the GUI
+    
+    Jobs run on a fixed number of threads sharing one CryptoStego, so keys
+    are loaded once; the cipher, the KDF and the image codecs release the
+    GIL, which lets several jobs make progress at once. Each job reports its
+    stage and progress, can be cancelled while queued or between stages,
+    and can be retried once it has failed or been cancelled. Nothing in
+    this class touches Tk: views poll snapshot() and stats().
+    """
+    
+    def __init__(self, crypto_stego, workers=None, stego_key=None):
+        """
+        Args:
+            crypto_stego: CryptoStego whose keystore the jobs use
+            workers: Jobs run at once (default: CPU count, at most 4)
+            stego_key: Shared secret for keyed spreading, if any
+        """
+        self.crypto_stego = crypto_stego
+        self.stego_key = stego_key
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='qstego-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._next_id = 1
+        # Output paths handed out but possibly not written yet
+        self._reserved = set()
+        
+        # Throughput counts only the time some job was running
+        self._running = 0
+        self._busy_since = None
+        self._busy_seconds = 0.0
+        self._done_bytes = 0
+        self._done_jobs = 0
+    
+    def close(self, wait=True):
+        """Cancel every unfinished job; with wait, also wait for the running ones to stop"""
+        self.cancel_all()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+    
+    def add_hide(self, carrier_path, recipient_name, output_pattern=HIDE_PATTERN, message=None, file_path=None):
+        """Queue hiding a message, or the file at file_path, in a carrier for a recipient"""
+        if (message is None) == (file_path is None):
+            raise ValueError("Give either a message or a file to hide")
+        return self._add('hide', carrier_path, recipient_name, output_pattern, message, file_path)
+    
+    def add_reveal(self, stego_image_path, decryptor_name, output_pattern=REVEAL_PATTERN):
+        """Queue revealing the message in a stego image with a local keypair"""
+        return self._add('reveal', stego_image_path, decryptor_name, output_pattern)
+    
+    def _add(self, kind, source, key_name, output_pattern, message=None, file_path=None):
+        # Catch pattern mistakes now rather than when the job runs
+        render_output(output_pattern, source, 0, key_name)
+        with self._lock:
+            job = Job(self._next_id, kind, source, key_name, output_pattern, message, file_path)
+            self._next_id += 1
+            self._jobs[job.id] = job
+            self._submit(job)
+        return job
+    
+    def _submit(self, job):
+        """Hand a job to the pool (caller holds the lock)"""
+        job.state = QUEUED
+        job.stage = ''
+        job.progress = 0.0
+        job.error = None
+        job._cancel.clear()
+        job.version += 1
+        job._future = self._executor.submit(self._run, job)
+    
+    def cancel(self, job_id):
+        """
+        Cancel a job
+        
+        A queued job is dropped at once; a running job stops before its
+        next stage and leaves no output behind.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished_state:
+                return False
+            job._cancel.set()
+            if job._future.cancel():
+                self._finish(job, CANCELLED)
+            return True
+    
+    def cancel_all(self):
+        """Cancel every job that has not finished"""
+        for job in self.snapshot():
+            self.cancel(job.id)
+    
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.state not in (FAILED, CANCELLED):
+                return False
+            self._submit(job)
+            return True
+    
+    def clear_finished(self):
+        """Forget every job that is done, failed or cancelled"""
+        with self._lock:
+            for job_id in [job.id for job in self._jobs.values() if job.finished_state]:
+                del self._jobs[job_id]
+    
+    def snapshot(self):
+        """Jobs in the order they were added"""
+        with self._lock:
+            return list(self._jobs.values())
+    
+    def stats(self):
+        """
+        Counts per state and aggregate throughput
+        
+        Returns:
+            Dict with a count for every state, plus done jobs and source
+            bytes per second of time during which any job was running
+        """
+        with self._lock:
+            counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED, CANCELLED), 0)
+            for job in self._jobs.values():
+                counts[job.state] += 1
+            busy = self._busy_seconds
+            if self._busy_since is not None:
+                busy += time.perf_counter() - self._busy_since
+            counts['jobs_per_second'] = self._done_jobs / busy if busy else 0.0
+            counts['bytes_per_second'] = self._done_bytes / busy if busy else 0.0
+            return counts
+    
+    def _update(self, job, stage, progress):
+        """Record progress, or stop here if the job was cancelled"""
+        if job._cancel.is_set():
+            raise JobCancelled()
+        with self._lock:
+            job.stage = stage
+            job.progress = progress
+            job.version += 1
+    
+    def _reserve(self, job, filename=None):
+        """Expand the job's output pattern to a path no other job or file uses"""
+        path = render_output(job.output_pattern, job.source, job.id, job.key_name, filename)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        base, ext = os.path.splitext(path)
+        with self._lock:
+            count = 1
+            while path in self._reserved or os.path.exists(path):
+                path = f"{base}-{count}{ext}"
+                count += 1
+            self._reserved.add(path)
+        return path
+    
+    def _run(self, job):
+        with self._lock:
+            job.state = RUNNING
+            job.attempts += 1
+            job.started = time.perf_counter()
+            job.version += 1
+            if self._running == 0:
+                self._busy_since = job.started
+            self._running += 1
+        
+        output_path = None
+        try:
+            if job.kind == 'hide':
+                output_path = self._hide(job)
+            else:
+                output_path = self._reveal(job)
+            state, error = DONE, None
+        except JobCancelled:
+            state, error = CANCELLED, None
+        except Exception as e:
+            state, error = FAILED, str(e)
+        if state != DONE and output_path is not None:
+            self._discard(output_path)
+        
+        with self._lock:
+            self._running -= 1
+            if self._running == 0:
+                self._busy_seconds += time.perf_counter() - self._busy_since
+                self._busy_since = None
+            if state == DONE:
+                self._done_jobs += 1
+                self._done_bytes += job.size
+                job.output_path = output_path
+                job.progress = 1.0
+            job.error = error
+            self._finish(job, state)
+    
+    def _finish(self, job, state):
+        """Move a job to a final state (caller holds the lock)"""
+        job.state = state
+        job.stage = ''
+        job.finished = time.perf_counter()
+        job.version += 1
+    
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        with self._lock:
+            self._reserved.discard(path)
+    
+    def _hide(self, job):
+        crypto_stego = self.crypto_stego
+        self._update(job, 'encrypting', 0.1)
+        if job.file_path is not None:
+            payload_bytes = crypto_stego.encrypt_file_payload(job.file_path, job.key_name)
+        else:
+            payload_bytes = crypto_stego.encrypt_payload(job.message, job.key_name)
+        
+        self._update(job, 'embedding', 0.5)
+        output_path = self._reserve(job)
+        try:
+            crypto_stego.stego.hide_message(job.source, payload_bytes, output_path, self.stego_key)
+        except BaseException:
+            self._discard(output_path)
+            raise
+        return output_path
+    
+    def _reveal(self, job):
+        crypto_stego = self.crypto_stego
+        self._update(job, 'extracting', 0.1)
+        payload_bytes = crypto_stego.stego.retrieve_message(job.source, self.stego_key)
+        
+        self._update(job, 'decrypting', 0.5)
+        plaintext, metadata = crypto_stego.decrypt_payload_with_metadata(payload_bytes, job.key_name)
+        attachment = metadata.get('attachment')
+        
+        self._update(job, 'writing', 0.9)
+        filename = os.path.basename(attachment.get('filename') or '') if attachment else None
+        output_path = self._reserve(job, filename or None)
+        try:
+            with open(output_path, 'wb') as f:
+                f.write(plaintext)
+        except BaseException:
+            self._discard(output_path)
+            raise
+        return output_path
@@ -0,0 +1,161 @@
+import json
+import os
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class KeystoreJournal:
+    """
+    Append-only log of keystore file changes
+    
+    Every keystore mutation atomically replaces or removes a file and then
+    appends one line describing it. Readers remember how far they have read
+    and replay only the new lines to pick up changes made by other processes.
+    The first line identifies the journal; when the journal is compacted a
+    new identity is written, telling readers to fall back to a full reload.
+    """
+    
+    FILENAME = 'journal.log'
+    LOCK_FILENAME = '.keystore.lock'
+    
+    # Compact the journal once it grows beyond this size
+    COMPACT_SIZE = 1024 * 1024
+    
+    def __init__(self, keys_dir):
+        self.path = os.path.join(keys_dir, self.FILENAME)
+        self.lock_path = os.path.join(keys_dir, self.LOCK_FILENAME)
+    
+    @contextmanager
+    def lock(self):
+        """Serialise writers across processes; readers never take this lock"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    
+    def _create(self):
+        """Start a new journal with a fresh identity (caller holds the lock)"""
+        header = (json.dumps({'journal': uuid.uuid4().hex}) + '\n').encode('utf-8')
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+    
+    def ensure(self):
+        """Create the journal if there is none yet (caller holds the lock)"""
+        if self.identity()[0] is None:
+            self._create()
+    
+    def append(self, op, filename):
+        """
+        Record a change (caller holds the lock)
+        
+        Returns:
+            Tuple of (journal_id, start, end) byte offsets of the new entry
+        """
+        if not os.path.exists(self.path):
+            self._create()
+        
+        line = (json.dumps({'op': op, 'file': filename}) + '\n').encode('utf-8')
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, line)
+            os.fsync(fd)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        
+        journal_id, _ = self.identity()
+        return journal_id, end - len(line), end
+    
+    def identity(self):
+        """
+        Identity of the current journal and the offset right after its header
+        
+        Returns:
+            Tuple of (journal_id, offset), or (None, 0) if there is no journal
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+        except FileNotFoundError:
+            return None, 0
+        if not header.endswith(b'\n'):
+            return None, 0
+        try:
+            return json.loads(header)['journal'], len(header)
+        except (ValueError, KeyError):
+            return None, 0
+    
+    def end(self):
+        """Current identity and end offset; everything before it has been applied"""
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+                f.seek(0, os.SEEK_END)
+                size = f.tell()
+        except FileNotFoundError:
+            return None, 0
+        try:
+            return json.loads(header)['journal'], size
+        except (ValueError, KeyError):
+            return None, 0
+    
+    def read_since(self, journal_id, offset):
+        """
+        Read entries appended after offset
+        
+        Returns:
+            Tuple of (entries, new_offset), or (None, 0) if the journal was
+            replaced since journal_id was read and a full reload is needed
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                header = f.readline()
+                try:
+                    current_id = json.loads(header)['journal']
+                except (ValueError, KeyError):
+                    return None, 0
+                if current_id != journal_id:
+                    return None, 0
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return None, 0
+        
+        # Ignore a trailing line that is still being written
+        complete = data.rfind(b'\n') + 1
+        entries = []
+        for line in data[:complete].splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries, offset + complete
+    
+    def needs_compaction(self):
+        try:
+            return os.path.getsize(self.path) > self.COMPACT_SIZE
+        except OSError:
+            return False
+    
+    def compact(self):
+        """
+        Replace the journal with an empty one (caller holds the lock)
+        
+        The keystore files themselves are the source of truth, so history
+        can be dropped; readers notice the new identity and reload fully.
+        """
+        self._create()
@@ -1,62 +1,404 @@
 import os
 import json
+import hashlib
+import time
+import uuid
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 import base64
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from quantcrypt.kem import MLKEM_1024
 from quantcrypt.kdf import Argon2
-import qrcode
 from io import BytesIO
 from PIL import Image
 import pyperclip
 
+from .prewarm import EncapsulationPool
+from .journal import KeystoreJournal
+from . import keyqr
+
+# Keystore file holding many keypairs written in a single transaction
+KEYPACK_FORMAT = 'qstego-keypack'
+
+# Distribution bundle holding many public keys
+KEYRING_FORMAT = 'qstego-keyring'
+
+# Rendered QR code images kept in memory
+QR_CACHE_SIZE = 32
+
+# Decryption keys kept per (keypair, KEM ciphertext, salt); payloads hidden
+# by one hide_many call share an encapsulation, so revealing a batch runs
+# Argon2 once
+DERIVED_KEY_CACHE = 256
+
+def _new_keypair(kem, name):
+    """Generate a keypair and build its armored storage record"""
+    public_key, secret_key = kem.keygen()
+    
+    # Convert binary keys to armored format for storage
+    return {
+        'name': name,
+        'algorithm': 'MLKEM_1024',
+        'public_key': kem.armor(public_key),
+        'secret_key': kem.armor(secret_key)
+    }
+
+# Bundles smaller than this are validated in-process
+PARALLEL_VALIDATION_THRESHOLD = 256
+
+_worker_kem = None
+
+def _get_worker_kem():
+    global _worker_kem
+    if _worker_kem is None:
+        _worker_kem = MLKEM_1024()
+    return _worker_kem
+
+def _generate_keypair_batch(names):
+    """Process pool worker: generate keypairs for a batch of names"""
+    kem = _get_worker_kem()
+    return [_new_keypair(kem, name) for name in names]
+
+def _dearmor_public_keys(armored_keys, kem=None):
+    """Dearmor public keys, returning (True, binary_key) or (False, error) for each"""
+    kem = kem or _get_worker_kem()
+    results = []
+    for armored_key in armored_keys:
+        try:
+            results.append((True, kem.dearmor(armored_key)))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
 class KeyManager:
-    def __init__(self, keys_dir='keys'):
+    def __init__(self, keys_dir='keys', load=True):
+        """
+        Args:
+            keys_dir: Directory holding the keystore
+            load: Read the keystore now; pass False to call load_keypairs
+                later, e.g. on a background thread
+        """
         self.keys_dir = Path(keys_dir)
         self.keys_dir.mkdir(exist_ok=True, parents=True)
         self.kem = MLKEM_1024()
         self.keypairs = {}
-        self.load_keypairs()
+        self._key_files = {}
+        self._binary_keys = {}
+        self.encapsulation_pool = None
+        self.journal = KeystoreJournal(self.keys_dir)
+        self._journal_position = (None, 0)
+        self._directory_stamp = None
+        self._mutation_lock = threading.RLock()
+        self._mutation_depth = 0
+        self._qr_images = OrderedDict()
+        self._qr_lock = threading.Lock()
+        self._derived_keys = OrderedDict()
+        self._derived_lock = threading.Lock()
+        if load:
+            self.load_keypairs()
     
     def load_keypairs(self):
         """Load all keypairs from the keys directory"""
-        self.keypairs = {}
+        previous = self.keypairs
+        keypairs = {}
+        key_files = {}
+        
+        # Changes journaled from here on are replayed by the next refresh. A
+        # keystore from before the journal gets one now, so that a missing
+        # journal never forces every refresh into a full reload
+        try:
+            with self._mutation():
+                self.journal.ensure()
+        except OSError as e:
+            print(f"Error creating the keystore journal: {str(e)}")
+        self._journal_position = self.journal.end()
+        self._directory_stamp = self._stamp_directory()
         
-        # Load keypairs from JSON files
+        # Load keypairs from JSON files, each holding one keypair or a key pack
         for key_file in self.keys_dir.glob('*.json'):
-            try:
-                with open(key_file, 'r') as f:
-                    keypair_data = json.load(f)
-                    name = keypair_data.get('name')
-                    if name:
-                        self.keypairs[name] = keypair_data
-            except Exception as e:
-                print(f"Error loading keypair from {key_file}: {str(e)}")
+            for keypair_data in self._read_key_file(key_file):
+                keypairs[keypair_data['name']] = keypair_data
+                key_files[keypair_data['name']] = key_file
+        
+        # Swap in the complete keystore at once, so readers on other threads
+        # never see it half loaded
+        self.keypairs = keypairs
+        self._key_files = key_files
+        self._binary_keys = {}
+        
+        # Drop precomputed encapsulations for keys that changed on disk
+        if self.encapsulation_pool is not None:
+            for name, keypair in previous.items():
+                current = self.keypairs.get(name)
+                if current is None or current.get('public_key') != keypair.get('public_key'):
+                    self.encapsulation_pool.discard(name)
+    
+    def refresh_keypairs(self):
+        """
+        Pick up keystore changes made since the last load or refresh
+        
+        Only the files named in the journal tail are re-read; a full reload
+        happens only if the journal was compacted or replaced. Key files
+        copied into the directory by hand are not journaled; load_keypairs
+        picks them up.
+        
+        Returns:
+            True if any keypair may have changed
+        """
+        entries, offset = self.journal.read_since(*self._journal_position)
+        if entries is None:
+            # Without a journal (read-only keystore), files being added,
+            # removed or renamed into place is what changes the directory
+            if self._journal_position[0] is None and self._stamp_directory() == self._directory_stamp:
+                return False
+            self.load_keypairs()
+            return True
+        
+        self._journal_position = (self._journal_position[0], offset)
+        for filename in dict.fromkeys(entry.get('file') for entry in entries if entry.get('file')):
+            self._apply_key_file(self.keys_dir / filename)
+        return bool(entries)
+    
+    def _stamp_directory(self):
+        try:
+            return os.stat(self.keys_dir).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _read_key_file(self, key_file):
+        """Keypairs stored in a single-key file or key pack"""
+        try:
+            with open(key_file, 'r') as f:
+                key_data = json.load(f)
+            entries = key_data.get('keypairs', []) if key_data.get('format') == KEYPACK_FORMAT else [key_data]
+            return [keypair_data for keypair_data in entries if keypair_data.get('name')]
+        except FileNotFoundError:
+            return []
+        except Exception as e:
+            print(f"Error loading keypair from {key_file}: {str(e)}")
+            return []
+    
+    def _apply_key_file(self, key_file):
+        """Replace the in-memory keypairs of one file with its current contents"""
+        stale = {name: self.keypairs.pop(name) for name, path in list(self._key_files.items()) if path == key_file}
+        for name in stale:
+            del self._key_files[name]
+        
+        for keypair_data in self._read_key_file(key_file):
+            name = keypair_data['name']
+            self.keypairs[name] = keypair_data
+            self._key_files[name] = key_file
+            old = stale.pop(name, None)
+            if old is None or old.get('public_key') != keypair_data.get('public_key') \
+                    or old.get('secret_key') != keypair_data.get('secret_key'):
+                self._forget_binary_keys(name)
+        
+        # Keypairs no longer in the file were deleted or moved elsewhere
+        for name in stale:
+            if name not in self.keypairs:
+                self._forget_binary_keys(name)
+    
+    def _binary_key(self, name, field):
+        """Dearmored public or secret key, cached after the first use"""
+        binary_key = self._binary_keys.get((name, field))
+        if binary_key is None:
+            binary_key = self.kem.dearmor(self.keypairs[name][field])
+            self._binary_keys[(name, field)] = binary_key
+        return binary_key
+    
+    def _forget_binary_keys(self, name):
+        self._binary_keys.pop((name, 'public_key'), None)
+        self._binary_keys.pop((name, 'secret_key'), None)
+        with self._derived_lock:
+            for cache_key in [cache_key for cache_key in self._derived_keys if cache_key[0] == name]:
+                del self._derived_keys[cache_key]
+        
+        # Precomputed encapsulations for the old key must not be used
+        if self.encapsulation_pool is not None:
+            self.encapsulation_pool.discard(name)
+    
+    def preload_keys(self):
+        """Dearmor every stored key up front so later operations skip it"""
+        for name, keypair in self.keypairs.items():
+            for field in ('public_key', 'secret_key'):
+                if keypair.get(field):
+                    try:
+                        self._binary_key(name, field)
+                    except Exception as e:
+                        print(f"Error preloading {field} of '{name}': {str(e)}")
     
     def generate_keypair(self, name):
         """Generate a new quantum-safe keypair"""
-        public_key, secret_key = self.kem.keygen()
-        
-        # Convert binary keys to armored format for storage
-        armored_public = self.kem.armor(public_key)
-        armored_secret = self.kem.armor(secret_key)
-        
-        # Create keypair data structure
-        keypair = {
-            'name': name,
-            'algorithm': 'MLKEM_1024',
-            'public_key': armored_public,
-            'secret_key': armored_secret
-        }
+        keypair = _new_keypair(self.kem, name)
         
         # Save to file
         key_path = self.keys_dir / f"{name}.json"
-        with open(key_path, 'w') as f:
-            json.dump(keypair, f, indent=2)
+        with self._mutation():
+            self._unstore([name], keep=key_path)
+            self._store_file(key_path, keypair, indent=2)
         
-        # Add to in-memory keypairs
+        # Add to in-memory keypairs; only then drop what was derived from the
+        # old key, so the prewarm thread cannot pick the old key up again
         self.keypairs[name] = keypair
+        self._key_files[name] = key_path
+        self._forget_binary_keys(name)
         return keypair
     
+    def generate_keypairs(self, names, workers=None, batch_size=256, bundle_path=None, overwrite=False):
+        """
+        Generate many keypairs in parallel
+        
+        Keypairs are generated across a process pool; each finished batch is
+        written to the keystore as one key pack file in a single atomic write.
+        
+        Args:
+            names: Names of the keypairs to generate
+            workers: Number of worker processes (default: CPU count)
+            batch_size: Number of keypairs per worker task and key pack
+            bundle_path: Optional path for a public-key bundle of the new keys
+            overwrite: Replace existing keypairs with the same names
+            
+        Returns:
+            Dict with the generated count, elapsed seconds, keys per second
+            and the bundle path
+        """
+        names = list(names)
+        if len(set(names)) != len(names):
+            raise ValueError("Keypair names must be unique")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if not overwrite:
+            existing = [name for name in names if name in self.keypairs]
+            if existing:
+                raise ValueError(f"Keypairs already exist: {', '.join(existing[:5])}"
+                                 + (" ..." if len(existing) > 5 else ""))
+        
+        start = time.perf_counter()
+        batches = [names[i:i + batch_size] for i in range(0, len(names), batch_size)]
+        
+        generated = 0
+        if batches:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(_generate_keypair_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    keypairs = future.result()
+                    self._write_keypack(keypairs)
+                    generated += len(keypairs)
+        
+        if bundle_path is not None:
+            self.export_keyring(names, bundle_path)
+        
+        elapsed = time.perf_counter() - start
+        return {
+            'count': generated,
+            'seconds': elapsed,
+            'keys_per_second': generated / elapsed if elapsed > 0 else float('inf'),
+            'bundle_path': bundle_path
+        }
+    
+    def _atomic_write_json(self, path, data, indent=None):
+        """Write JSON to a temporary file and rename it over path"""
+        path = Path(path)
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}-", suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f, indent=indent)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+    
+    @contextmanager
+    def _mutation(self):
+        """Hold the keystore writer lock (re-entrant within this manager)"""
+        with self._mutation_lock:
+            self._mutation_depth += 1
+            try:
+                if self._mutation_depth == 1:
+                    with self.journal.lock():
+                        yield
+                else:
+                    yield
+            finally:
+                self._mutation_depth -= 1
+    
+    def _record(self, op, path):
+        """Journal a keystore file change"""
+        journal_id, start, end = self.journal.append(op, Path(path).name)
+        
+        # Skip our own entry on the next refresh if we were already caught up
+        caught_up = self._journal_position == (journal_id, start)
+        if caught_up:
+            self._journal_position = (journal_id, end)
+        
+        if self.journal.needs_compaction():
+            self.journal.compact()
+            self._journal_position = self.journal.end() if caught_up else (None, 0)
+    
+    def _store_file(self, path, data, indent=None):
+        """Atomically write a keystore file and journal it"""
+        self._atomic_write_json(path, data, indent)
+        self._record('write', path)
+    
+    def _remove_file(self, path):
+        """Remove a keystore file and journal it"""
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return
+        self._record('remove', path)
+    
+    def _write_keypack(self, keypairs):
+        """Store several keypairs in one new key pack file"""
+        pack_path = self.keys_dir / f"keypack-{uuid.uuid4().hex}.json"
+        with self._mutation():
+            self._unstore([keypair['name'] for keypair in keypairs])
+            self._store_file(pack_path, {
+                'format': KEYPACK_FORMAT,
+                'version': 1,
+                'keypairs': keypairs
+            })
+        
+        # Add to in-memory keypairs
+        for keypair in keypairs:
+            self.keypairs[keypair['name']] = keypair
+            self._key_files[keypair['name']] = pack_path
+            self._forget_binary_keys(keypair['name'])
+        return pack_path
+    
+    def _unstore(self, names, keep=None):
+        """Remove keypairs from the files currently holding them, except from keep"""
+        by_file = {}
+        for name in names:
+            key_file = self._key_files.pop(name, None)
+            if key_file is not None and key_file != keep:
+                by_file.setdefault(key_file, set()).add(name)
+        
+        for key_file, file_names in by_file.items():
+            try:
+                with open(key_file, 'r') as f:
+                    key_data = json.load(f)
+            except FileNotFoundError:
+                continue
+            
+            if key_data.get('format') != KEYPACK_FORMAT:
+                self._remove_file(key_file)
+                continue
+            
+            # Rewrite the key pack without these keypairs
+            remaining = [k for k in key_data.get('keypairs', []) if k.get('name') not in file_names]
+            if remaining:
+                key_data['keypairs'] = remaining
+                self._store_file(key_file, key_data)
+            else:
+                self._remove_file(key_file)
+    
     def get_keypair(self, name):
         """Retrieve a keypair by name"""
         return self.keypairs.get(name)
@@ -81,27 +423,168 @@ class KeyManager:
             
             # Save to file
             key_path = self.keys_dir / f"{name}.json"
-            with open(key_path, 'w') as f:
-                json.dump(keypair, f, indent=2)
+            with self._mutation():
+                self._unstore([name], keep=key_path)
+                self._store_file(key_path, keypair, indent=2)
             
-            # Add to in-memory keypairs
+            # Add to in-memory keypairs, keeping the validated binary key
             self.keypairs[name] = keypair
+            self._key_files[name] = key_path
+            self._forget_binary_keys(name)
+            self._binary_keys[(name, 'public_key')] = binary_public_key
             return keypair
         except Exception as e:
             raise ValueError(f"Invalid public key: {str(e)}")
     
+    def _name_index(self):
+        """Highest numeric suffix in use for every base name"""
+        index = {}
+        for name in self.keypairs:
+            base, separator, suffix = name.rpartition('_')
+            if separator and suffix.isascii() and suffix.isdigit():
+                index[base] = max(index.get(base, 0), int(suffix))
+        return index
+    
+    def _unique_name(self, name, taken, index):
+        """Return name, or name with the next unused numeric suffix if it is taken"""
+        if name in taken:
+            counter = index.get(name, 0) + 1
+            index[name] = counter
+            name = f"{name}_{counter}"
+        else:
+            base, separator, suffix = name.rpartition('_')
+            if separator and suffix.isascii() and suffix.isdigit():
+                index[base] = max(index.get(base, 0), int(suffix))
+        taken.add(name)
+        return name
+    
+    def _import_name(self, name):
+        """Name for a single imported key; existing keys get a suffix"""
+        return self._unique_name(name, set(self.keypairs), self._name_index())
+    
+    def import_keyring(self, file_path, workers=None, skip_invalid=False):
+        """
+        Import every public key from a keyring bundle
+        
+        Keys are validated in parallel for large bundles, name collisions are
+        resolved with numeric suffixes, and all keys are committed to the
+        keystore in a single atomic write.
+        
+        Args:
+            file_path: Path to the .qkeyring bundle
+            workers: Number of validation processes (default: CPU count)
+            skip_invalid: Import the valid keys instead of rejecting the bundle
+            
+        Returns:
+            List of the imported keypairs
+        """
+        try:
+            with open(file_path, 'r') as f:
+                bundle = json.load(f)
+        except Exception as e:
+            raise ValueError(f"Error importing keyring: {str(e)}")
+        
+        if not isinstance(bundle, dict) or bundle.get('format') != KEYRING_FORMAT or not isinstance(bundle.get('keys'), list):
+            raise ValueError("Error importing keyring: not a keyring bundle")
+        
+        try:
+            return self.import_public_keys(bundle['keys'], workers, skip_invalid)
+        except ValueError as e:
+            raise ValueError(f"Error importing keyring: {str(e)}")
+    
+    def import_public_keys(self, entries, workers=None, skip_invalid=False):
+        """
+        Validate and import many public keys in a single keystore write
+        
+        Args:
+            entries: Dicts with name, algorithm and public_key
+            workers: Number of validation processes (default: CPU count)
+            skip_invalid: Import the valid keys instead of rejecting them all
+            
+        Returns:
+            List of the imported keypairs
+        """
+        # Validate the structure first, then dearmor the keys
+        errors = {}
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not all(k in entry for k in ["name", "algorithm", "public_key"]):
+                errors[i] = "Invalid key data"
+            elif entry['algorithm'] != 'MLKEM_1024':
+                errors[i] = f"Unsupported algorithm '{entry['algorithm']}'"
+        
+        candidates = [i for i in range(len(entries)) if i not in errors]
+        results = self._dearmor_many([entries[i]['public_key'] for i in candidates], workers)
+        
+        binary_keys = {}
+        for i, (valid, value) in zip(candidates, results):
+            if valid:
+                binary_keys[i] = value
+            else:
+                errors[i] = f"Invalid public key: {value}"
+        
+        if errors and not skip_invalid:
+            details = '; '.join(
+                f"{entries[i]['name'] if i in candidates else f'#{i}'}: {error}"
+                for i, error in sorted(errors.items())[:5]
+            )
+            raise ValueError(f"{len(errors)} invalid key(s) ({details})")
+        
+        # Assign collision-free names and commit everything in one write
+        taken = set(self.keypairs)
+        index = self._name_index()
+        keypairs = []
+        for i in sorted(binary_keys):
+            keypairs.append({
+                'name': self._unique_name(entries[i]['name'], taken, index),
+                'algorithm': 'MLKEM_1024',
+                'public_key': entries[i]['public_key'],
+                'secret_key': None
+            })
+        
+        if keypairs:
+            self._write_keypack(keypairs)
+            for keypair, i in zip(keypairs, sorted(binary_keys)):
+                self._binary_keys[(keypair['name'], 'public_key')] = binary_keys[i]
+        
+        return keypairs
+    
+    def _dearmor_many(self, armored_keys, workers=None):
+        """Dearmor public keys, across a process pool for large batches"""
+        if workers == 1 or len(armored_keys) < PARALLEL_VALIDATION_THRESHOLD:
+            return _dearmor_public_keys(armored_keys, self.kem)
+        
+        workers = workers or os.cpu_count() or 1
+        chunk_size = max(1, -(-len(armored_keys) // (workers * 4)))
+        chunks = [armored_keys[i:i + chunk_size] for i in range(0, len(armored_keys), chunk_size)]
+        
+        results = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk_results in executor.map(_dearmor_public_keys, chunks):
+                results.extend(chunk_results)
+        return results
+    
     def delete_keypair(self, name):
         """Delete a keypair"""
         if name in self.keypairs:
-            key_path = self.keys_dir / f"{name}.json"
-            if key_path.exists():
-                key_path.unlink()
+            with self._mutation():
+                self._unstore([name])
             del self.keypairs[name]
+            self._forget_binary_keys(name)
             return True
         return False
     
     def encrypt_message(self, recipient_keypair_name, message):
         """Encrypt a message using the recipient's public key"""
+        # Use a precomputed encapsulation if the prewarm pool has one ready
+        if self.encapsulation_pool is not None:
+            result = self.encapsulation_pool.take(recipient_keypair_name)
+            if result is not None:
+                return result
+        
+        return self.encapsulate(recipient_keypair_name)
+    
+    def encapsulate(self, recipient_keypair_name):
+        """Run the KEM encapsulation and Argon2 derivation for a recipient"""
         if recipient_keypair_name not in self.keypairs:
             raise ValueError(f"Keypair '{recipient_keypair_name}' not found")
         
@@ -110,7 +593,7 @@ class KeyManager:
             raise ValueError(f"Public key not available for '{recipient_keypair_name}'")
         
         # Get binary public key
-        binary_public_key = self.kem.dearmor(keypair['public_key'])
+        binary_public_key = self._binary_key(recipient_keypair_name, 'public_key')
         
         # Generate ciphertext and shared secret
         cipher_text, shared_secret = self.kem.encaps(binary_public_key)
@@ -126,6 +609,31 @@ class KeyManager:
             'encryption_key': encryption_key
         }
     
+    def enable_prewarm(self, recipients, low_water=2, high_water=8, max_bytes=4 * 1024 * 1024):
+        """
+        Precompute encapsulations for hot recipients in a background thread
+        
+        Args:
+            recipients: Names of the recipients to prewarm
+            low_water: Refill a recipient once fewer results than this are left
+            high_water: Number of results to keep ready per recipient
+            max_bytes: Upper bound on the memory held by precomputed results
+            
+        Returns:
+            The running EncapsulationPool
+        """
+        self.disable_prewarm()
+        self.encapsulation_pool = EncapsulationPool(
+            self, recipients, low_water=low_water, high_water=high_water, max_bytes=max_bytes
+        ).start()
+        return self.encapsulation_pool
+    
+    def disable_prewarm(self):
+        """Stop the prewarm pool and drop its precomputed results"""
+        if self.encapsulation_pool is not None:
+            self.encapsulation_pool.stop()
+            self.encapsulation_pool = None
+    
     def decrypt_message(self, owner_keypair_name, cipher_data):
         """Decrypt a message using the owner's secret key and the ciphertext"""
         if owner_keypair_name not in self.keypairs:
@@ -135,8 +643,16 @@ class KeyManager:
         if not keypair.get('secret_key'):
             raise ValueError(f"Secret key not available for '{owner_keypair_name}'")
         
+        # Payloads sealed with the same encapsulation share one derivation
+        cache_key = (owner_keypair_name, cipher_data['cipher_text'], cipher_data['kdf_salt'])
+        with self._derived_lock:
+            encryption_key = self._derived_keys.get(cache_key)
+            if encryption_key is not None:
+                self._derived_keys.move_to_end(cache_key)
+                return encryption_key
+        
         # Get binary secret key
-        binary_secret_key = self.kem.dearmor(keypair['secret_key'])
+        binary_secret_key = self._binary_key(owner_keypair_name, 'secret_key')
         
         # Decode ciphertext from base64
         cipher_text = base64.b64decode(cipher_data['cipher_text'])
@@ -148,97 +664,192 @@ class KeyManager:
         argon = Argon2.Key(shared_secret, cipher_data['kdf_salt'])
         encryption_key = argon.secret_key
         
+        with self._derived_lock:
+            self._derived_keys[cache_key] = encryption_key
+            if len(self._derived_keys) > DERIVED_KEY_CACHE:
+                self._derived_keys.popitem(last=False)
+        
         return encryption_key
+    
+    def generate_key_qr_code(self, keypair_name, size=400, max_part_bytes=None):
+        """Generate a QR code containing the public key; multi-part codes are placed side by side"""
+        return keyqr.tile_images(self.generate_key_qr_codes(keypair_name, size, max_part_bytes))
+    
+    def generate_key_qr_codes(self, keypair_name, size=400, max_part_bytes=None):
+        """
+        Generate the QR codes that carry a public key
+        
+        The key is stored as raw bytes in byte mode, which is far denser than
+        armored text. Rendered images are cached by key fingerprint and size.
         
-    def generate_key_qr_code(self, keypair_name, size=400):
-        """Generate a QR code containing the public key"""
+        Args:
+            keypair_name: Name of the keypair to share
+            size: Width and height of each QR code image in pixels
+            max_part_bytes: Split the key over several QR codes holding at
+                most this many bytes each
+        
+        Returns:
+            List of PIL images, one per QR code
+        """
         if keypair_name not in self.keypairs:
             raise ValueError(f"Keypair '{keypair_name}' not found")
-            
+        
         keypair = self.keypairs[keypair_name]
         if not keypair.get('public_key'):
             raise ValueError(f"Public key not available for '{keypair_name}'")
-            
-        # Create a simplified object with just name and public key
-        key_data = {
-            'name': keypair['name'],
-            'algorithm': keypair['algorithm'],
-            'public_key': keypair['public_key']
-        }
-        
-        # Convert to JSON and create QR code
-        key_json = json.dumps(key_data)
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(key_json)
-        qr.make(fit=True)
         
-        # Create an image from the QR Code
-        img = qr.make_image(fill_color="black", back_color="white")
+        record = keyqr.encode_key_record(keypair['name'], self._binary_key(keypair_name, 'public_key'))
+        cache_key = (hashlib.sha256(record).hexdigest(), size, max_part_bytes)
         
-        # Resize to desired size
-        img = img.resize((size, size))
+        with self._qr_lock:
+            images = self._qr_images.get(cache_key)
+            if images is not None:
+                self._qr_images.move_to_end(cache_key)
         
-        return img
+        if images is None:
+            images = [
+                keyqr.render_qr_code(part, size)
+                for part in keyqr.split_key_record(record, max_part_bytes)
+            ]
+            with self._qr_lock:
+                self._qr_images[cache_key] = images
+                while len(self._qr_images) > QR_CACHE_SIZE:
+                    self._qr_images.popitem(last=False)
         
+        # Callers may draw on or resize the result, so never hand out the cached images
+        return [img.copy() for img in images]
+    
     def read_key_from_qr_code(self, image):
-        """Extract a public key from a QR code image"""
+        """
+        Import the public key from a QR code image
+        
+        Every key found in the image is imported; the first one is returned.
+        
+        Args:
+            image: PIL image or path to an image file
+        """
         try:
-            from pyzbar.pyzbar import decode
-            
-            # Read QR code
-            decoded_objects = decode(image)
-            if not decoded_objects:
+            symbols = keyqr.decode_symbols(image)
+            if not symbols:
                 raise ValueError("No QR code found in the image")
-                
-            # Extract data from QR code
-            qr_data = decoded_objects[0].data.decode('utf-8')
-            key_data = json.loads(qr_data)
             
-            # Validate key data
-            if not all(k in key_data for k in ["name", "algorithm", "public_key"]):
+            entries, incomplete = self._qr_key_entries(symbols)
+            if not entries:
+                if incomplete:
+                    found, count = next(iter(incomplete.values()))
+                    raise ValueError(f"Only {found} of {count} QR code parts found")
                 raise ValueError("Invalid key data in QR code")
-                
-            # Import the key
-            name = key_data['name']
-            # If the key already exists, add a suffix
-            original_name = name
-            counter = 1
-            while name in self.keypairs:
-                name = f"{original_name}_{counter}"
-                counter += 1
-                
-            return self.import_public_key(name, key_data['public_key'])
             
+            if len(entries) == 1:
+                # Import the key; if the name already exists, add a suffix
+                name = self._import_name(entries[0]['name'])
+                return self.import_public_key(name, entries[0]['public_key'])
+            return self.import_public_keys(entries)[0]
+        
         except Exception as e:
             raise ValueError(f"Error reading QR code: {str(e)}")
-            
+    
+    def import_keys_from_qr_codes(self, sources, workers=None, skip_known=True):
+        """
+        Import every key found in a set of QR code images
+        
+        Images are decoded in parallel and all keys are committed in one
+        keystore write. Parts of multi-part codes may be spread over several
+        images.
+        
+        Args:
+            sources: Image files and directories to scan
+            workers: Number of decoding threads (default: based on CPU count)
+            skip_known: Skip keys whose public key is already in the keystore
+        
+        Returns:
+            Dict with the imported keypairs, the number of known keys
+            skipped, incomplete multi-part keys, per-file failures and timing
+        """
+        start = time.perf_counter()
+        paths = keyqr.find_images(sources)
+        
+        # zbar and Pillow release the GIL while decoding, so threads are enough
+        symbols, failed = [], {}
+        with ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) + 4)) as executor:
+            for path, found, error in executor.map(keyqr.scan_file, paths):
+                if error:
+                    failed[path] = error
+                elif not found:
+                    failed[path] = "No QR code found"
+                symbols.extend(found)
+        
+        entries, incomplete = self._qr_key_entries(symbols)
+        
+        skipped = 0
+        if skip_known:
+            known = {keypair.get('public_key') for keypair in self.keypairs.values()}
+            fresh = [entry for entry in entries if entry['public_key'] not in known]
+            skipped = len(entries) - len(fresh)
+            entries = fresh
+        
+        imported = self.import_public_keys(entries, skip_invalid=True) if entries else []
+        
+        return {
+            'imported': imported,
+            'skipped': skipped,
+            'incomplete': incomplete,
+            'failed': failed,
+            'files': len(paths),
+            'seconds': time.perf_counter() - start
+        }
+    
+    def _qr_key_entries(self, symbols):
+        """
+        Turn decoded QR payloads into importable key entries
+        
+        Returns:
+            Tuple of (entries, incomplete) with duplicate keys removed
+        """
+        records, incomplete = keyqr.assemble_parts(symbols)
+        entries = []
+        for record in records:
+            name, public_key = keyqr.decode_key_record(record)
+            entries.append({'name': name, 'algorithm': 'MLKEM_1024', 'public_key': self.kem.armor(public_key)})
+        
+        # Legacy QR codes hold the key as JSON
+        for data in symbols:
+            if keyqr.parse_part(data) is not None:
+                continue
+            try:
+                key_data = json.loads(data.decode('utf-8'))
+            except ValueError:
+                continue
+            if isinstance(key_data, dict) and all(k in key_data for k in ["name", "algorithm", "public_key"]):
+                entries.append(key_data)
+        
+        unique = {}
+        for entry in entries:
+            unique.setdefault(entry['public_key'], entry)
+        return list(unique.values()), incomplete
+    
     def export_public_key_to_clipboard(self, keypair_name):
         """Copy public key to clipboard for easy sharing"""
         if keypair_name not in self.keypairs:
             raise ValueError(f"Keypair '{keypair_name}' not found")
-            
+        
         keypair = self.keypairs[keypair_name]
         if not keypair.get('public_key'):
             raise ValueError(f"Public key not available for '{keypair_name}'")
-            
+        
         # Copy the public key to clipboard
         pyperclip.copy(keypair['public_key'])
         return True
-        
+    
     def export_public_key_to_file(self, keypair_name, output_path=None):
         """Export public key to a standalone file"""
         if keypair_name not in self.keypairs:
             raise ValueError(f"Keypair '{keypair_name}' not found")
-            
+        
         keypair = self.keypairs[keypair_name]
         if not keypair.get('public_key'):
             raise ValueError(f"Public key not available for '{keypair_name}'")
-            
+        
         # Create a simplified object with just name and public key
         key_data = {
             'name': keypair['name'],
@@ -249,33 +860,49 @@ class KeyManager:
         # Determine output path
         if output_path is None:
             output_path = f"{keypair_name}_public_key.qkey"
-            
+        
         # Save to file
         with open(output_path, 'w') as f:
             json.dump(key_data, f, indent=2)
-            
-        return output_path
         
+        return output_path
+    
     def import_public_key_from_file(self, file_path):
         """Import a public key from a file"""
         try:
             with open(file_path, 'r') as f:
                 key_data = json.load(f)
-                
+            
             # Validate key data
             if not all(k in key_data for k in ["name", "algorithm", "public_key"]):
                 raise ValueError("Invalid key data in file")
-                
-            # Import the key
-            name = key_data['name']
-            # If the key already exists, add a suffix
-            original_name = name
-            counter = 1
-            while name in self.keypairs:
-                name = f"{original_name}_{counter}"
-                counter += 1
-                
-            return self.import_public_key(name, key_data['public_key'])
             
+            # Import the key; if the name already exists, add a suffix
+            name = self._import_name(key_data['name'])
+            
+            return self.import_public_key(name, key_data['public_key'])
+        
         except Exception as e:
-            raise ValueError(f"Error importing key: {str(e)}") 
\ No newline at end of file
+            raise ValueError(f"Error importing key: {str(e)}")
+    
+    def export_keyring(self, keypair_names, output_path):
+        """Export the public keys of several keypairs to one keyring bundle"""
+        keys = []
+        for name in keypair_names:
+            keypair = self.keypairs.get(name)
+            if not keypair:
+                raise ValueError(f"Keypair '{name}' not found")
+            if not keypair.get('public_key'):
+                raise ValueError(f"Public key not available for '{name}'")
+            keys.append({
+                'name': keypair['name'],
+                'algorithm': keypair['algorithm'],
+                'public_key': keypair['public_key']
+            })
+        
+        self._atomic_write_json(output_path, {
+            'format': KEYRING_FORMAT,
+            'version': 1,
+            'keys': keys
+        })
+        return output_path
\ No newline at end of file
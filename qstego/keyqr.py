@@ -0,0 +1,282 @@
+import hashlib
+import os
+import struct
+
+import qrcode
+from PIL import Image
+
+# Binary key QR parts: magic, format version, key id, part index, part count
+QR_MAGIC = b'QK'
+QR_VERSION = 1
+PART_HEADER = struct.Struct('>2sBIBB')
+
+# Largest byte-mode payload of a version 40 symbol at error correction level L
+MAX_SYMBOL_BYTES = 2953
+
+# Quiet zone around each symbol, in modules
+QR_BORDER = 4
+
+# Images are reduced to this longest side before the first decode attempt
+SCAN_MAX_DIMENSION = 1024
+
+# Image files picked up when scanning a directory
+SCAN_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
+
+
+def encode_key_record(name, public_key):
+    """Serialise a key name and raw public key as name length + name + key bytes"""
+    name_bytes = name.encode('utf-8')
+    if len(name_bytes) > 255:
+        raise ValueError("Key name is too long for a QR code")
+    return bytes([len(name_bytes)]) + name_bytes + public_key
+
+
+def decode_key_record(record):
+    """
+    Split a key record into its parts
+    
+    Returns:
+        Tuple of (name, raw_public_key)
+    """
+    if not record:
+        raise ValueError("Empty key record")
+    name_length = record[0]
+    if len(record) <= 1 + name_length:
+        raise ValueError("Truncated key record")
+    return record[1:1 + name_length].decode('utf-8'), bytes(record[1 + name_length:])
+
+
+def split_key_record(record, max_part_bytes=None):
+    """
+    Cut a key record into QR symbol payloads
+    
+    Args:
+        record: Output of encode_key_record
+        max_part_bytes: Largest payload per symbol; smaller values give
+            several sparser symbols that are easier to scan
+    
+    Returns:
+        List of part payloads, each with its own header
+    """
+    max_part_bytes = min(max_part_bytes or MAX_SYMBOL_BYTES, MAX_SYMBOL_BYTES)
+    chunk_size = max_part_bytes - PART_HEADER.size
+    if chunk_size <= 0:
+        raise ValueError(f"max_part_bytes must be larger than {PART_HEADER.size}")
+    
+    # Spread the record evenly so every symbol ends up the same version
+    count = -(-len(record) // chunk_size)
+    if count > 255:
+        raise ValueError("Key record needs too many QR codes")
+    chunk_size = -(-len(record) // count)
+    
+    key_id = int.from_bytes(hashlib.sha256(record).digest()[:4], 'big')
+    return [
+        PART_HEADER.pack(QR_MAGIC, QR_VERSION, key_id, index, count)
+        + record[index * chunk_size:(index + 1) * chunk_size]
+        for index in range(count)
+    ]
+
+
+def parse_part(data):
+    """
+    Parse one decoded symbol
+    
+    Returns:
+        Tuple of (key_id, index, count, chunk), or None if the symbol is not
+        a binary key part
+    """
+    for candidate in _raw_candidates(data):
+        if len(candidate) <= PART_HEADER.size:
+            continue
+        magic, version, key_id, index, count = PART_HEADER.unpack_from(candidate)
+        if magic == QR_MAGIC and version == QR_VERSION and index < count:
+            return key_id, index, count, candidate[PART_HEADER.size:]
+    return None
+
+
+def _raw_candidates(data):
+    """The symbol bytes as decoded, then undoing a text-encoding guess by the reader"""
+    yield data
+    # zbar treats byte-mode data as text and may hand it back re-encoded as UTF-8
+    try:
+        yield data.decode('utf-8').encode('latin-1')
+    except (UnicodeDecodeError, UnicodeEncodeError):
+        pass
+
+
+def assemble_parts(symbols):
+    """
+    Group decoded symbols into complete key records
+    
+    Returns:
+        Tuple of (records, incomplete): the reassembled records in the order
+        their first part was seen, and {key_id: (parts_found, part_count)}
+        for keys with missing parts
+    """
+    parts = {}
+    for data in symbols:
+        part = parse_part(data)
+        if part is None:
+            continue
+        key_id, index, count, chunk = part
+        parts.setdefault((key_id, count), {})[index] = chunk
+    
+    records, incomplete = [], {}
+    for (key_id, count), chunks in parts.items():
+        if len(chunks) < count:
+            incomplete[key_id] = (len(chunks), count)
+            continue
+        record = b''.join(chunks[index] for index in range(count))
+        # The key id doubles as a checksum over the reassembled record
+        if int.from_bytes(hashlib.sha256(record).digest()[:4], 'big') == key_id:
+            records.append(record)
+    return records, incomplete
+
+
+def render_qr_code(data, size):
+    """
+    Render one QR symbol as a size x size image
+    
+    The symbol is drawn at one pixel per module and scaled up by a whole
+    factor with nearest-neighbour sampling, which is much cheaper than
+    drawing large boxes and keeps every module the same width.
+    """
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=1,
+        border=QR_BORDER,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white").get_image()
+    
+    # Never go below one pixel per module, even if that exceeds size
+    scale = max(1, size // img.width)
+    img = img.resize((img.width * scale, img.height * scale), Image.NEAREST)
+    if img.width >= size:
+        return img
+    
+    # Centre the symbol; the extra margin only widens the quiet zone
+    canvas = Image.new(img.mode, (size, size), 1 if img.mode == '1' else 255)
+    offset = (size - img.width) // 2
+    canvas.paste(img, (offset, offset))
+    return canvas
+
+
+def tile_images(images):
+    """Place several QR symbols side by side in one image"""
+    if len(images) == 1:
+        return images[0]
+    width = sum(img.width for img in images)
+    height = max(img.height for img in images)
+    sheet = Image.new(images[0].mode, (width, height), 1 if images[0].mode == '1' else 255)
+    x = 0
+    for img in images:
+        sheet.paste(img, (x, 0))
+        x += img.width
+    return sheet
+
+
+def find_images(sources):
+    """Expand files and directories (recursively) into a sorted list of image paths"""
+    paths = []
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, name) for name in sorted(files)
+                    if name.lower().endswith(SCAN_EXTENSIONS)
+                )
+        else:
+            paths.append(source)
+    return list(dict.fromkeys(paths))
+
+
+def _grayscale(image):
+    """Convert to 8-bit grayscale, putting transparent areas on white"""
+    if image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info):
+        image = image.convert('RGBA')
+        image = Image.alpha_composite(Image.new('RGBA', image.size, (255, 255, 255, 255)), image)
+    return image.convert('L')
+
+
+def _fit(gray, size):
+    """Shrink an image so its longest side is at most size"""
+    longest = max(gray.size)
+    if longest <= size:
+        return gray
+    scale = size / longest
+    return gray.resize(
+        (max(1, round(gray.width * scale)), max(1, round(gray.height * scale))),
+        Image.BILINEAR,
+        reducing_gap=2.0
+    )
+
+
+def _scan_sizes(longest, max_dimension):
+    """Longest-side sizes to try: the reduced image first, then larger and smaller ones"""
+    sizes = [min(longest, max_dimension)]
+    for size in (max_dimension * 2, longest, max_dimension // 2):
+        size = min(size, longest)
+        if size >= 64 and size not in sizes:
+            sizes.append(size)
+    return sizes
+
+
+def decode_symbols(image, max_dimension=SCAN_MAX_DIMENSION):
+    """
+    Decode every QR symbol in an image
+    
+    Photos are converted to grayscale and reduced to max_dimension before
+    decoding, which is both faster and more reliable for zbar. Larger and
+    smaller versions are only tried if nothing was found.
+    
+    Args:
+        image: PIL image or path to an image file
+        max_dimension: Longest side of the first decode attempt
+    
+    Returns:
+        List of the raw payloads of all decoded symbols
+    """
+    from pyzbar.pyzbar import decode, ZBarSymbol
+    
+    path, gray = None, None
+    if isinstance(image, Image.Image):
+        gray = _grayscale(image)
+        longest = max(gray.size)
+    else:
+        path = image
+        with Image.open(path) as img:
+            longest = max(img.size)
+    
+    for attempt, size in enumerate(_scan_sizes(longest, max_dimension)):
+        if gray is None and attempt == 0 and size < longest:
+            # JPEG can decode straight to grayscale at a reduced scale
+            with Image.open(path) as img:
+                img.draft('L', (size, size))
+                candidate = _fit(_grayscale(img), size)
+        else:
+            if gray is None:
+                with Image.open(path) as img:
+                    gray = _grayscale(img)
+            candidate = _fit(gray, size)
+        
+        symbols = decode(candidate, symbols=[ZBarSymbol.QRCODE])
+        if symbols:
+            return [symbol.data for symbol in symbols]
+    return []
+
+
+def scan_file(path, max_dimension=SCAN_MAX_DIMENSION):
+    """
+    Decode the QR symbols in one image file
+    
+    Returns:
+        Tuple of (path, symbols, error); error is None on success
+    """
+    try:
+        return path, decode_symbols(path, max_dimension), None
+    except Exception as e:
+        return path, [], str(e)
@@ -0,0 +1,76 @@
+import hashlib
+import numpy as np
+
+# splitmix64 finaliser constants used by the Feistel round function
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+class FeistelPermutation:
+    """Keyed pseudorandom permutation of the integers 0..domain-1
+    
+    A balanced Feistel network over the smallest even bit width covering the
+    domain, combined with cycle walking, maps every index to a unique index
+    in the domain. Only the requested indices are ever computed, so mapping
+    n indices costs O(n) regardless of the domain size.
+    """
+    
+    ROUNDS = 6
+    
+    def __init__(self, key, domain):
+        if domain < 1:
+            raise ValueError("Permutation domain must not be empty")
+        if isinstance(key, str):
+            key = key.encode('utf-8')
+        
+        self.domain = int(domain)
+        
+        # Split the covering bit width into two equal halves
+        bits = max(2, (self.domain - 1).bit_length())
+        self.half_bits = (bits + 1) // 2
+        self.half_mask = np.uint64((1 << self.half_bits) - 1)
+        
+        # Derive independent round keys, bound to the domain size
+        round_keys = []
+        for i in range(self.ROUNDS):
+            digest = hashlib.sha256(
+                b'qstego-spread' + key + self.domain.to_bytes(8, 'big') + bytes([i])
+            ).digest()
+            round_keys.append(np.uint64(int.from_bytes(digest[:8], 'big')))
+        self.round_keys = round_keys
+    
+    def _round(self, half, round_key):
+        """Keyed round function on one half of the block"""
+        z = half ^ round_key
+        z = (z ^ (z >> np.uint64(30))) * _MIX_1
+        z = (z ^ (z >> np.uint64(27))) * _MIX_2
+        z = z ^ (z >> np.uint64(31))
+        return z & self.half_mask
+    
+    def _encrypt(self, values):
+        shift = np.uint64(self.half_bits)
+        left = values >> shift
+        right = values & self.half_mask
+        for round_key in self.round_keys:
+            left, right = right, left ^ self._round(right, round_key)
+        return (left << shift) | right
+    
+    def permute(self, indices):
+        """Map an array of indices to their permuted positions"""
+        values = np.asarray(indices, dtype=np.uint64)
+        result = self._encrypt(values)
+        
+        # Cycle walk values that landed outside the domain back into it
+        outside = np.flatnonzero(result >= self.domain)
+        while outside.size:
+            walked = self._encrypt(result[outside])
+            result[outside] = walked
+            outside = outside[walked >= self.domain]
+        
+        return result.astype(np.int64)
+    
+    def positions(self, start, count):
+        """Permuted positions for the consecutive indices start..start+count-1"""
+        if start + count > self.domain:
+            raise ValueError("Requested positions exceed the permutation domain")
+        return self.permute(np.arange(start, start + count, dtype=np.uint64))
@@ -0,0 +1,151 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class EncapsulationPool:
+    """
+    Background pool of precomputed encapsulations per recipient
+    
+    Neither the KEM encapsulation nor the Argon2 derivation depends on the
+    message, so a background thread computes (cipher_text, kdf_salt,
+    encryption_key) results ahead of time. Each result is handed out once
+    and then dropped; a recipient's queue is refilled up to high_water
+    whenever it falls below low_water, as long as the pool stays under
+    max_bytes.
+    """
+    
+    # Approximate in-memory size of one precomputed result (armored ciphertext, salt, key)
+    ENTRY_SIZE = 2400
+    
+    def __init__(self, key_manager, recipients=(), low_water=2, high_water=8, max_bytes=4 * 1024 * 1024):
+        # A queue is refilled once it holds fewer than low_water results
+        if not 1 <= low_water < high_water:
+            raise ValueError("low_water must be at least 1 and smaller than high_water")
+        
+        self.key_manager = key_manager
+        self.low_water = low_water
+        self.high_water = high_water
+        self.max_bytes = max_bytes
+        
+        self._queues = {}
+        self._condition = threading.Condition()
+        self._generation = {}
+        self._filling = set()
+        self._thread = None
+        self._stopping = False
+        
+        for name in recipients:
+            self.add_recipient(name)
+    
+    @property
+    def size_bytes(self):
+        with self._condition:
+            return self._entries() * self.ENTRY_SIZE
+    
+    def _entries(self):
+        return sum(len(queue) for queue in self._queues.values())
+    
+    def add_recipient(self, name):
+        """Start keeping precomputed encapsulations for a recipient"""
+        with self._condition:
+            self._queues.setdefault(name, deque())
+            self._generation.setdefault(name, 0)
+            self._condition.notify()
+    
+    def remove_recipient(self, name):
+        """Stop prewarming a recipient and drop its precomputed results"""
+        with self._condition:
+            self._queues.pop(name, None)
+            self._filling.discard(name)
+            self._generation[name] = self._generation.get(name, 0) + 1
+    
+    def discard(self, name):
+        """Drop precomputed results for a recipient whose key has changed"""
+        with self._condition:
+            queue = self._queues.get(name)
+            if queue is not None:
+                queue.clear()
+                self._generation[name] += 1
+                self._condition.notify()
+    
+    def available(self, name):
+        with self._condition:
+            return len(self._queues.get(name, ()))
+    
+    def take(self, name):
+        """Pop one precomputed result, or None if the recipient has none ready"""
+        with self._condition:
+            queue = self._queues.get(name)
+            if not queue:
+                return None
+            result = queue.popleft()
+            if len(queue) < self.low_water:
+                self._condition.notify()
+            return result
+    
+    def start(self):
+        """Start the background refill thread"""
+        with self._condition:
+            if self._thread is not None:
+                return self
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='qstego-prewarm', daemon=True)
+            self._thread.start()
+        return self
+    
+    def stop(self):
+        """Stop the refill thread and drop every precomputed result"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join()
+        with self._condition:
+            for queue in self._queues.values():
+                queue.clear()
+    
+    def _next_job(self):
+        """Pick a recipient below its refill threshold, waiting until one exists"""
+        with self._condition:
+            while not self._stopping:
+                if (self._entries() + 1) * self.ENTRY_SIZE <= self.max_bytes:
+                    # Serve the emptiest queue first; once below low_water a
+                    # queue keeps refilling until it reaches high_water
+                    starving = [
+                        (len(queue), name) for name, queue in self._queues.items()
+                        if len(queue) < self.low_water
+                        or (name in self._filling and len(queue) < self.high_water)
+                    ]
+                    if starving:
+                        _, name = min(starving)
+                        return name, self._generation[name]
+                self._condition.wait()
+            return None, None
+    
+    def _run(self):
+        while True:
+            name, generation = self._next_job()
+            if name is None:
+                return
+            
+            try:
+                result = self.key_manager.encapsulate(name)
+            except Exception as e:
+                logger.warning(f"Prewarming '{name}' failed: {str(e)}")
+                self.remove_recipient(name)
+                continue
+            
+            with self._condition:
+                queue = self._queues.get(name)
+                # Results computed for a replaced key are thrown away
+                if queue is None or self._generation.get(name) != generation:
+                    continue
+                queue.append(result)
+                if len(queue) >= self.high_water:
+                    self._filling.discard(name)
+                else:
+                    self._filling.add(name)
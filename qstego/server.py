@@ -0,0 +1,344 @@
+import json
+import logging
+import os
+import signal
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from PIL import Image
+
+from .crypto_stego import CryptoStego
+
+logger = logging.getLogger(__name__)
+
+# Chunk size used when streaming request and response bodies
+CHUNK_SIZE = 64 * 1024
+
+# Largest accepted request body (carrier or stego image)
+MAX_BODY_SIZE = 256 * 1024 * 1024
+
+
+class StageTimer:
+    """Collects per-stage durations for one request"""
+    
+    def __init__(self):
+        self.stages = []
+        self._last = time.perf_counter()
+    
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.stages.append((stage, (now - self._last) * 1000.0))
+        self._last = now
+    
+    @property
+    def total(self):
+        return sum(duration for _, duration in self.stages)
+    
+    def header(self):
+        """Render the timings as a Server-Timing header value"""
+        return ', '.join(f"{stage};dur={duration:.2f}" for stage, duration in self.stages)
+
+
+class StegoHTTPServer(HTTPServer):
+    """HTTP server holding a warm CryptoStego instance and request metrics"""
+    
+    def __init__(self, server_address, crypto_stego, bind_and_activate=True):
+        super().__init__(server_address, StegoRequestHandler, bind_and_activate)
+        self.crypto_stego = crypto_stego
+        self.metrics = {}
+    
+    def record(self, endpoint, status, timer):
+        entry = self.metrics.setdefault(endpoint, {
+            'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'stages_ms': {}
+        })
+        entry['count'] += 1
+        if status >= 400:
+            entry['errors'] += 1
+        entry['total_ms'] += timer.total
+        entry['max_ms'] = max(entry['max_ms'], timer.total)
+        for stage, duration in timer.stages:
+            entry['stages_ms'][stage] = entry['stages_ms'].get(stage, 0.0) + duration
+    
+    def snapshot(self):
+        """Metrics of this worker process with mean latencies filled in"""
+        endpoints = {}
+        for endpoint, entry in self.metrics.items():
+            endpoints[endpoint] = dict(entry, mean_ms=entry['total_ms'] / entry['count'])
+        return {'pid': os.getpid(), 'endpoints': endpoints}
+
+
+class StegoRequestHandler(BaseHTTPRequestHandler):
+    """
+    Routes for the local stego service
+    
+    GET  /keys                 List keypair names
+    GET  /keys/<name>          Public key of a keypair
+    GET  /metrics              Request metrics of the answering worker
+    POST /capacity             Body: image; returns payload capacity
+    POST /hide?recipient=NAME  Body: message followed by the carrier image, with
+                               the message's byte count in the
+                               X-QStego-Message-Length header; returns the
+                               stego image (format=png, bmp or tiff)
+    POST /reveal?key=NAME      Body: stego image; returns the plaintext
+    
+    An optional X-QStego-Key header carries the stego spreading secret.
+    """
+    
+    server_version = 'QuantHide'
+    protocol_version = 'HTTP/1.1'
+    
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+    
+    def do_GET(self):
+        self._dispatch({
+            '/keys': self.handle_list_keys,
+            '/metrics': self.handle_metrics,
+        }, prefixes={'/keys/': self.handle_get_key})
+    
+    def do_POST(self):
+        self._dispatch({
+            '/capacity': self.handle_capacity,
+            '/hide': self.handle_hide,
+            '/reveal': self.handle_reveal,
+        })
+    
+    def _dispatch(self, routes, prefixes=None):
+        url = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        timer = StageTimer()
+        
+        handler, endpoint, argument = routes.get(url.path), url.path, None
+        if handler is None:
+            for prefix, prefix_handler in (prefixes or {}).items():
+                if url.path.startswith(prefix) and len(url.path) > len(prefix):
+                    handler, endpoint = prefix_handler, prefix + '*'
+                    argument = unquote(url.path[len(prefix):])
+                    break
+        
+        if handler is None:
+            self._discard_body()
+            status = self._send_json(404, {'error': f"Unknown endpoint '{url.path}'"}, timer)
+            return
+        
+        try:
+            args = (timer,) if argument is None else (timer, argument)
+            status = handler(*args)
+        except ValueError as e:
+            # The body may not have been consumed, so don't reuse the connection
+            self.close_connection = True
+            status = self._send_json(400, {'error': str(e)}, timer)
+        except Exception as e:
+            logger.error(f"Error handling {self.command} {url.path}: {str(e)}", exc_info=True)
+            self.close_connection = True
+            status = self._send_json(500, {'error': str(e)}, timer)
+        self.server.record(endpoint, status, timer)
+    
+    def _read_body(self):
+        """Stream the request body into memory in fixed-size chunks"""
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0:
+            raise ValueError("Request body is empty")
+        if length > MAX_BODY_SIZE:
+            self.close_connection = True
+            raise ValueError(f"Request body too large (limit is {MAX_BODY_SIZE} bytes)")
+        
+        buffer = BytesIO()
+        remaining = length
+        while remaining:
+            chunk = self.rfile.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError("Request body ended early")
+            buffer.write(chunk)
+            remaining -= len(chunk)
+        buffer.seek(0)
+        return buffer
+    
+    def _discard_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        while length > 0:
+            chunk = self.rfile.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+    
+    def _send_body(self, status, content_type, body, timer, extra_headers=None):
+        """Send a response body in fixed-size chunks"""
+        view = memoryview(body)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(view)))
+        self.send_header('Server-Timing', timer.header())
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        for offset in range(0, len(view), CHUNK_SIZE):
+            self.wfile.write(view[offset:offset + CHUNK_SIZE])
+        return status
+    
+    def _send_json(self, status, data, timer):
+        return self._send_body(status, 'application/json', json.dumps(data).encode('utf-8'), timer)
+    
+    def _stego_key(self):
+        return self.headers.get('X-QStego-Key') or None
+    
+    def _require(self, name):
+        value = self.query.get(name)
+        if not value:
+            raise ValueError(f"Missing '{name}' query parameter")
+        return value
+    
+    def handle_list_keys(self, timer):
+        key_manager = self.server.crypto_stego.key_manager
+        keys = [
+            {'name': name, 'has_secret_key': bool(key_manager.get_keypair(name).get('secret_key'))}
+            for name in key_manager.get_keypair_names()
+        ]
+        timer.mark('keys')
+        return self._send_json(200, {'keys': keys}, timer)
+    
+    def handle_get_key(self, timer, name):
+        keypair = self.server.crypto_stego.key_manager.get_keypair(name)
+        if not keypair:
+            return self._send_json(404, {'error': f"Keypair '{name}' not found"}, timer)
+        timer.mark('keys')
+        return self._send_json(200, {
+            'name': keypair['name'],
+            'algorithm': keypair['algorithm'],
+            'public_key': keypair['public_key']
+        }, timer)
+    
+    def handle_metrics(self, timer):
+        return self._send_json(200, self.server.snapshot(), timer)
+    
+    def handle_capacity(self, timer):
+        stego = self.server.crypto_stego.stego
+        body = self._read_body()
+        timer.mark('read')
+        img_array = stego.load_image(body)
+        timer.mark('decode')
+        return self._send_json(200, {
+            'shape': list(img_array.shape),
+            'capacity_bytes': stego.capacity(img_array)
+        }, timer)
+    
+    def handle_hide(self, timer):
+        crypto_stego = self.server.crypto_stego
+        recipient = self._require('recipient')
+        output_format = self.query.get('format', 'png').upper()
+        # Lossy encoders would destroy the payload in the low bits
+        if output_format not in crypto_stego.stego.LOSSLESS_FORMATS:
+            raise ValueError(f"Unsupported output format '{output_format.lower()}' "
+                             f"(use {', '.join(f.lower() for f in crypto_stego.stego.LOSSLESS_FORMATS)})")
+        
+        message_length = self.headers.get('X-QStego-Message-Length')
+        if message_length is None or not message_length.isascii() or not message_length.isdigit():
+            raise ValueError("Missing or invalid X-QStego-Message-Length header")
+        message_length = int(message_length)
+        
+        # The message leads the body, so its size is bounded only by MAX_BODY_SIZE
+        body = self._read_body().getbuffer()
+        if message_length >= len(body):
+            raise ValueError("Request body holds no carrier image after the message")
+        message_bytes = bytes(body[:message_length])
+        timer.mark('read')
+        img_array = crypto_stego.stego.load_image(BytesIO(body[message_length:]))
+        timer.mark('decode')
+        if not crypto_stego.stego.keeps_samples(output_format, img_array):
+            raise ValueError(f"Format '{output_format.lower()}' cannot store every band of this carrier; use png or tiff")
+        encryption_result = crypto_stego.key_manager.encrypt_message(recipient, message_bytes)
+        timer.mark('kem')
+        payload_bytes = crypto_stego.seal_payload(message_bytes, recipient, encryption_result)
+        timer.mark('seal')
+        stego_array = crypto_stego.stego.embed(img_array, payload_bytes, self._stego_key())
+        timer.mark('embed')
+        output = BytesIO()
+        crypto_stego.stego.save_image(stego_array, output, format=output_format)
+        timer.mark('encode')
+        
+        return self._send_body(200, f"image/{output_format.lower()}", output.getbuffer(), timer)
+    
+    def handle_reveal(self, timer):
+        crypto_stego = self.server.crypto_stego
+        key_name = self._require('key')
+        
+        body = self._read_body()
+        timer.mark('read')
+        stego_array = crypto_stego.stego.load_image(body)
+        timer.mark('decode')
+        try:
+            payload_bytes = crypto_stego.stego.extract(stego_array, self._stego_key())
+        except Exception as e:
+            raise ValueError(f"Error retrieving message: {str(e)}")
+        timer.mark('extract')
+        message = crypto_stego.decrypt_payload(payload_bytes, key_name)
+        timer.mark('decrypt')
+        
+        return self._send_body(200, 'application/octet-stream', message, timer)
+
+
+def serve(host='127.0.0.1', port=8765, keys_dir='keys', workers=None):
+    """
+    Run the local stego service with a pre-forked worker pool
+    
+    Keys are loaded and dearmored once in the parent before forking, so every
+    worker starts warm and per-request latency excludes all startup costs.
+    On platforms without fork the server runs in a single process.
+    """
+    crypto_stego = CryptoStego(keys_dir)
+    crypto_stego.key_manager.preload_keys()
+    
+    # Register every Pillow codec now instead of on the first request
+    Image.init()
+    
+    server = StegoHTTPServer((host, port), crypto_stego)
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"Serving on http://{host}:{server.server_address[1]} with {workers} worker(s)")
+    
+    if workers == 1 or not hasattr(os, 'fork'):
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+    
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            # Worker: share the listening socket and handle requests until told to stop
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            signal.signal(signal.SIGTERM, lambda *args: os._exit(0))
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+    
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while children:
+            pid, _ = os.wait()
+            if pid in children:
+                children.remove(pid)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        server.server_close()
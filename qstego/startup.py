@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Runs in a fresh interpreter so the import phase includes every module
+_MEASURE = (
+    "import sys, time; started = time.perf_counter(); "
+    "from qstego.app import App; "
+    "from qstego.startup import measure; "
+    "measure(started, App, sys.argv[1], float(sys.argv[2]))"
+)
+
+
+def measure(started, app_class, keys_dir, timeout):
+    """
+    Time the phases of a GUI start and print them as one JSON line
+    
+    Args:
+        started: perf_counter() reading taken before the GUI was imported
+        app_class: The App class, already imported
+        keys_dir: Keystore the window should load
+        timeout: Seconds to wait for the first paint and for the keys
+    """
+    imported = time.perf_counter()
+    app = app_class(keys_dir=keys_dir)
+    constructed = time.perf_counter()
+    
+    # The first Expose event on any widget is the first paint
+    painted = []
+    app.bind('<Expose>', lambda event: painted or painted.append(time.perf_counter()), add='+')
+    
+    deadline = constructed + timeout
+    keys_loaded = None
+    while not (painted and keys_loaded) and time.perf_counter() < deadline:
+        app.update()
+        if keys_loaded is None and app.keys_loaded:
+            keys_loaded = time.perf_counter()
+        time.sleep(0.001)
+    key_count = len(app.crypto_stego.key_manager.get_keypair_names())
+    app.destroy()
+    
+    report = {
+        'import_seconds': imported - started,
+        'construct_seconds': constructed - imported,
+        'first_paint_seconds': painted[0] - started if painted else None,
+        'keys_loaded_seconds': keys_loaded - started if keys_loaded else None,
+        'keys': key_count
+    }
+    print(json.dumps(report))
+
+
+def startup_report(keys_dir, timeout=30.0):
+    """
+    Start the GUI in a new interpreter and measure how long it takes to appear
+    
+    Needs a display; under CI use a virtual one such as Xvfb.
+    
+    Returns:
+        Dict with import_seconds, construct_seconds, first_paint_seconds
+        and keys_loaded_seconds (counted from the start of the import;
+        None if not reached within the timeout) and the number of keys
+    """
+    # Make the package importable however the current process found it
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [package_root, env.get('PYTHONPATH')]))
+    
+    result = subprocess.run(
+        [sys.executable, '-c', _MEASURE, keys_dir, str(timeout)],
+        capture_output=True,
+        text=True,
+        env=env,
+        timeout=timeout + 60
+    )
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        error = result.stderr.strip().splitlines()
+        raise RuntimeError(f"GUI failed to start: {error[-1] if error else 'no output'}")
+    return json.loads(lines[-1])
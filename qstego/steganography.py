@@ -1,83 +1,501 @@
 from PIL import Image
 import numpy as np
 import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from .permutation import FeistelPermutation
+from .adaptive import AdaptiveLayout, pool_samples
 
 class Steganography:
-    def __init__(self):
+    # Payload record: magic, format version, payload length in bytes
+    MAGIC = b'QSTG'
+    VERSION = 1
+    HEADER = struct.Struct('>4sBI')
+    
+    # Formats that keep every sample bit; in-memory results are encoded as
+    # PNG unless the carrier already used one of these
+    LOSSLESS_FORMATS = ('PNG', 'BMP', 'TIFF')
+    
+    # Smallest unit of work for a thread: payload bytes per tile and samples
+    # per copied block; smaller images are processed on the calling thread
+    TILE_BYTES = 128 * 1024
+    COPY_SAMPLES = 4 * 1024 * 1024
+    
+    def __init__(self, threads=1, adaptive=False):
+        """
+        Args:
+            threads: Worker threads for embedding and extracting large
+                payloads (None for one per CPU)
+            adaptive: Embed only into the most textured regions of the
+                carrier; extraction must use the same setting
+        """
+        # Terminator used by images written before the length header existed
         self.delimiter = b'###END###'
+        self.threads = threads or os.cpu_count() or 1
+        self.adaptive = adaptive
+        self._executor = None
+        self._executor_lock = threading.Lock()
     
-    def hide_message(self, image_path, message_bytes, output_path=None):
-        """Hide a byte message in an image using LSB steganography"""
-        # Add delimiter to the message
-        message_bytes = message_bytes + self.delimiter
+    def open_image(self, image):
+        """
+        Open an image from any supported source without decoding it yet
         
-        # Open the image and convert to numpy array
-        img = Image.open(image_path)
-        img_array = np.array(img)
+        Args:
+            image: Path, bytes, file-like object, PIL image or numpy array
         
-        # Check if the image can hold the message
-        max_bytes = img_array.size // 8
-        if len(message_bytes) > max_bytes:
-            raise ValueError(f"Message too large! Image can only hold {max_bytes} bytes but message is {len(message_bytes)} bytes")
+        Returns:
+            A PIL image, or the numpy array itself
+        """
+        if isinstance(image, (np.ndarray, Image.Image)):
+            return image
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            # BytesIO shares the buffer of a bytes object instead of copying it
+            image = BytesIO(image)
+        return Image.open(image)
+    
+    def load_image(self, image):
+        """Decode an image (path, bytes, file-like object, PIL image or array) into a numpy sample array"""
+        img = self.open_image(image)
+        if isinstance(img, np.ndarray):
+            return img
+        return np.array(img)
+    
+    def keeps_samples(self, format, img_array):
+        """Whether an image format stores every sample of an array (BMP has no alpha band)"""
+        if format not in self.LOSSLESS_FORMATS:
+            return False
+        return not (format == 'BMP' and img_array.ndim == 3 and img_array.shape[2] != 3)
+    
+    def save_image(self, stego_array, output_path, format=None):
+        """Encode a sample array and write it to a path or file object"""
+        if format is None and isinstance(output_path, (str, os.PathLike)):
+            format = Image.registered_extensions().get(os.path.splitext(output_path)[1].lower())
+        if format == 'BMP' and not self.keeps_samples(format, stego_array):
+            raise ValueError("BMP cannot store the alpha band that carries part of the message; save as PNG or TIFF")
+        if stego_array.dtype != np.uint8:
+            stego_array = stego_array.astype(np.uint8)
+        Image.fromarray(stego_array).save(output_path, format=format)
+        return output_path
+    
+    def capacity(self, img_array):
+        """Number of payload bytes an image array can hold"""
+        return max(0, self._slots(img_array) // 8 - self.HEADER.size)
+    
+    def check_capacity(self, img_array, length):
+        """Raise the capacity error unless the header and length payload bytes fit"""
+        # Checked in bits, so carriers smaller than the header reject even an
+        # empty payload instead of failing inside the embed
+        if (self.HEADER.size + length) * 8 > self._slots(img_array):
+            raise ValueError(f"Message too large! Image can only hold {self.capacity(img_array)} bytes but message is {length} bytes")
+    
+    def _slots(self, img_array):
+        """Number of samples that can carry a bit"""
+        if self.adaptive:
+            return pool_samples(img_array.shape)
+        return img_array.size
+    
+    def _locator(self, img_array, key):
+        """
+        Map from payload bit indices to sample positions
+        
+        Returns:
+            None for sequential positions, a keyed permutation, or an
+            AdaptiveLayout in adaptive mode
+        """
+        if self.adaptive:
+            return AdaptiveLayout(img_array, key)
+        if key is not None:
+            return FeistelPermutation(key, img_array.size)
+        return None
+    
+    def _locate(self, permutation, start, count):
+        """Sample positions that carry payload bits start..start+count-1"""
+        if permutation is None:
+            return slice(start, start + count)
+        return permutation.positions(start, count)
+    
+    def _read_bytes(self, flat_array, permutation, start_bit, length):
+        """Read length bytes from the LSBs starting at bit start_bit"""
+        tiles = self._tiles(length, self.TILE_BYTES)
+        if len(tiles) == 1:
+            positions = self._locate(permutation, start_bit, length * 8)
+            bits = (flat_array[positions] & 1).astype(np.uint8)
+            return np.packbits(bits).tobytes()
+        
+        # Each tile decodes whole bytes, so tiles never share an output byte
+        message = np.empty(length, dtype=np.uint8)
+        
+        def read_tile(start, end):
+            positions = self._locate(permutation, start_bit + start * 8, (end - start) * 8)
+            message[start:end] = np.packbits(flat_array[positions] & 1)
+        
+        self._run_tiles(read_tile, tiles)
+        return message.tobytes()
+    
+    def _tiles(self, count, minimum):
+        """Split range(count) into at most one chunk per thread, each at least minimum long"""
+        if self.threads <= 1 or count < 2 * minimum:
+            return [(0, count)]
+        size = max(minimum, -(-count // self.threads))
+        return [(start, min(start + size, count)) for start in range(0, count, size)]
+    
+    def _run_tiles(self, func, tiles):
+        """Run func(start, end) for every tile on the thread pool"""
+        if len(tiles) == 1:
+            func(*tiles[0])
+            return
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='qstego-tile')
+        # NumPy releases the GIL in the copies, bit operations and permutation
+        # arithmetic, so the tiles run in parallel
+        for future in [self._executor.submit(func, start, end) for start, end in tiles]:
+            future.result()
+    
+    def embed(self, img_array, message_bytes, key=None):
+        """
+        Embed a byte message into a copy of an image array
+        
+        Args:
+            img_array: Carrier samples as a numpy array
+            message_bytes: Payload to hide
+            key: Optional shared secret; when given, payload bits are spread
+                over pseudorandom sample positions derived from it
         
-        # Flatten the image array
+        Returns:
+            New array with the payload in its least significant bits
+        """
+        if self.threads > 1:
+            return self._embed_tiled(img_array, message_bytes, key)
+        
+        positions, values = self.embed_patch(img_array, message_bytes, key)
+        
+        # Flatten a copy of the image array and apply the modified samples
         flat_array = img_array.flatten()
+        flat_array[positions] = values
+        
+        return flat_array.reshape(img_array.shape)
+    
+    def embed_many(self, img_arrays, payloads, key=None):
+        """
+        Embed one payload into each of many carriers
+        
+        Carriers of the same shape and sample type are stacked into one
+        array and embedded together, so a batch of small images costs a few
+        NumPy calls per shape instead of per image; with a stego key the
+        positions are computed once per shape. Each result equals
+        embed(img_array, payload, key).
+        
+        Args:
+            img_arrays: Carrier sample arrays
+            payloads: Payload for each carrier
+            key: Optional shared secret for keyed spreading
+        
+        Returns:
+            List of new arrays in the order of the carriers
+        """
+        if self.adaptive:
+            # Every carrier has its own texture ranking
+            return [self.embed(img_array, payload, key) for img_array, payload in zip(img_arrays, payloads)]
+        
+        groups = {}
+        for index, (img_array, payload) in enumerate(zip(img_arrays, payloads)):
+            self.check_capacity(img_array, len(payload))
+            groups.setdefault((img_array.shape, img_array.dtype.str), []).append(index)
+        
+        results = [None] * len(img_arrays)
+        for (shape, _), indices in groups.items():
+            # Records padded to the longest one, one row of bits per carrier
+            records = [self.HEADER.pack(self.MAGIC, self.VERSION, len(payloads[i])) + bytes(payloads[i]) for i in indices]
+            width = max(len(record) for record in records)
+            record_matrix = np.frombuffer(b''.join(record.ljust(width, b'\0') for record in records), dtype=np.uint8)
+            bits = np.unpackbits(record_matrix.reshape(len(indices), width), axis=1)
+            
+            stack = np.stack([img_arrays[i].reshape(-1) for i in indices])
+            positions = self._locate(self._locator(img_arrays[indices[0]], key), 0, width * 8)
+            selected = stack[:, positions]
+            embedded = (selected >> 1 << 1) | bits
+            
+            # Bits past the end of a shorter record leave the carrier unchanged
+            lengths = np.array([len(record) * 8 for record in records])
+            inside = np.arange(width * 8) < lengths[:, None]
+            stack[:, positions] = np.where(inside, embedded, selected)
+            
+            for row, i in enumerate(indices):
+                results[i] = stack[row].reshape(shape)
+        return results
+    
+    def _embed_tiled(self, img_array, message_bytes, key):
+        """
+        Embed using the thread pool
+        
+        Bit i of the record still goes to the i-th located sample, so the
+        output is identical to a single-threaded embed.
+        """
+        self.check_capacity(img_array, len(message_bytes))
+        
+        record = self.HEADER.pack(self.MAGIC, self.VERSION, len(message_bytes)) + bytes(message_bytes)
+        record_array = np.frombuffer(record, dtype=np.uint8)
+        
+        # Copy the carrier block by block
+        source = img_array.reshape(-1)
+        flat_array = np.empty(source.size, dtype=source.dtype)
+        
+        def copy_block(start, end):
+            flat_array[start:end] = source[start:end]
+        
+        self._run_tiles(copy_block, self._tiles(source.size, self.COPY_SAMPLES))
+        
+        # Then write whole payload bytes per tile; tiles touch disjoint samples
+        permutation = self._locator(img_array, key)
+        
+        def write_tile(start, end):
+            bits = np.unpackbits(record_array[start:end])
+            positions = self._locate(permutation, start * 8, bits.size)
+            flat_array[positions] = (source[positions] >> 1 << 1) | bits
+        
+        self._run_tiles(write_tile, self._tiles(len(record), self.TILE_BYTES))
+        
+        return flat_array.reshape(img_array.shape)
+    
+    def embed_patch(self, img_array, message_bytes, key=None):
+        """
+        Compute the samples an embed would change, without copying the image
+        
+        Returns:
+            Tuple of (positions, values): a slice or index array into the
+            flattened image and the new values of those samples
+        """
+        # Check if the image can hold the message
+        self.check_capacity(img_array, len(message_bytes))
+        
+        # Prefix the payload with its header and convert it to a bit array
+        record = self.HEADER.pack(self.MAGIC, self.VERSION, len(message_bytes)) + bytes(message_bytes)
+        message_bits = np.unpackbits(np.frombuffer(record, dtype=np.uint8))
+        
+        # Modify the LSB of each selected sample to hide the message
+        flat_array = img_array.reshape(-1)
+        permutation = self._locator(img_array, key)
+        positions = self._locate(permutation, 0, message_bits.size)
+        values = (flat_array[positions] >> 1 << 1) | message_bits
+        
+        return positions, values.astype(flat_array.dtype, copy=False)
+    
+    def extract(self, img_array, key=None):
+        """
+        Extract a byte message from an image array
+        
+        Args:
+            img_array: Stego samples as a numpy array
+            key: Shared secret used when the message was embedded, if any
+        
+        Returns:
+            The hidden message as bytes
+        """
+        flat_array = img_array.reshape(-1)
+        header_bits = self.HEADER.size * 8
+        if self._slots(img_array) < header_bits:
+            raise ValueError("No hidden message found in this image")
         
-        # Convert message to bit array
-        message_bits = []
-        for byte in message_bytes:
-            # Convert each byte to bits and add to our list
-            bits = [int(bit) for bit in format(byte, '08b')]
-            message_bits.extend(bits)
+        # Read and validate the header
+        permutation = self._locator(img_array, key)
+        header = self._read_bytes(flat_array, permutation, 0, self.HEADER.size)
+        magic, version, length = self.HEADER.unpack(header)
         
-        # Modify the LSB of each pixel value to hide the message
-        for i in range(len(message_bits)):
-            flat_array[i] = (flat_array[i] & ~1) | message_bits[i]
+        if magic == self.MAGIC and version == self.VERSION and length <= self.capacity(img_array):
+            return self._read_bytes(flat_array, permutation, header_bits, length)
         
-        # Reshape the array back to original dimensions
-        stego_array = flat_array.reshape(img_array.shape)
+        if permutation is None:
+            # Fall back to the delimiter format of older images
+            usable = flat_array.size - flat_array.size % 8
+            extracted_bytes = np.packbits((flat_array[:usable] & 1).astype(np.uint8)).tobytes()
+            delimiter_index = extracted_bytes.find(self.delimiter)
+            if delimiter_index != -1:
+                return extracted_bytes[:delimiter_index]
         
-        # Convert back to image
-        stego_img = Image.fromarray(stego_array.astype(np.uint8))
+        # No header or delimiter, it's probably not a valid steganographic image
+        raise ValueError("No hidden message found in this image")
+    
+    def hide_message(self, image, message_bytes, output_path=None, key=None, format=None):
+        """
+        Hide a byte message in an image using LSB steganography
+        
+        Args:
+            image: Carrier as a path (image, multi-frame image or WAV
+                recording), bytes, file-like object, PIL image, numpy array
+                or CarrierTemplate
+            message_bytes: Payload to hide
+            output_path: Path or file object to write the result to
+            key: Optional shared secret for keyed spreading
+            format: Image format for the output (default: from the path,
+                or a lossless format for in-memory results)
+        
+        Returns:
+            output_path if given; otherwise the result in the carrier's own
+            kind: a "_stego" path next to a path carrier, bytes, a BytesIO,
+            a PIL image, a numpy array or a StegoResult for a template
+        """
+        if isinstance(image, CarrierTemplate):
+            result = image.embed(message_bytes, key)
+            return result if output_path is None else result.save(output_path, format)
+        
+        # WAV recordings are streamed instead of decoded up front
+        from .audio import is_wav, WavSteganography
+        if is_wav(image):
+            return WavSteganography().hide_message(image, message_bytes, output_path, key)
+        
+        # Animations and multi-page files are handled one frame at a time
+        from .frames import is_multi_frame, MultiFrameSteganography
+        if is_multi_frame(image):
+            return MultiFrameSteganography().hide_message(image, message_bytes, output_path, key)
+        
+        # Open the image and embed the message
+        img = self.open_image(image)
+        stego_array = self.embed(self.load_image(img), message_bytes, key)
         
         # Save the steganographic image
-        if output_path is None:
-            base, ext = os.path.splitext(image_path)
-            output_path = f"{base}_stego{ext}"
+        if output_path is not None:
+            return self.save_image(stego_array, output_path, format)
+        if isinstance(image, (str, os.PathLike)):
+            base, ext = os.path.splitext(image)
+            return self.save_image(stego_array, f"{base}_stego{ext}", format)
         
-        stego_img.save(output_path)
-        return output_path
+        return self.to_carrier_kind(image, img, stego_array, format)
     
-    def retrieve_message(self, stego_image_path):
-        """Retrieve a hidden message from an image"""
+    def to_carrier_kind(self, image, img, stego_array, format=None):
+        """Return a stego array as the same kind of object the carrier was given as"""
+        if isinstance(image, np.ndarray):
+            return stego_array
+        if isinstance(image, Image.Image):
+            return Image.fromarray(stego_array if stego_array.dtype == np.uint8 else stego_array.astype(np.uint8))
+        
+        if format is None:
+            source_format = getattr(img, 'format', None)
+            format = source_format if self.keeps_samples(source_format, stego_array) else 'PNG'
+        output = BytesIO()
+        self.save_image(stego_array, output, format)
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return output.getvalue()
+        output.seek(0)
+        return output
+    
+    def retrieve_message(self, stego_image, key=None):
+        """Retrieve a hidden message from an image (path, bytes, file-like object, PIL image or array), multi-frame image or WAV file"""
+        from .audio import is_wav, WavSteganography
+        if is_wav(stego_image):
+            return WavSteganography().retrieve_message(stego_image, key)
+        from .frames import is_multi_frame, MultiFrameSteganography
+        if is_multi_frame(stego_image):
+            return MultiFrameSteganography().retrieve_message(stego_image, key)
+        
         # Open the steganographic image
-        stego_img = Image.open(stego_image_path)
-        stego_array = np.array(stego_img)
-        
-        # Extract LSBs from the image
-        flat_array = stego_array.flatten()
-        lsbs = [flat_array[i] & 1 for i in range(flat_array.size)]
-        
-        # Convert extracted bits to bytes
-        extracted_bytes = bytearray()
-        for i in range(0, len(lsbs), 8):
-            if i + 8 <= len(lsbs):
-                byte = 0
-                for j in range(8):
-                    if lsbs[i+j]:
-                        byte |= (1 << (7-j))
-                extracted_bytes.append(byte)
-        
-        # Find the delimiter in the extracted bytes
+        stego_array = self.load_image(stego_image)
+        
         try:
-            delimiter_index = extracted_bytes.find(self.delimiter)
-            
-            if delimiter_index != -1:
-                # Return only the message part
-                return bytes(extracted_bytes[:delimiter_index])
-            else:
-                # If no delimiter found, it's probably not a valid steganographic image
-                raise ValueError("No hidden message found in this image")
-                
+            return self.extract(stego_array, key)
         except Exception as e:
-            raise ValueError(f"Error retrieving message: {str(e)}") 
\ No newline at end of file
+            raise ValueError(f"Error retrieving message: {str(e)}")
+
+
+class CarrierTemplate:
+    """
+    A carrier image decoded once and reused for many messages
+    
+    The decoded samples are kept as a read-only base array together with the
+    carrier's capacity, mode and palette. Each embed only computes the
+    samples it changes; encoding applies that patch to a per-thread scratch
+    copy of the base and reverts it afterwards, so no full-size copy is made
+    per message.
+    """
+    
+    def __init__(self, image, stego=None):
+        """
+        Args:
+            image: Carrier as a path, bytes, file-like object, PIL image or numpy array
+            stego: Steganography instance to embed with
+        """
+        self.stego = stego or Steganography()
+        img = self.stego.open_image(image)
+        
+        self.base = np.array(img)
+        self.base.setflags(write=False)
+        self.shape = self.base.shape
+        self.dtype = self.base.dtype
+        self.capacity = self.stego.capacity(self.base)
+        
+        self.mode = getattr(img, 'mode', None)
+        self.palette = img.getpalette() if self.mode == 'P' else None
+        source_format = getattr(img, 'format', None)
+        self.format = source_format if self.stego.keeps_samples(source_format, self.base) else 'PNG'
+        
+        self._scratch = threading.local()
+    
+    def embed(self, message_bytes, key=None):
+        """Hide a payload; returns a StegoResult that shares the template's samples"""
+        positions, values = self.stego.embed_patch(self.base, message_bytes, key)
+        return StegoResult(self, positions, values)
+    
+    def _scratch_array(self):
+        """This thread's writable copy of the base samples"""
+        scratch = getattr(self._scratch, 'array', None)
+        if scratch is None:
+            scratch = self.base.copy()
+            self._scratch.array = scratch
+        return scratch
+    
+    def _to_image(self, img_array):
+        if img_array.dtype != np.uint8:
+            img_array = img_array.astype(np.uint8)
+        img = Image.fromarray(img_array)
+        if self.palette is not None:
+            img.putpalette(self.palette)
+        return img
+
+
+class StegoResult:
+    """Copy-on-write embed result: a template plus the samples that differ from it"""
+    
+    def __init__(self, template, positions, values):
+        self.template = template
+        self.positions = positions
+        self.values = values
+    
+    def to_array(self):
+        """Materialise the full stego sample array"""
+        flat_array = self.template.base.flatten()
+        flat_array[self.positions] = self.values
+        return flat_array.reshape(self.template.shape)
+    
+    def save(self, output_path=None, format=None):
+        """
+        Encode the stego image
+        
+        Args:
+            output_path: Path or file object to write to
+            format: Image format (default: from the path, else the
+                template's lossless format)
+        
+        Returns:
+            output_path if given, otherwise the encoded bytes
+        """
+        template = self.template
+        if format is None and (output_path is None or not isinstance(output_path, (str, os.PathLike))):
+            format = template.format
+        path_format = format or Image.registered_extensions().get(os.path.splitext(output_path)[1].lower())
+        if path_format == 'BMP' and not template.stego.keeps_samples(path_format, template.base):
+            raise ValueError("BMP cannot store the alpha band that carries part of the message; save as PNG or TIFF")
+        
+        scratch = template._scratch_array()
+        flat_scratch = scratch.reshape(-1)
+        flat_scratch[self.positions] = self.values
+        try:
+            output = BytesIO() if output_path is None else output_path
+            template._to_image(scratch).save(output, format=format)
+        finally:
+            # Put the base samples back so the scratch copy can be reused
+            flat_scratch[self.positions] = template.base.reshape(-1)[self.positions]
+        
+        return output.getvalue() if output_path is None else output_path
\ No newline at end of file
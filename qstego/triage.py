@@ -0,0 +1,267 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .steganography import Steganography
+
+logger = logging.getLogger(__name__)
+
+# Image files picked up when scanning a directory
+IMAGE_EXTENSIONS = ('.png', '.bmp', '.tif', '.tiff', '.webp', '.gif', '.jpg', '.jpeg')
+
+# Below this many changed files the scan runs in-process
+PARALLEL_THRESHOLD = 64
+
+# Index rows written per transaction
+COMMIT_BATCH = 500
+
+SCHEMA_VERSION = 1
+
+
+def find_images(sources):
+    """Expand files and directories (recursively) into image paths"""
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.abspath(os.path.join(root, name))
+        else:
+            yield os.path.abspath(source)
+
+
+def _leading_rows(img, rows):
+    """Decode only the first rows of an image where the format allows it"""
+    if rows >= img.height:
+        img.load()
+        return img
+    
+    # A non-interlaced PNG is one zlib stream of scanlines, so shrinking the
+    # tile makes the decoder stop after the rows we need
+    if img.format == 'PNG' and not img.info.get('interlace') and len(img.tile) == 1:
+        decoder, _, offset, args = img.tile[0]
+        img.tile = [(decoder, (0, 0, img.width, rows), offset, args)]
+        img._size = (img.width, rows)
+        img.load()
+        return img
+    
+    img.load()
+    return img.crop((0, 0, img.width, rows))
+
+
+def probe_image(data):
+    """
+    Check whether encoded image data starts with a stego header
+    
+    Only the leading samples that hold the header are decoded. Payloads
+    embedded with a stego key spread their header over the whole image and
+    are not recognised, nor are images in the old delimiter format.
+    
+    Returns:
+        Payload length in bytes, or None if there is no header
+    """
+    header = Steganography.HEADER
+    header_bits = header.size * 8
+    
+    with Image.open(BytesIO(data)) as img:
+        bands = len(img.getbands())
+        samples = img.width * img.height * bands
+        if samples < header_bits:
+            return None
+        
+        rows = -(-header_bits // (img.width * bands))
+        leading = np.asarray(_leading_rows(img, rows)).reshape(-1)
+    
+    bits = (leading[:header_bits] & 1).astype(np.uint8)
+    magic, version, length = header.unpack(np.packbits(bits).tobytes())
+    if magic == Steganography.MAGIC and version == Steganography.VERSION and length * 8 <= samples - header_bits:
+        return length
+    return None
+
+
+def inspect_file(path):
+    """
+    Hash and probe one file
+    
+    Returns:
+        Tuple of (path, size, mtime_ns, hash, payload_length, error)
+    """
+    try:
+        stat = os.stat(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return path, None, None, None, None, str(e)
+    
+    digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+    try:
+        return path, stat.st_size, stat.st_mtime_ns, digest, probe_image(data), None
+    except Exception as e:
+        return path, stat.st_size, stat.st_mtime_ns, digest, None, str(e)
+
+
+class TriageIndex:
+    """
+    Persistent index of which images carry a stego payload
+    
+    Files are remembered by path, size and mtime, so a re-scan only opens
+    files whose size or mtime changed. Results are stored per content hash,
+    which lets copies of one image share a single entry.
+    """
+    
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.db = sqlite3.connect(index_path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            with self.db:
+                self.db.execute('DROP TABLE IF EXISTS files')
+                self.db.execute('DROP TABLE IF EXISTS results')
+                self.db.execute(
+                    'CREATE TABLE files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)'
+                )
+                self.db.execute(
+                    'CREATE TABLE results (hash TEXT PRIMARY KEY, payload_length INTEGER, error TEXT)'
+                )
+                self.db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    
+    def close(self):
+        self.db.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def scan(self, sources, workers=None, rescan=False):
+        """
+        Bring the index up to date for files and directories
+        
+        Args:
+            sources: Image files and directories to scan
+            workers: Number of worker processes (default: CPU count)
+            rescan: Probe every file again, ignoring cached results
+        
+        Returns:
+            Dict with counts of files, cached and inspected files, flagged
+            files, errors, and the elapsed time
+        """
+        start = time.perf_counter()
+        known = {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.db.execute('SELECT path, size, mtime_ns FROM files')
+        }
+        
+        # Unchanged files are answered from the index without opening them
+        paths = list(find_images(sources))
+        changed, cached = [], 0
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                changed.append(path)
+                continue
+            if not rescan and known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                cached += 1
+            else:
+                changed.append(path)
+        
+        inspected = 0
+        pending = []
+        for result in self._inspect(changed, workers):
+            pending.append(result)
+            inspected += 1
+            if len(pending) >= COMMIT_BATCH:
+                self._store(pending)
+                pending = []
+        self._store(pending)
+        
+        flagged, errors = self._summary(paths)
+        return {
+            'files': len(paths),
+            'cached': cached,
+            'inspected': inspected,
+            'flagged': flagged,
+            'errors': errors,
+            'seconds': time.perf_counter() - start
+        }
+    
+    def _inspect(self, paths, workers):
+        if len(paths) < PARALLEL_THRESHOLD or workers == 1:
+            for path in paths:
+                yield inspect_file(path)
+            return
+        
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunksize = max(1, min(64, len(paths) // (workers * 4)))
+            yield from executor.map(inspect_file, paths, chunksize=chunksize)
+    
+    def _store(self, results):
+        if not results:
+            return
+        with self.db:
+            for path, size, mtime_ns, digest, payload_length, error in results:
+                if digest is None:
+                    # The file vanished or could not be read
+                    logger.warning(f"Could not read {path}: {error}")
+                    self.db.execute('DELETE FROM files WHERE path = ?', (path,))
+                    continue
+                self.db.execute(
+                    'INSERT OR REPLACE INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)',
+                    (path, size, mtime_ns, digest)
+                )
+                self.db.execute(
+                    'INSERT OR REPLACE INTO results (hash, payload_length, error) VALUES (?, ?, ?)',
+                    (digest, payload_length, error)
+                )
+    
+    def _summary(self, paths):
+        flagged = errors = 0
+        for path in paths:
+            row = self.lookup(path)
+            if row is None:
+                continue
+            if row['payload_length'] is not None:
+                flagged += 1
+            elif row['error']:
+                errors += 1
+        return flagged, errors
+    
+    def lookup(self, path):
+        """Indexed result for a file, or None if it has not been scanned"""
+        row = self.db.execute(
+            'SELECT f.path, f.size, f.hash, r.payload_length, r.error '
+            'FROM files f JOIN results r ON r.hash = f.hash WHERE f.path = ?',
+            (os.path.abspath(path),)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('path', 'size', 'hash', 'payload_length', 'error'), row))
+    
+    def flagged(self, prefix=None):
+        """
+        Indexed files that carry a payload
+        
+        Returns:
+            List of (path, payload_length) tuples sorted by path
+        """
+        query = (
+            'SELECT f.path, r.payload_length FROM files f JOIN results r ON r.hash = f.hash '
+            'WHERE r.payload_length IS NOT NULL'
+        )
+        args = ()
+        if prefix:
+            query += ' AND f.path LIKE ? ESCAPE ?'
+            escaped = os.path.abspath(prefix).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            args = (escaped + '%', '\\')
+        return self.db.execute(query + ' ORDER BY f.path', args).fetchall()
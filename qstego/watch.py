@@ -0,0 +1,513 @@
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import select
+import sqlite3
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone
+
+from .crypto_stego import CryptoStego
+from .triage import IMAGE_EXTENSIONS, probe_image
+
+logger = logging.getLogger(__name__)
+
+# Seconds a polled file's mtime must be in the past before it is read,
+# so files still being copied in are not picked up half written
+SETTLE_SECONDS = 1.0
+
+# Seconds between directory scans when inotify is not available
+POLL_INTERVAL = 2.0
+
+SCHEMA_VERSION = 1
+
+# A file in flight when a worker died this many times is reported as failed
+# rather than queued again, in case it is what kills the worker
+MAX_ATTEMPTS = 3
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """
+    Reports files written or moved into a directory, using Linux inotify
+    
+    Only completed writes (close after write) and renames into the
+    directory are reported, so half-copied files are never seen.
+    """
+    
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.directory = directory
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"Cannot watch {directory}")
+    
+    def wait(self, timeout):
+        """
+        Wait up to timeout seconds for changes
+        
+        Returns:
+            Set of changed paths (possibly empty), or None if events were
+            lost and the whole directory must be scanned
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        
+        paths, offset = set(), 0
+        while offset + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                paths.add(os.path.join(self.directory, os.fsdecode(name)))
+        return paths
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Fallback watcher that asks for a full directory scan every interval"""
+    
+    def __init__(self, directory, interval=POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self._next_scan = time.monotonic() + interval
+    
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; None once a scan is due, else an empty set"""
+        now = time.monotonic()
+        time.sleep(max(0.0, min(timeout, self._next_scan - now)))
+        if time.monotonic() < self._next_scan:
+            return set()
+        self._next_scan = time.monotonic() + self.interval
+        return None
+    
+    def close(self):
+        pass
+
+
+def create_watcher(directory, inotify=True, interval=POLL_INTERVAL):
+    """inotify watcher for a directory where the platform supports it, else a polling watcher"""
+    if inotify:
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError, TypeError) as e:
+            logger.info(f"inotify unavailable ({e}); polling {directory} every {interval:g}s")
+    return PollingWatcher(directory, interval)
+
+
+class WatchState:
+    """
+    Persistent record of the files a watch daemon has processed
+    
+    Files are remembered by path, size and mtime; this is the cursor a
+    restarted daemon resumes from, so only new or changed files are read.
+    Outcomes are stored per content hash, which keeps a copy of an already
+    revealed image from being decrypted a second time.
+    """
+    
+    def __init__(self, state_path):
+        # run() may be called from a thread other than the one that opened the state
+        self.db = sqlite3.connect(state_path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        if self.db.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+            with self.db:
+                self.db.execute('DROP TABLE IF EXISTS files')
+                self.db.execute('DROP TABLE IF EXISTS results')
+                self.db.execute(
+                    'CREATE TABLE files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, hash TEXT)'
+                )
+                self.db.execute(
+                    'CREATE TABLE results (hash TEXT PRIMARY KEY, status TEXT, keypair TEXT, output TEXT, error TEXT)'
+                )
+                self.db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+    
+    def close(self):
+        self.db.close()
+    
+    def known(self):
+        """Dict of path -> (size, mtime_ns) for every processed file"""
+        return {
+            path: (size, mtime_ns)
+            for path, size, mtime_ns in self.db.execute('SELECT path, size, mtime_ns FROM files')
+        }
+    
+    def result(self, digest):
+        """Stored outcome for a content hash, or None"""
+        row = self.db.execute(
+            'SELECT status, keypair, output, error FROM results WHERE hash = ?', (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('status', 'keypair', 'output', 'error'), row))
+    
+    def record(self, path, size, mtime_ns, digest, outcome=None):
+        """Mark a file processed; a new outcome is stored for its hash too"""
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO files (path, size, mtime_ns, hash) VALUES (?, ?, ?, ?)',
+                (path, size, mtime_ns, digest)
+            )
+            if outcome is not None:
+                self.db.execute(
+                    'INSERT OR REPLACE INTO results (hash, status, keypair, output, error) VALUES (?, ?, ?, ?, ?)',
+                    (digest, outcome['status'], outcome.get('keypair'), outcome.get('output'), outcome.get('error'))
+                )
+
+
+# Per-worker state, created once by the pool initializer
+_worker_crypto_stego = None
+
+
+def _init_worker(keys_dir):
+    global _worker_crypto_stego
+    _worker_crypto_stego = CryptoStego(keys_dir)
+    _worker_crypto_stego.key_manager.preload_keys()
+
+
+def candidate_keypairs(key_manager, metadata, allowed=None):
+    """
+    Local keypairs that may decrypt a payload, most likely first
+    
+    The keypair named as recipient in the payload metadata is tried first;
+    the sender's name for a key need not match the local one, so every
+    other local secret key follows.
+    """
+    names = [
+        name for name in key_manager.get_keypair_names()
+        if key_manager.get_keypair(name).get('secret_key') and (allowed is None or name in allowed)
+    ]
+    recipient = metadata.get('recipient')
+    if recipient in names:
+        names.remove(recipient)
+        names.insert(0, recipient)
+    return names
+
+
+def _reveal_file(path, allowed, stego_key):
+    """Worker: extract one payload and decrypt it with the first local key that fits"""
+    crypto_stego = _worker_crypto_stego
+    crypto_stego.key_manager.refresh_keypairs()
+    payload_bytes = crypto_stego.stego.retrieve_message(path, stego_key)
+    # Parsed once for every keypair tried; large payloads make this costly
+    try:
+        parts = crypto_stego.read_payload(payload_bytes)
+    except Exception as e:
+        raise ValueError(f"Error reading payload metadata: {str(e)}")
+    metadata = parts[3]
+    
+    names = candidate_keypairs(crypto_stego.key_manager, metadata, allowed)
+    if not names:
+        raise ValueError("No local secret key to decrypt with")
+    for name in names:
+        try:
+            return name, crypto_stego.decrypt_parts(parts, name), metadata.get('attachment')
+        except ValueError:
+            continue
+    raise ValueError(f"None of the {len(names)} local secret keys decrypts this message")
+
+
+class WatchDaemon:
+    """
+    Reveal messages in images as they arrive in an inbox directory
+    
+    New and changed files are found through inotify, or by scanning the
+    directory when inotify is unavailable. Each file is hashed and probed
+    for a stego header in the daemon process, which is cheap; only files
+    that carry a payload are sent to the worker pool to be extracted and
+    decrypted. Plaintexts are written to the output directory, every
+    outcome is appended to a JSON-lines audit log, and the file is then
+    recorded in the state database so it is never decoded again. Failures
+    are not recorded; the file is tried again after a restart, by when the
+    key it needs may have been added.
+    """
+    
+    def __init__(self, inbox, output_dir, keys_dir='keys', state_path=None, audit_path=None,
+                 workers=None, keypairs=None, stego_key=None, inotify=True,
+                 poll_interval=POLL_INTERVAL, settle=SETTLE_SECONDS):
+        """
+        Args:
+            inbox: Directory to watch (not recursive)
+            output_dir: Directory the plaintexts are written to
+            keys_dir: Keystore holding the local secret keys
+            state_path: State database (default: watch-state.db in output_dir)
+            audit_path: JSON-lines audit log (default: audit.jsonl in output_dir)
+            workers: Decryption processes (default: CPU count)
+            keypairs: Only try these keypairs (default: every local secret key)
+            stego_key: Shared secret the payloads were spread with, if any;
+                keyed headers cannot be probed, so every image is decoded
+            inotify: Use inotify where available
+            poll_interval: Seconds between scans without inotify
+            settle: Seconds a scanned file must be unmodified before it is read
+        """
+        self.inbox = os.path.abspath(inbox)
+        self.output_dir = os.path.abspath(output_dir)
+        if os.path.realpath(self.inbox) == os.path.realpath(self.output_dir):
+            raise ValueError("The output directory must not be the watched inbox")
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        self.keypairs = set(keypairs) if keypairs else None
+        self.stego_key = stego_key
+        self.settle = settle
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = self.workers * 2
+        
+        self.state = WatchState(state_path or os.path.join(self.output_dir, 'watch-state.db'))
+        self.audit_path = audit_path or os.path.join(self.output_dir, 'audit.jsonl')
+        self.watcher = create_watcher(self.inbox, inotify, poll_interval)
+        self.keys_dir = keys_dir
+        self._executor = self._create_pool()
+        
+        self._known = self.state.known()
+        # Triaged files waiting for a worker, and files being decrypted
+        self._waiting = []
+        self._running = {}
+        # Paths to look at again on the next step
+        self._unsettled = set()
+        self._stopped = False
+    
+    def _create_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.keys_dir,)
+        )
+    
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+        self.watcher.close()
+        self.state.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def stop(self):
+        """Ask run() to return after the current step"""
+        self._stopped = True
+    
+    def run(self):
+        """Catch up with the inbox, then process changes until stop() is called"""
+        self.scan(None, settle=True)
+        while not self._stopped:
+            busy = self._running or self._waiting or self._unsettled
+            changed = self.watcher.wait(0.1 if busy else 1.0)
+            # Polled scans and files still settling may catch a copy in progress
+            polled = changed is None or isinstance(self.watcher, PollingWatcher)
+            retry, self._unsettled = self._unsettled, set()
+            self.scan(changed, settle=polled)
+            self.scan(retry, settle=True)
+            self.pump()
+    
+    def run_once(self):
+        """Process everything currently in the inbox and wait for it to finish"""
+        self.scan(None, settle=False)
+        while self._running or self._waiting:
+            self.pump(block=True)
+    
+    def _listing(self):
+        try:
+            with os.scandir(self.inbox) as entries:
+                return [entry.path for entry in entries if entry.is_file()]
+        except OSError as e:
+            logger.warning(f"Cannot list {self.inbox}: {e}")
+            return []
+    
+    def scan(self, paths, settle=False):
+        """
+        Triage new or changed files and queue those that carry a payload
+        
+        Args:
+            paths: Paths to look at, or None for the whole inbox
+            settle: Skip files modified within the last settle seconds
+        """
+        pending = {entry['path'] for entry in self._waiting}
+        pending.update(entry['path'] for entry in self._running.values())
+        now = time.time_ns()
+        
+        for path in sorted(self._listing() if paths is None else paths):
+            if not path.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if path in pending:
+                # It may have changed again since it was read
+                self._unsettled.add(path)
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if self._known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                continue
+            if settle and now - stat.st_mtime_ns < self.settle * 1e9:
+                self._unsettled.add(path)
+                continue
+            self._triage(path)
+        self.pump()
+    
+    def _triage(self, path):
+        """Hash and probe one file; settle it here unless it needs decrypting"""
+        try:
+            stat = os.stat(path)
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            logger.warning(f"Could not read {path}: {e}")
+            return
+        
+        entry = {
+            'path': path,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'hash': hashlib.blake2b(data, digest_size=20).hexdigest(),
+            'started': time.perf_counter(),
+            'attempts': 0
+        }
+        
+        previous = self.state.result(entry['hash'])
+        # Failures stored by earlier versions are tried again
+        if previous is not None and previous['status'] != 'failed':
+            # The same content was handled before, under this or another name
+            if previous['status'] == 'revealed':
+                previous['status'] = 'duplicate'
+            self._finish(entry, previous, store=False)
+            return
+        
+        # Keyed payloads spread their header over the image and cannot be probed
+        if self.stego_key is None:
+            try:
+                if probe_image(data) is None:
+                    self._finish(entry, {'status': 'no-payload'})
+                    return
+            except Exception as e:
+                self._finish(entry, {'status': 'unreadable', 'error': str(e)})
+                return
+        self._waiting.append(entry)
+    
+    def pump(self, block=False):
+        """Hand waiting files to the pool and settle any that finished"""
+        while self._waiting and len(self._running) < self.max_inflight:
+            # A file that was in flight when a worker died runs alone, so a
+            # file that kills its worker cannot take the others down with it
+            if self._running and (self._waiting[0]['attempts'] or self._retrying()):
+                break
+            entry = self._waiting.pop(0)
+            try:
+                future = self._executor.submit(_reveal_file, entry['path'], self.keypairs, self.stego_key)
+            except BrokenProcessPool:
+                self._waiting.insert(0, entry)
+                self._restart_pool()
+                continue
+            self._running[future] = entry
+        if not self._running:
+            return
+        
+        done, _ = wait(self._running, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        if self._settle(done):
+            self._restart_pool()
+    
+    def _retrying(self):
+        return any(entry['attempts'] for entry in self._running.values())
+    
+    def _settle(self, futures):
+        """Settle finished futures; returns True if their pool broke"""
+        broken = []
+        pool_broke = False
+        for future in futures:
+            entry = self._running.pop(future)
+            try:
+                keypair, plaintext, attachment = future.result()
+                output = self._write_output(entry, plaintext, attachment)
+                self._finish(entry, {'status': 'revealed', 'keypair': keypair, 'output': output})
+            except BrokenProcessPool as e:
+                pool_broke = True
+                entry['attempts'] += 1
+                if entry['attempts'] < MAX_ATTEMPTS:
+                    broken.append(entry)
+                else:
+                    self._finish(entry, {'status': 'failed', 'error': f"Worker died while decrypting: {e}"})
+            except Exception as e:
+                self._finish(entry, {'status': 'failed', 'error': str(e)})
+        # Back to the front of the queue, in the order they were taken from it
+        broken.sort(key=lambda entry: entry['started'])
+        self._waiting[:0] = broken
+        return pool_broke
+    
+    def _restart_pool(self):
+        """Replace a pool a worker died in, queueing its files again"""
+        logger.warning("A decryption worker died; restarting the pool")
+        # Everything still running was submitted to the broken pool and fails with it
+        self._settle(wait(self._running).done)
+        self._executor.shutdown(wait=False)
+        self._executor = self._create_pool()
+    
+    def _write_output(self, entry, plaintext, attachment):
+        """Write a plaintext next to the others; the name carries the image hash"""
+        stem = f"{os.path.splitext(os.path.basename(entry['path']))[0]}.{entry['hash'][:12]}"
+        if attachment is not None:
+            filename = os.path.basename(attachment.get('filename') or '') or 'attachment.bin'
+            name = f"{stem}.{filename}"
+        else:
+            name = f"{stem}.txt"
+        output_path = os.path.join(self.output_dir, name)
+        
+        temp_path = f"{output_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(plaintext)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, output_path)
+        return output_path
+    
+    def _finish(self, entry, outcome, store=True):
+        """Audit an outcome, then record the file so it is not processed again"""
+        record = {
+            'time': datetime.now(timezone.utc).isoformat(timespec='milliseconds'),
+            'path': entry['path'],
+            'size': entry['size'],
+            'hash': entry['hash'],
+            'status': outcome['status'],
+            'keypair': outcome.get('keypair'),
+            'output': outcome.get('output'),
+            'error': outcome.get('error'),
+            'seconds': round(time.perf_counter() - entry['started'], 4)
+        }
+        with open(self.audit_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        
+        # A crash before this point re-processes the file; after it, never.
+        # Failures may succeed later, so they are only remembered until a restart
+        if outcome['status'] != 'failed':
+            self.state.record(entry['path'], entry['size'], entry['mtime_ns'], entry['hash'], outcome if store else None)
+        self._known[entry['path']] = (entry['size'], entry['mtime_ns'])
+        if outcome['status'] == 'failed':
+            logger.warning(f"{entry['path']}: {outcome['error']}")
+        else:
+            logger.info(f"{entry['path']}: {outcome['status']}")
@@ -0,0 +1,122 @@
+import codecs
+
+# Bytes of a revealed message rendered into the viewer at a time
+PAGE_BYTES = 64 * 1024
+
+# Leading bytes inspected to tell text from binary payloads
+BINARY_SAMPLE = 8 * 1024
+
+
+def looks_binary(data, sample=BINARY_SAMPLE):
+    """Guess from its first bytes whether a payload is a file rather than UTF-8 text"""
+    head = bytes(data[:sample])
+    if b'\x00' in head:
+        return True
+    try:
+        # A character cut off at the end of the sample is not an error
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=len(data) <= sample)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+class PagedText:
+    """
+    A large UTF-8 byte buffer split into pages that decode independently
+    
+    Page boundaries are moved back to the start of a character, so only the
+    page being shown is ever decoded to str.
+    """
+    
+    def __init__(self, data, page_bytes=PAGE_BYTES):
+        self.data = data
+        self.offsets = [0]
+        while len(data) - self.offsets[-1] > page_bytes:
+            end = self.offsets[-1] + page_bytes
+            # Step back over at most three UTF-8 continuation bytes
+            for _ in range(3):
+                if data[end] & 0xC0 != 0x80 or end - 1 == self.offsets[-1]:
+                    break
+                end -= 1
+            self.offsets.append(end)
+        self.offsets.append(len(data))
+    
+    def __len__(self):
+        return len(self.offsets) - 1
+    
+    def page(self, index):
+        """Text of one page; invalid bytes are shown as replacement characters"""
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8', errors='replace')
+
+
+class TextEditCounter:
+    """
+    Character and UTF-8 byte counts of a Tk text widget, kept up to date edit by edit
+    
+    The widget's Tcl command is wrapped so that every insert and delete,
+    whether from key bindings, the clipboard or code, adjusts the counts by
+    the size of the change instead of re-reading the whole buffer.
+    """
+    
+    def __init__(self, text_widget, on_change=None):
+        """
+        Args:
+            text_widget: The tk.Text to count
+            on_change: Called with no arguments after every edit
+        """
+        self.widget = text_widget
+        self.on_change = on_change
+        self.chars = 0
+        self.bytes = 0
+        
+        # Route the widget's command through _dispatch
+        self._inner = text_widget._w + '_counted'
+        text_widget.tk.call('rename', text_widget._w, self._inner)
+        text_widget.tk.createcommand(text_widget._w, self._dispatch)
+        self.recount()
+    
+    def _call(self, *args):
+        return self.widget.tk.call(self._inner, *args)
+    
+    def _true(self, *args):
+        return self.widget.tk.getboolean(self._call(*args))
+    
+    def recount(self):
+        """Count the whole buffer again"""
+        content = self._call('get', '1.0', 'end-1c')
+        self.chars = len(content)
+        self.bytes = len(content.encode('utf-8', 'surrogatepass'))
+    
+    def _add(self, text, sign):
+        self.chars += sign * len(text)
+        self.bytes += sign * len(text.encode('utf-8', 'surrogatepass'))
+    
+    def _dispatch(self, operation, *args):
+        # A disabled text widget ignores edits
+        if operation not in ('insert', 'delete', 'replace', 'edit') or str(self._call('cget', '-state')) != 'normal':
+            return self._call(operation, *args)
+        
+        if operation == 'insert':
+            # insert index chars ?tagList chars tagList ...?
+            result = self._call(operation, *args)
+            for text in args[1::2]:
+                self._add(text, 1)
+        elif operation == 'delete' and len(args) in (1, 2):
+            first = self._call('index', args[0])
+            last = self._call('index', args[1] if len(args) == 2 else f'{first}+1c')
+            # The final newline of a text widget is never deleted
+            if self._true('compare', last, '>', 'end-1c'):
+                last = self._call('index', 'end-1c')
+            removed = self._call('get', first, last) if self._true('compare', first, '<', last) else ''
+            result = self._call(operation, *args)
+            self._add(removed, -1)
+        elif operation == 'edit' and args and args[0] not in ('undo', 'redo'):
+            return self._call(operation, *args)
+        else:
+            # Multi-range deletes, replace, undo and redo are rare: recount
+            result = self._call(operation, *args)
+            self.recount()
+        
+        if self.on_change is not None:
+            self.on_change()
+        return result